@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import os
+import time
+import argparse
+import itertools
+import multiprocessing
+
+import gym
+import numpy as np
+import torch
+
+from lib import cross_entropy, q_learning, vector_env, learner, machine_profile
+
+
+TRAINERS = ("cross-entropy", "q-learning")
+ENV_WIDTHS = (0, 16, 64, 256)
+LEARNER_STEPS = 4096
+BENCH_SECONDS = 0.5
+# settings within this fraction of the best are considered equal, the cheaper one wins
+TOLERANCE = 0.05
+
+
+def cpu_grid():
+    """
+    Thread and worker counts to try: 1, 2, half and all of the CPUs
+    """
+    cpus = os.cpu_count() or 1
+    return sorted({1, 2, max(cpus // 2, 1), cpus} & set(range(1, cpus + 1)))
+
+
+def timed(step, seconds):
+    """
+    Calls step() until seconds have passed, returns units per second where
+    step returns the number of units it processed
+    """
+    step()
+    units, ts = 0, time.perf_counter()
+    while True:
+        units += step()
+        elapsed = time.perf_counter() - ts
+        if elapsed > seconds:
+            return units / elapsed
+
+
+def ce_rollout(threads, width, seconds=BENCH_SECONDS):
+    """
+    Rollout env steps/s of the cross-entropy trainer, width=0 is the gym env
+    stepped one observation at a time
+    """
+    torch.set_num_threads(threads)
+    env, net, _ = cross_entropy.make_trainer(seed=0)
+    if width:
+        vec_env = vector_env.FrozenLakeVectorEnv(env, width, seed=0)
+        batches = cross_entropy.iterate_batches_vec(vec_env, net, cross_entropy.BATCH_SIZE // 10)
+    else:
+        batches = cross_entropy.iterate_batches(env, net, cross_entropy.BATCH_SIZE // 10)
+    return timed(lambda: sum(len(e.steps) for e in next(batches)), seconds)
+
+
+def ce_learner(threads, seconds=BENCH_SECONDS):
+    """
+    Learner samples/s of one full-batch step on a synthetic elite set
+    """
+    torch.set_num_threads(threads)
+    env, net, optimizer = cross_entropy.make_trainer(seed=0)
+    n_states = env.observation_space.shape[0]
+    rng = np.random.default_rng(0)
+    eye = np.eye(n_states, dtype=np.float32)
+    obs = list(eye[rng.integers(n_states, size=LEARNER_STEPS)])
+    acts = list(rng.integers(env.action_space.n, size=LEARNER_STEPS))
+    learn = learner.Learner(net, optimizer)
+
+    def step():
+        learn.step(obs, acts)
+        return LEARNER_STEPS
+    return timed(step, seconds)
+
+
+def q_env_steps(seconds=BENCH_SECONDS):
+    agent = q_learning.Agent()
+
+    def step():
+        agent.sample_env()
+        return 1
+    return timed(step, seconds)
+
+
+def q_updates(seconds=BENCH_SECONDS):
+    agent = q_learning.Agent()
+    transitions = [agent.sample_env() for _ in range(1000)]
+    it = itertools.cycle(transitions)
+
+    def step():
+        agent.value_update(*next(it))
+        return 1
+    return timed(step, seconds)
+
+
+def run_bench(task):
+    fn, args = task
+    return fn(*args)
+
+
+def concurrent(fn, args, workers):
+    """
+    Aggregate rate of fn(*args) running in workers processes at the same time
+    """
+    if workers == 1:
+        return fn(*args)
+    with multiprocessing.Pool(processes=workers) as pool:
+        return sum(pool.map(run_bench, [(fn, args)] * workers))
+
+
+def pick(rates):
+    """
+    Cheapest key within TOLERANCE of the best rate, keys are ordered by cost
+    """
+    best = max(rates.values())
+    for key in sorted(rates):
+        if rates[key] >= best * (1 - TOLERANCE):
+            return key
+
+
+def tune_cross_entropy(seconds):
+    rollout, learn = {}, {}
+    for threads in cpu_grid():
+        for width in ENV_WIDTHS:
+            rollout[threads, width] = ce_rollout(threads, width, seconds)
+            print("threads=%d env_width=%d: %.0f rollout steps/s" % (threads, width, rollout[threads, width]))
+        learn[threads] = ce_learner(threads, seconds)
+        print("threads=%d: %.0f learner samples/s" % (threads, learn[threads]))
+    # rollout batch of the untrained Net, episodes get longer as it learns
+    env, net, _ = cross_entropy.make_trainer(seed=0)
+    batch = next(cross_entropy.iterate_batches(env, net, cross_entropy.BATCH_SIZE))
+    steps_per_batch = sum(len(e.steps) for e in batch)
+
+    # one training iteration is a rollout batch plus a learner step on the elites
+    iter_rates = {}
+    for threads in learn:
+        width = pick({w: rollout[threads, w] for w in ENV_WIDTHS})
+        iter_time = steps_per_batch / rollout[threads, width] + LEARNER_STEPS / learn[threads]
+        iter_rates[threads, width] = 1.0 / iter_time
+    threads, width = pick(iter_rates)
+
+    workers = {w: concurrent(ce_rollout, (threads, width, seconds), w) for w in cpu_grid()}
+    for w, rate in sorted(workers.items()):
+        print("workers=%d: %.0f aggregate rollout steps/s" % (w, rate))
+    n_workers = pick(workers)
+    return {
+        "threads": threads, "env_width": width, "workers": n_workers,
+        "rollout_steps_per_s": rollout[threads, width], "learner_samples_per_s": learn[threads],
+        "aggregate_steps_per_s": workers[n_workers],
+    }
+
+
+def tune_q_learning(seconds):
+    # the tabular agent is pure python/numpy, torch threads only need to stay out of the way
+    env_steps = {w: concurrent(q_env_steps, (seconds, ), w) for w in cpu_grid()}
+    updates = q_updates(seconds)
+    for w, rate in sorted(env_steps.items()):
+        print("workers=%d: %.0f aggregate env steps/s" % (w, rate))
+    print("%.0f value updates/s" % updates)
+    n_workers = pick(env_steps)
+    return {
+        "threads": 1, "workers": n_workers, "env_steps_per_s": env_steps[n_workers],
+        "updates_per_s": updates,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--trainer", default="cross-entropy", choices=TRAINERS)
+    parser.add_argument("--seconds", type=float, default=BENCH_SECONDS, help="Duration of every measurement")
+    parser.add_argument("--profile", default=machine_profile.PROFILE_PATH, help="Machine profile file")
+    parser.add_argument("--dry-run", default=False, action="store_true", help="Print the settings, don't save")
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+
+    ts = time.time()
+    if args.trainer == "cross-entropy":
+        settings = tune_cross_entropy(args.seconds)
+    else:
+        settings = tune_q_learning(args.seconds)
+    settings["tuned_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    print("%s on %s: %s (%.1fs)" % (args.trainer, machine_profile.host_key(), settings, time.time() - ts))
+    if not args.dry_run:
+        machine_profile.save(args.trainer, settings, args.profile)
+        print("Saved to %s" % args.profile)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+import gym
+import numpy as np
+
+from lib import cross_entropy, vector_env, batch_sizer
+
+
+EVAL_EPISODES = 1000
+MAX_EPISODES = 100000
+
+
+def run(slippery, batch_size, seed, target, eval_episodes, max_episodes, sizer_args):
+    """
+    Trains until the stochastic policy's mean reward over eval_episodes
+    fresh episodes reaches target. batch_size=0 is the adaptive sizer.
+    Returns iterations, training episodes, seconds and the sizer decisions,
+    or None if unsolved within max_episodes.
+    """
+    env, net, optimizer = cross_entropy.make_trainer(slippery=slippery, seed=seed)
+    n_states = env.observation_space.shape[0]
+    eval_env = vector_env.FrozenLakeVectorEnv(env, eval_episodes, seed=seed)
+    sizer = batch_sizer.BatchSizer(**sizer_args) if batch_size == 0 else None
+    episodes = 0
+    ts = time.time()
+    for step in cross_entropy.train(env, net, optimizer, batch_size=batch_size, sizer=sizer):
+        episodes = sizer.episodes if sizer is not None else episodes + batch_size
+        policy = vector_env.stochastic_policy(cross_entropy.policy_table(net, n_states), eval_env.rng)
+        if eval_env.play_episodes(policy, eval_episodes)[0].mean() >= target:
+            return step.iter_no + 1, episodes, time.time() - ts, [] if sizer is None else sizer.decisions
+        if episodes >= max_episodes:
+            return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--configs", default="100,0",
+                        help="Comma-separated fixed batch sizes, 0 is the adaptive sizer")
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Use the deterministic map")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--target", type=float, help="Eval mean reward counted as solved, default %.2f" %
+                        cross_entropy.SOLVE_REWARD)
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--max-episodes", type=int, default=MAX_EPISODES, help="Training episodes per run")
+    parser.add_argument("--min-batch", type=int, default=batch_sizer.MIN_BATCH)
+    parser.add_argument("--max-batch", type=int, default=batch_sizer.MAX_BATCH)
+    parser.add_argument("--start-batch", type=int, default=batch_sizer.START_BATCH)
+    parser.add_argument("--target-elites", type=int, default=batch_sizer.TARGET_ELITES)
+    parser.add_argument("-v", "--verbose", default=False, action="store_true", help="Print every sizer decision")
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+    target = args.target or cross_entropy.SOLVE_REWARD
+    sizer_args = dict(start=args.start_batch, min_size=args.min_batch, max_size=args.max_batch,
+                      target_elites=args.target_elites)
+
+    print("batch  solved  iters  episodes  seconds")
+    for batch_size in map(int, args.configs.split(",")):
+        results = [run(not args.nonslippery, batch_size, seed, target, args.eval_episodes, args.max_episodes,
+                       sizer_args) for seed in range(args.seeds)]
+        solved = [r for r in results if r is not None]
+        if args.verbose:
+            for decisions in (r[3] for r in solved):
+                for d in decisions:
+                    print("  %d: %d -> %d, fresh elites %d, reward std %.3f, %s" % d)
+        label = "adapt" if batch_size == 0 else "%5d" % batch_size
+        if not solved:
+            print("%s %4d/%d %6s %9s %8s" % (label, 0, args.seeds, "-", "-", "-"))
+            continue
+        iters, episodes, seconds = np.median(np.array([r[:3] for r in solved]), axis=0)
+        print("%s %4d/%d %6.0f %9.0f %8.1f" % (label, len(solved), args.seeds, iters, episodes, seconds))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+import torch
+
+from lib import cross_entropy, inference
+
+
+BATCH_SIZES = (1, 64, 4096)
+OBS_SIZE = 16
+N_ACTIONS = 4
+
+
+def latency(fn, obs_v, min_time=0.5):
+    for _ in range(10):
+        fn(obs_v)
+    count, ts = 0, time.perf_counter()
+    while True:
+        fn(obs_v)
+        count += 1
+        elapsed = time.perf_counter() - ts
+        if elapsed > min_time:
+            return elapsed / count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hidden-size", type=int, default=cross_entropy.HIDDEN_SIZE)
+    parser.add_argument("--threads", type=int, help="torch.set_num_threads")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    net = cross_entropy.Net(OBS_SIZE, args.hidden_size, N_ACTIONS)
+    sm = torch.nn.Softmax(dim=1)
+    candidates = [("eager+autograd", lambda obs_v: sm(net(obs_v)))]
+
+    def no_grad(obs_v):
+        with torch.no_grad():
+            return sm(net(obs_v))
+    candidates.append(("eager no_grad", no_grad))
+    for mode in inference.POLICY_MODES:
+        try:
+            policy = inference.make_policy(net, mode)
+            policy(torch.zeros(1, OBS_SIZE))
+        except Exception as e:
+            print("%s: unavailable (%s)" % (mode, e.__class__.__name__))
+            continue
+        candidates.append((mode, policy))
+
+    print("%-16s" % "" + "".join("%12s" % ("batch %d" % b) for b in BATCH_SIZES))
+    for name, fn in candidates:
+        row = []
+        for batch in BATCH_SIZES:
+            obs_v = torch.eye(OBS_SIZE)[torch.randint(OBS_SIZE, (batch, ))]
+            row.append(latency(fn, obs_v) * 1e6)
+        print("%-16s" % name + "".join("%10.1fus" % us for us in row))
+
+    for mode in ("eager", "int8"):
+        policy = inference.make_policy(net, mode)
+        print("%s refresh: %.1fus" % (mode, latency(lambda _: policy.refresh(), None) * 1e6))
+
+    quantized = inference.QuantizedPolicy(net)
+    obs_v = torch.eye(OBS_SIZE)
+    agreement = inference.policy_agreement(lambda x: sm(net(x)), quantized, obs_v)
+    print("int8 vs float on all states: max|dp|=%.5f, mean TV=%.5f, greedy agreement=%.1f%%" % (
+        agreement["max_abs"], agreement["mean_tv"], 100.0 * agreement["argmax"]))
+    print("weight payload: float %d bytes, int8 %d bytes" % (
+        len(inference.state_payload(net)), len(quantized.payload())))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import threading
+import multiprocessing as mp
+
+import gym
+
+from lib import q_learning, evaluation, vector_env, param_server, machine_profile
+
+
+COUNT_EVERY = 100
+EVAL_INTERVAL = 0.5
+MAX_SECONDS = 120
+# see hogwild_q_learning.py: the best greedy policy succeeds ~74% of the time
+TARGET_REWARD = 0.7
+
+
+def make_transport(kind, target):
+    if kind == "local":
+        return param_server.LocalTransport(target)
+    return param_server.TcpTransport(target)
+
+
+def actor(idx, seed, kind, target, counts, traffic, stop, n_states, n_actions, n_shards, staleness):
+    env = gym.make(q_learning.ENV_NAME)
+    env.seed(seed)
+    env.action_space.seed(seed)
+    transport = make_transport(kind, target)
+    remote = param_server.RemoteTable(transport, n_states, n_actions, n_shards)
+    agent = param_server.ParamServerAgent(remote, env=env, staleness=staleness)
+    done_updates = 0
+    while not stop.is_set():
+        for _ in range(COUNT_EVERY):
+            s, a, r, next_s = agent.sample_env()
+            agent.value_update(s, a, r, next_s)
+        done_updates += COUNT_EVERY
+        counts[idx] = done_updates
+        traffic[idx] = transport.bytes_sent + transport.bytes_received
+    transport.close()
+
+
+def evaluator(seed, kind, target, counts, stop, n_states, n_actions, n_shards, goal, interval, max_seconds):
+    env = gym.make(q_learning.ENV_NAME)
+    vec_env = vector_env.FrozenLakeVectorEnv(env, evaluation.EVAL_BATCH, seed=seed,
+                                             max_episode_steps=env.spec.max_episode_steps)
+    test = evaluation.SequentialEvaluator(goal)
+    remote = param_server.RemoteTable(make_transport(kind, target), n_states, n_actions, n_shards)
+    start_ts = time.time()
+    solve_ts, solve_updates = None, None
+    while time.time() - start_ts < max_seconds:
+        time.sleep(interval)
+        updates = sum(counts)
+        actions = remote.greedy_actions()
+        res = test.evaluate(lambda n: vec_env.play_episodes(lambda states: actions[states], n)[0])
+        if res.solved:
+            solve_ts, solve_updates = time.time() - start_ts, updates
+            break
+    stop.set()
+    remote.transport.close()
+    return time.time() - start_ts, solve_ts, solve_updates
+
+
+def run(n_actors, kind, n_shards, staleness, seed, goal, interval, max_seconds):
+    env = gym.make(q_learning.ENV_NAME)
+    n_states, n_actions = env.observation_space.n, env.action_space.n
+    bounds = param_server.shard_bounds(n_states, n_shards)
+    counts = mp.RawArray('q', n_actors)
+    traffic = mp.RawArray('q', n_actors)
+    servers = []
+    if kind == "local":
+        target = [param_server.QShard(start, end, n_actions) for start, end in bounds]
+        stop = threading.Event()
+        spawn = threading.Thread
+    else:
+        ready = mp.Queue()
+        target = []
+        for start, end in bounds:
+            proc = mp.Process(target=param_server.serve_shard, args=(start, end, n_actions),
+                              kwargs={"ready": ready}, daemon=True)
+            proc.start()
+            servers.append(proc)
+            target.append(("127.0.0.1", ready.get()))
+        stop = mp.Event()
+        spawn = mp.Process
+
+    actors = [spawn(target=actor, args=(idx, seed + idx, kind, target, counts, traffic, stop, n_states, n_actions,
+                                        n_shards, staleness)) for idx in range(n_actors)]
+    for a in actors:
+        a.start()
+    elapsed, solve_ts, solve_updates = evaluator(seed, kind, target, counts, stop, n_states, n_actions, n_shards,
+                                                 goal, interval, max_seconds)
+    for a in actors:
+        a.join()
+    for proc in servers:
+        proc.terminate()
+    return elapsed, sum(counts), sum(traffic), solve_ts, solve_updates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--actors", help="Comma-separated actor counts to benchmark, default 1 and the "
+                        "tuned workers of the machine profile, or 1,2,4 if untuned")
+    parser.add_argument("--no-profile", default=False, action="store_true",
+                        help="Ignore the machine profile written by autotune.py")
+    parser.add_argument("--transport", default="tcp", choices=["tcp", "local"],
+                        help="Shard server processes over TCP, or in-process shards with actor threads")
+    parser.add_argument("--shards", type=int, default=param_server.N_SHARDS)
+    parser.add_argument("--staleness", type=int, default=param_server.STALENESS,
+                        help="Max value updates an actor runs on its local copy before a push/pull")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", type=float, default=TARGET_REWARD,
+                        help="Greedy policy success rate counted as converged")
+    parser.add_argument("--eval-interval", type=float, default=EVAL_INTERVAL,
+                        help="Seconds between greedy policy checks")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="Time limit per run")
+    args = parser.parse_args()
+    profile = {} if args.no_profile else machine_profile.apply("q-learning")
+    if profile:
+        print("Machine profile: threads=%d, workers=%d" % (profile.get("threads", 0), profile.get("workers", 0)))
+
+    base_rate = None
+    print("actors  updates/s  scaling  bytes/update  solve_s  solve_updates")
+    for n_actors in machine_profile.worker_counts(args.actors, profile):
+        elapsed, updates, traffic, solve_ts, solve_updates = run(
+            n_actors, args.transport, args.shards, args.staleness, args.seed, args.target, args.eval_interval,
+            args.max_seconds)
+        rate = updates / elapsed
+        if base_rate is None:
+            base_rate = rate / n_actors
+        print("%6d %10.0f %7.2fx %13.1f %8s %14s" % (
+            n_actors, rate, rate / base_rate, traffic / max(updates, 1),
+            "-" if solve_ts is None else "%.1f" % solve_ts,
+            "-" if solve_updates is None else "%d" % solve_updates))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import os
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+import gym
+import numpy as np
+import torch
+import torch.optim as optim
+
+from lib import cross_entropy, inference, policy_server
+
+
+BENCH_SECONDS = 2.0
+HOT_SWAP_INTERVAL = 0.01
+
+
+def actor_loop(act, seconds, seed):
+    """
+    One rollout actor: steps its own env with actions from act(obs) for
+    seconds, returns the latency of every act() call
+    """
+    env = cross_entropy.make_env()
+    env.seed(seed)
+    latencies = []
+    obs = env.reset()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ts = time.perf_counter()
+        action = act(obs)
+        latencies.append(time.perf_counter() - ts)
+        obs, _, done, _ = env.step(action)
+        if done:
+            obs = env.reset()
+    return np.array(latencies)
+
+
+def socket_actor(path, seconds, seed, results):
+    client = policy_server.UnixPolicyClient(path)
+    results.put(actor_loop(client.act, seconds, seed))
+    client.close()
+
+
+def direct_act(policy):
+    rng = np.random.default_rng()
+
+    def act(obs):
+        act_probs = policy(torch.from_numpy(obs).unsqueeze(0)).numpy()
+        return int(cross_entropy.sample_actions(act_probs, rng)[0])
+    return act
+
+
+def run_threads(act, actors, seconds):
+    results = [None] * actors
+
+    def run(i):
+        results[i] = actor_loop(act, seconds, i)
+    threads = [threading.Thread(target=run, args=(i, )) for i in range(actors)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def run_processes(path, actors, seconds):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=socket_actor, args=(path, seconds, i, results))
+             for i in range(actors)]
+    for p in procs:
+        p.start()
+    latencies = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return latencies
+
+
+def hot_swapper(net, server, stop):
+    """
+    Stand-in learner: an optimizer step on random data, then a weight swap
+    """
+    optimizer = optim.Adam(net.parameters(), lr=cross_entropy.LEARNING_RATE)
+    obs_v = torch.eye(net.net[0].in_features)
+    acts_v = torch.randint(net.net[-1].out_features, (len(obs_v), ))
+    while not stop.wait(HOT_SWAP_INTERVAL):
+        optimizer.zero_grad()
+        torch.nn.functional.cross_entropy(net(obs_v), acts_v).backward()
+        optimizer.step()
+        server.refresh()
+
+
+def report(name, actors, latencies, seconds, mean_batch=None):
+    lat = np.concatenate(latencies) * 1e6
+    p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+    print("%-8s actors=%3d: %8.0f req/s, latency p50=%7.0fus p90=%7.0fus p99=%7.0fus%s" % (
+        name, actors, len(lat) / seconds, p50, p90, p99,
+        "" if mean_batch is None else ", mean batch %.1f" % mean_batch))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--actors", default="1,4,16,64", help="Comma separated actor counts")
+    parser.add_argument("--transport", default="inproc", choices=["inproc", "unix"],
+                        help="Actor threads calling the server directly or actor processes over a Unix socket")
+    parser.add_argument("--max-batch", type=int, default=policy_server.MAX_BATCH)
+    parser.add_argument("--max-wait", type=float, default=policy_server.MAX_WAIT, help="Seconds")
+    parser.add_argument("--policy", default="script", choices=inference.MODES)
+    parser.add_argument("--no-swap", default=False, action="store_true",
+                        help="Don't hot-swap weights from a concurrent learner")
+    parser.add_argument("--seconds", type=float, default=BENCH_SECONDS)
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+    torch.set_num_threads(1)
+
+    env, net, _ = cross_entropy.make_trainer(seed=0)
+    obs_size = env.observation_space.shape[0]
+    for actors in map(int, args.actors.split(",")):
+        if args.transport == "inproc":
+            direct = direct_act(inference.RolloutPolicy(net, args.policy))
+            report("direct", actors, run_threads(direct, actors, args.seconds), args.seconds)
+
+        server = policy_server.PolicyServer(inference.RolloutPolicy(net, args.policy), max_batch=args.max_batch,
+                                            max_wait=args.max_wait)
+        stop = threading.Event()
+        swapper = None
+        if not args.no_swap:
+            swapper = threading.Thread(target=hot_swapper, args=(net, server, stop))
+            swapper.start()
+        if args.transport == "inproc":
+            latencies = run_threads(server.act, actors, args.seconds)
+        else:
+            path = os.path.join(tempfile.mkdtemp(), "policy.sock")
+            sock_server = policy_server.UnixPolicyServer(path, server, obs_size)
+            sock_server.start()
+            latencies = run_processes(path, actors, args.seconds)
+            sock_server.shutdown()
+            sock_server.server_close()
+            os.unlink(path)
+        stop.set()
+        if swapper is not None:
+            swapper.join()
+        server.close()
+        report("server", actors, latencies, args.seconds, server.mean_batch)
+        if swapper is not None:
+            print("    %d weight swaps during the run" % server.refreshes)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+import gym
+import numpy as np
+
+from lib import cross_entropy, vector_env, reuse
+
+
+EVAL_EPISODES = 1000
+MAX_ITERS = 500
+# greedy optimum on the slippery map is ~0.74, see hogwild_q_learning.py
+SLIPPERY_TARGET = 0.7
+
+
+def run(slippery, batch_size, history, truncate, seed, target, eval_episodes, max_iters):
+    """
+    Trains until the stochastic policy's mean reward over eval_episodes
+    fresh episodes reaches target. history=0 is cross_entropy.train.
+    Returns iterations, training episodes and seconds, or None if unsolved.
+    """
+    env, net, optimizer = cross_entropy.make_trainer(slippery=slippery, seed=seed)
+    n_states = env.observation_space.shape[0]
+    eval_env = vector_env.FrozenLakeVectorEnv(env, eval_episodes, seed=seed)
+    if history:
+        steps = reuse.train(env, net, optimizer, batch_size=batch_size, history=history,
+                            truncate=truncate)
+    else:
+        steps = cross_entropy.train(env, net, optimizer, batch_size=batch_size)
+    ts = time.time()
+    for step in steps:
+        policy = vector_env.stochastic_policy(cross_entropy.policy_table(net, n_states), eval_env.rng)
+        if eval_env.play_episodes(policy, eval_episodes)[0].mean() >= target:
+            return step.iter_no + 1, (step.iter_no + 1) * batch_size, time.time() - ts
+        if step.iter_no + 1 >= max_iters:
+            return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--configs", default="100:0,10:0,10:400",
+                        help="Comma-separated batch_size:history pairs, history 0 is the plain loop")
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Use the deterministic map")
+    parser.add_argument("--truncate", type=float, default=reuse.TRUNCATE_IS, help="Importance weight cap")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--target", type=float, help="Eval mean reward counted as solved, default %.2f "
+                        "on the slippery map, %.2f on the deterministic one" % (SLIPPERY_TARGET,
+                                                                                 cross_entropy.SOLVE_REWARD))
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--max-iters", type=int, default=MAX_ITERS)
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+    target = args.target or (cross_entropy.SOLVE_REWARD if args.nonslippery else SLIPPERY_TARGET)
+
+    print("batch  history  solved  iters  episodes  seconds")
+    for config in args.configs.split(","):
+        batch_size, history = map(int, config.split(":"))
+        results = [run(not args.nonslippery, batch_size, history, args.truncate, seed, target, args.eval_episodes,
+                       args.max_iters) for seed in range(args.seeds)]
+        solved = np.array([r for r in results if r is not None]).reshape(-1, 3)
+        if not len(solved):
+            print("%5d %8d %4d/%d %6s %9s %8s" % (batch_size, history, 0, args.seeds, "-", "-", "-"))
+            continue
+        iters, episodes, seconds = np.median(solved, axis=0)
+        print("%5d %8d %4d/%d %6.0f %9.0f %8.1f" % (batch_size, history, len(solved), args.seeds, iters,
+                                                     episodes, seconds))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+import gym
+import numpy as np
+
+from lib import cross_entropy, vector_env, tabular_ce
+
+
+EVAL_EPISODES = 1000
+ENV_WIDTH = 64
+MAX_SECONDS = 120
+
+
+def time_to_target(steps, probs_fn, eval_env, target, eval_episodes, max_seconds):
+    """
+    Runs a TrainStep generator until the stochastic policy of probs_fn()
+    averages target over eval_episodes fresh episodes. Only the training
+    steps are timed. Returns (iterations, training seconds) or None.
+    """
+    elapsed = 0.0
+    steps = iter(steps)
+    while elapsed < max_seconds:
+        ts = time.time()
+        step = next(steps)
+        elapsed += time.time() - ts
+        policy = vector_env.stochastic_policy(probs_fn(), eval_env.rng)
+        if eval_env.play_episodes(policy, eval_episodes)[0].mean() >= target:
+            return step.iter_no + 1, elapsed
+    return None
+
+
+def run_net(slippery, map_name, seed, target, eval_episodes, max_seconds, batch_size):
+    env, net, optimizer = cross_entropy.make_trainer(slippery=slippery, seed=seed, map_name=map_name)
+    n_states = env.observation_space.shape[0]
+    eval_env = tabular_ce.make_vec_env(slippery, map_name, seed=seed)
+    rollout_env = vector_env.FrozenLakeVectorEnv(env, ENV_WIDTH, max_episode_steps=eval_env.max_episode_steps,
+                                                 seed=seed)
+    steps = cross_entropy.train(env, net, optimizer, batch_size=batch_size, vec_env=rollout_env)
+    return time_to_target(steps, lambda: cross_entropy.policy_table(net, n_states), eval_env, target,
+                          eval_episodes, max_seconds)
+
+
+def run_table(slippery, map_name, seed, target, eval_episodes, max_seconds, batch_size):
+    vec_env = tabular_ce.make_vec_env(slippery, map_name, seed=seed)
+    eval_env = tabular_ce.make_vec_env(slippery, map_name, seed=seed + 1)
+    table = tabular_ce.TabularPolicy(vec_env.n_states, vec_env.n_actions)
+    steps = tabular_ce.train(vec_env, table, batch_size=batch_size)
+    return time_to_target(steps, lambda: table.probs, eval_env, target, eval_episodes, max_seconds)
+
+
+ENGINES = {
+    "net": run_net,
+    "table": run_table,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--maps", default="4x4,8x8", help="Comma-separated built-in maps")
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Use the deterministic maps")
+    parser.add_argument("--target", type=float, default=cross_entropy.SOLVE_REWARD,
+                        help="Eval mean reward counted as solved")
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=cross_entropy.BATCH_SIZE)
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="Training time limit per run")
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+
+    print("map  engine  solved  iters  seconds")
+    for map_name in args.maps.split(","):
+        for name, run in sorted(ENGINES.items()):
+            results = [run(not args.nonslippery, map_name, seed, args.target, args.eval_episodes, args.max_seconds,
+                           args.batch_size) for seed in range(args.seeds)]
+            solved = [r for r in results if r is not None]
+            if not solved:
+                print("%s %7s %4d/%d %6s %8s" % (map_name, name, 0, args.seeds, "-", "-"))
+                continue
+            iters, seconds = np.median(np.array(solved), axis=0)
+            print("%s %7s %4d/%d %6.0f %8.2f" % (map_name, name, len(solved), args.seeds, iters, seconds))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import functools
+
+import gym
+
+from lib import cross_entropy, vector_env, subproc_env
+
+
+BENCH_SECONDS = 2.0
+STEP_COSTS = (0.0, 1e-4, 1e-3)
+
+
+class SlowEnv(gym.Wrapper):
+    """
+    Stand-in for an expensive simulator: every step costs an extra cost
+    seconds, spent spinning (CPU bound) or sleeping (I/O bound)
+    """
+    def __init__(self, env, cost, busy=True):
+        super(SlowEnv, self).__init__(env)
+        self.cost = cost
+        self.busy = busy
+
+    def step(self, action):
+        if self.busy:
+            deadline = time.perf_counter() + self.cost
+            while time.perf_counter() < deadline:
+                pass
+        elif self.cost:
+            time.sleep(self.cost)
+        return self.env.step(action)
+
+
+def make_slow_env(cost, busy):
+    env = gym.make("FrozenLake-v0")
+    return cross_entropy.DiscreteOneHotWrapper(SlowEnv(env, cost, busy))
+
+
+def rollout_rate(batches, seconds):
+    next(batches)
+    steps, ts = 0, time.perf_counter()
+    while time.perf_counter() - ts < seconds:
+        steps += sum(len(e.steps) for e in next(batches))
+    return steps / (time.perf_counter() - ts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--workers", default="1,2,4", help="Comma separated subprocess worker counts")
+    parser.add_argument("--width", type=int, default=16, help="Envs stepped side by side")
+    parser.add_argument("--sleep", default=False, action="store_true",
+                        help="Simulated step cost sleeps instead of spinning")
+    parser.add_argument("--seconds", type=float, default=BENCH_SECONDS)
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+    busy = not args.sleep
+
+    _, net, _ = cross_entropy.make_trainer(seed=0)
+    batch_size = cross_entropy.BATCH_SIZE // 10
+    for cost in STEP_COSTS:
+        env_fn = functools.partial(make_slow_env, cost, busy)
+        rates = [("gym", rollout_rate(cross_entropy.iterate_batches(env_fn(), net, batch_size), args.seconds))]
+        if not cost:
+            vec_env = vector_env.FrozenLakeVectorEnv(env_fn(), args.width, seed=0)
+            rates.append(("native", rollout_rate(cross_entropy.iterate_batches_vec(vec_env, net, batch_size),
+                                                 args.seconds)))
+        for workers in map(int, args.workers.split(",")):
+            with subproc_env.SubprocVectorEnv([env_fn] * args.width, n_workers=workers, seed=0) as vec_env:
+                batches = cross_entropy.iterate_batches_vec(vec_env, net, batch_size)
+                rates.append(("subproc x%d" % workers, rollout_rate(batches, args.seconds)))
+        print("step cost %.0fus: " % (cost * 1e6) + ", ".join("%s %.0f steps/s" % r for r in rates))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import multiprocessing
+
+import gym
+
+from lib import cross_entropy, distributed
+
+
+MAX_ITERS = 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("role", choices=["local", "coordinator", "worker"],
+                        help="local runs a coordinator and --workers worker processes on this host")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Workers the coordinator waits for")
+    parser.add_argument("--host", default="127.0.0.1", help="Coordinator address (bind address for the coordinator)")
+    parser.add_argument("--port", type=int, default=distributed.PORT)
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Use the deterministic map")
+    parser.add_argument("--batch-size", type=int, default=cross_entropy.BATCH_SIZE,
+                        help="Episodes per iteration over all workers")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--max-iters", type=int, default=MAX_ITERS)
+    args = parser.parse_args()
+    gym.logger.set_level(gym.logger.ERROR)
+
+    if args.role == "worker":
+        distributed.run_worker(args.host, args.port)
+        raise SystemExit
+
+    coordinator = distributed.Coordinator(args.workers, host=args.host, port=args.port,
+                                          slippery=not args.nonslippery, seed=args.seed)
+    procs = []
+    if args.role == "local":
+        for _ in range(args.workers):
+            proc = multiprocessing.Process(target=distributed.run_worker, args=(args.host, coordinator.port))
+            proc.start()
+            procs.append(proc)
+    print("Coordinator on port %d, waiting for %d workers" % (coordinator.port, args.workers))
+
+    ts = time.time()
+    total_sent = total_received = total_raw = 0
+    for step in coordinator.train(batch_size=args.batch_size):
+        total_sent += step.bytes_sent
+        total_received += step.bytes_received
+        total_raw += step.full_batch_bytes
+        print("%d: loss=%s, reward_mean=%.3f, reward_bound=%.3f, elites=%d, net out=%dB in=%dB "
+              "(full batch %dB)" % (step.iter_no, "-" if step.loss is None else "%.3f" % step.loss,
+                                    step.reward_mean, step.reward_bound, step.elites, step.bytes_sent,
+                                    step.bytes_received, step.full_batch_bytes))
+        if step.reward_mean > cross_entropy.SOLVE_REWARD:
+            print("Solved!")
+            break
+        if step.iter_no + 1 >= args.max_iters:
+            break
+    iters = step.iter_no + 1
+    print("%d iterations in %.1fs, per iteration: %.0fB out, %.0fB in, full batches would be %.0fB (%.1f%%)" % (
+        iters, time.time() - ts, total_sent / iters, total_received / iters, total_raw / iters,
+        100.0 * (total_sent + total_received) / max(total_raw, 1)))
+    coordinator.close()
+    for proc in procs:
+        proc.join()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import multiprocessing as mp
+
+import gym
+
+from lib import q_learning, evaluation, vector_env, machine_profile
+
+
+COUNT_EVERY = 100
+EVAL_INTERVAL = 0.5
+MAX_SECONDS = 120
+# the best greedy policy on slippery 4x4 succeeds ~74% of the time, so the
+# 0.80 "solved" mark is only ever reached by evaluation noise
+TARGET_REWARD = 0.7
+
+
+def worker(idx, seed, table_buf, counts, stop, n_states, n_actions):
+    """
+    Owns one env and applies value_update to the shared table without locks.
+    Only this process writes counts[idx].
+    """
+    env = gym.make(q_learning.ENV_NAME)
+    env.seed(seed)
+    env.action_space.seed(seed)
+    agent = q_learning.Agent(env=env, values=q_learning.QTable(n_states, n_actions, table_buf))
+    done_updates = 0
+    while not stop.is_set():
+        for _ in range(COUNT_EVERY):
+            s, a, r, next_s = agent.sample_env()
+            agent.value_update(s, a, r, next_s)
+        done_updates += COUNT_EVERY
+        counts[idx] = done_updates
+
+
+def evaluator(seed, table_buf, counts, stop, n_states, n_actions, target, interval, max_seconds, results):
+    env = gym.make(q_learning.ENV_NAME)
+    vec_env = vector_env.FrozenLakeVectorEnv(env, evaluation.EVAL_BATCH, seed=seed,
+                                             max_episode_steps=env.spec.max_episode_steps)
+    test = evaluation.SequentialEvaluator(target)
+    table = q_learning.QTable(n_states, n_actions, table_buf)
+    start_ts = time.time()
+    solve_ts, solve_updates = None, None
+    while time.time() - start_ts < max_seconds:
+        time.sleep(interval)
+        updates = sum(counts)
+        policy = vector_env.greedy_policy(table.array.copy())
+        res = test.evaluate(lambda n: vec_env.play_episodes(policy, n)[0])
+        if res.solved:
+            solve_ts, solve_updates = time.time() - start_ts, updates
+            break
+    stop.set()
+    elapsed = time.time() - start_ts
+    results.put((elapsed, sum(counts), solve_ts, solve_updates))
+
+
+def run(n_workers, seed, target, interval, max_seconds):
+    env = gym.make(q_learning.ENV_NAME)
+    n_states, n_actions = env.observation_space.n, env.action_space.n
+    table_buf = mp.RawArray('d', n_states * n_actions)
+    counts = mp.RawArray('q', n_workers)
+    stop = mp.Event()
+    results = mp.Queue()
+
+    procs = [mp.Process(target=worker, args=(idx, seed + idx, table_buf, counts, stop, n_states, n_actions))
+             for idx in range(n_workers)]
+    procs.append(mp.Process(target=evaluator, args=(seed, table_buf, counts, stop, n_states, n_actions,
+                                                    target, interval, max_seconds, results)))
+    for p in procs:
+        p.start()
+    res = results.get()
+    for p in procs:
+        p.join()
+    return res
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--workers", help="Comma-separated worker counts to benchmark, default 1 and the "
+                        "tuned workers of the machine profile, or 1,2,4 if untuned")
+    parser.add_argument("--no-profile", default=False, action="store_true",
+                        help="Ignore the machine profile written by autotune.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", type=float, default=TARGET_REWARD,
+                        help="Greedy policy success rate counted as converged")
+    parser.add_argument("--eval-interval", type=float, default=EVAL_INTERVAL,
+                        help="Seconds between greedy policy checks")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="Time limit per run")
+    args = parser.parse_args()
+    profile = {} if args.no_profile else machine_profile.apply("q-learning")
+    if profile:
+        print("Machine profile: threads=%d, workers=%d" % (profile.get("threads", 0), profile.get("workers", 0)))
+
+    base_rate = None
+    print("workers  updates/s  scaling  solve_s  solve_updates")
+    for n_workers in machine_profile.worker_counts(args.workers, profile):
+        elapsed, updates, solve_ts, solve_updates = run(
+            n_workers, args.seed, args.target, args.eval_interval, args.max_seconds)
+        rate = updates / elapsed
+        if base_rate is None:
+            base_rate = rate / n_workers
+        print("%7d %10.0f %7.2fx %8s %14s" % (
+            n_workers, rate, rate / base_rate,
+            "-" if solve_ts is None else "%.1f" % solve_ts,
+            "-" if solve_updates is None else "%d" % solve_updates))
@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+import numpy as np
+
+
+MIN_BATCH = 4
+MAX_BATCH = 400
+START_BATCH = 4
+TARGET_ELITES = 1
+GROW = 1.5
+
+SizeDecision = namedtuple("SizeDecision", field_names=["iter_no", "size", "next_size", "fresh_elites",
+                                                       "reward_std", "reason"])
+
+
+class BatchSizer:
+    """
+    Picks the number of rollout episodes of the next cross-entropy
+    iteration from the last batch. The tweaked loop learns from its kept
+    elites, so a batch only has to bring in a few fresh ones:
+    - no elites at all yet: no step is taken whatever the size, so check
+      back after min_size episodes instead of a full batch;
+    - all discounted rewards equal, usually all zero: the batch carries no
+      ranking, shrink by grow;
+    - no episode of the batch above the reward bound: grow by grow;
+    - otherwise aim for target_elites fresh elites at the observed elite
+      rate, moving halfway (geometrically) towards that size.
+    Sizes stay within [min_size, max_size]; every decision is appended to
+    decisions.
+    """
+    def __init__(self, start=START_BATCH, min_size=MIN_BATCH, max_size=MAX_BATCH, target_elites=TARGET_ELITES,
+                 grow=GROW):
+        assert 1 <= min_size <= start <= max_size
+        self.size = start
+        self.min_size, self.max_size = min_size, max_size
+        self.target_elites = target_elites
+        self.grow = grow
+        self.decisions = []
+        self.episodes = 0
+
+    def batches(self, episodes):
+        """
+        Regroups a stream of episode lists (iterate_batches with
+        batch_size=1) into batches of the current size
+        """
+        batch = []
+        for chunk in episodes:
+            batch.extend(chunk)
+            if len(batch) >= self.size:
+                self.episodes += len(batch)
+                yield batch
+                batch = []
+
+    def update(self, iter_no, disc_rewards, reward_bound, elites):
+        """
+        disc_rewards of the last batch, reward_bound and elites (the kept
+        elite count) as filter_batch left them
+        """
+        disc_rewards = np.asarray(disc_rewards, dtype=np.float64)
+        fresh = int((disc_rewards > reward_bound).sum())
+        reward_std = float(disc_rewards.std())
+        size = len(disc_rewards)
+        if not elites:
+            next_size, reason = self.min_size, "no elites yet"
+        elif reward_std == 0.0:
+            next_size, reason = size / self.grow, "no variance"
+        elif fresh == 0:
+            next_size, reason = size * self.grow, "no elites"
+        else:
+            next_size, reason = np.sqrt(size * size * self.target_elites / fresh), "elite rate %.2f" % (fresh / size)
+        next_size = int(np.clip(round(next_size), self.min_size, self.max_size))
+        decision = SizeDecision(iter_no, size, next_size, fresh, reward_std, reason)
+        self.decisions.append(decision)
+        self.size = next_size
+        return decision
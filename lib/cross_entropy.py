@@ -0,0 +1,269 @@
+import random
+import gym
+import gym.spaces
+import gym.wrappers
+import gym.envs.toy_text.frozen_lake
+from collections import namedtuple
+import numpy as np
+
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from lib.learner import Learner
+from lib.sketch import weighted_percentile
+
+
+HIDDEN_SIZE = 128
+BATCH_SIZE = 100
+PERCENTILE = 30
+GAMMA = 0.9
+LEARNING_RATE = 0.001
+KEEP_ELITES = 500
+SOLVE_REWARD = 0.8
+
+
+class DiscreteOneHotWrapper(gym.ObservationWrapper):
+    def __init__(self, env):
+        super(DiscreteOneHotWrapper, self).__init__(env)
+        assert isinstance(env.observation_space, gym.spaces.Discrete)
+        self.observation_space = gym.spaces.Box(0.0, 1.0, (env.observation_space.n, ), dtype=np.float32)
+
+    def observation(self, observation):
+        res = np.copy(self.observation_space.low)
+        res[observation] = 1.0
+        return res
+
+
+class Net(nn.Module):
+    def __init__(self, obs_size, hidden_size, n_actions):
+        super(Net, self).__init__()
+        self.net = nn.Sequential(
+            nn.Linear(obs_size, hidden_size),
+            nn.ReLU(),
+            nn.Linear(hidden_size, n_actions)
+        )
+
+    def forward(self, x):
+        return self.net(x)
+
+
+Episode = namedtuple('Episode', field_names=['reward', 'steps'])
+EpisodeStep = namedtuple('EpisodeStep', field_names=['observation', 'action'])
+TrainStep = namedtuple('TrainStep', field_names=['iter_no', 'loss', 'reward_mean', 'reward_bound', 'elites'])
+
+
+def make_env(slippery=True, max_episode_steps=100, one_hot=True, map_name="4x4"):
+    """
+    FrozenLake as used by the tweaked (slippery) and the non-slippery scripts;
+    map_name "8x8" is the larger built-in map (200 steps when slippery, as registered)
+    """
+    if slippery:
+        env = gym.make("FrozenLake-v0" if map_name == "4x4" else "FrozenLake%s-v0" % map_name)
+    else:
+        env = gym.envs.toy_text.frozen_lake.FrozenLakeEnv(map_name=map_name, is_slippery=False)
+        env = gym.wrappers.TimeLimit(env, max_episode_steps=max_episode_steps)
+    return DiscreteOneHotWrapper(env) if one_hot else env
+
+
+def episode_limit(env):
+    """
+    max_episode_steps of the TimeLimit in env's wrapper stack, None without one
+    """
+    while isinstance(env, gym.Wrapper):
+        if isinstance(env, gym.wrappers.TimeLimit):
+            return env._max_episode_steps
+        env = env.env
+    return None
+
+
+def set_seed(env, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    env.seed(seed)
+    env.action_space.seed(seed)
+
+
+def iterate_batches(env, net, batch_size, recorder=None, policy=None):
+    """
+    policy, if given, maps an observation batch to action probabilities
+    (e.g. lib.inference.RolloutPolicy) and is used instead of net
+    """
+    batch = []
+    episode_reward = 0.0
+    episode_steps = []
+    obs = env.reset()
+    sm = nn.Softmax(dim=1)
+    while True:
+        obs_v = torch.as_tensor(obs).unsqueeze(0)
+        if policy is None:
+            with torch.no_grad():
+                act_probs_v = sm(net(obs_v))
+        else:
+            act_probs_v = policy(obs_v)
+        act_probs = act_probs_v.numpy()[0]
+        action = np.random.choice(len(act_probs), p=act_probs)
+        next_obs, reward, is_done, _ = env.step(action)
+        episode_reward += reward
+        episode_steps.append(EpisodeStep(observation=obs, action=action))
+        if recorder is not None:
+            recorder.add_step(obs, action, reward)
+        if is_done:
+            if recorder is not None:
+                recorder.end_episode()
+            batch.append(Episode(reward=episode_reward, steps=episode_steps))
+            episode_reward = 0.0
+            episode_steps = []
+            next_obs = env.reset()
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        obs = next_obs
+
+
+def sample_actions(act_probs, rng):
+    """
+    One action per row of an (n, n_actions) probability array
+    """
+    cum_probs = np.cumsum(act_probs, axis=1)
+    cum_probs[:, -1] = np.inf
+    return (rng.random(len(act_probs))[:, None] >= cum_probs).sum(axis=1)
+
+
+def iterate_batches_vec(vec_env, net, batch_size, recorder=None, policy=None):
+    """
+    iterate_batches over a vector env: all copies are stepped with one
+    forward pass. Episodes are yielded in completion order with the same
+    observations as the gym env stack, so filter_batch and train work
+    unchanged. vec_env is a lib.vector_env.FrozenLakeVectorEnv (state
+    indices, one-hot encoded here) or a lib.subproc_env.SubprocVectorEnv.
+    """
+    n_envs = vec_env.n_envs
+    if hasattr(vec_env, "n_states"):
+        eye = np.eye(vec_env.n_states, dtype=np.float32)
+        encode = lambda states: eye[states]
+    else:
+        encode = lambda states: np.array(states, dtype=np.float32)
+    batch = []
+    episode_rewards = np.zeros(n_envs, dtype=np.float64)
+    episode_steps = [[] for _ in range(n_envs)]
+    step_rewards = [[] for _ in range(n_envs)]
+    states = vec_env.reset()
+    sm = nn.Softmax(dim=1)
+    while True:
+        obs = encode(states)
+        obs_v = torch.from_numpy(obs)
+        if policy is None:
+            with torch.no_grad():
+                act_probs_v = sm(net(obs_v))
+        else:
+            act_probs_v = policy(obs_v)
+        actions = sample_actions(act_probs_v.numpy(), vec_env.rng)
+        _, rewards, dones = vec_env.step(actions)
+        states = vec_env.states
+        episode_rewards += rewards
+        for i in range(n_envs):
+            # a copy, a view would keep the whole batch of observations alive
+            episode_steps[i].append(EpisodeStep(observation=obs[i].copy(), action=int(actions[i])))
+            if recorder is not None:
+                step_rewards[i].append(float(rewards[i]))
+        for i in np.flatnonzero(dones):
+            if recorder is not None:
+                for step, reward in zip(episode_steps[i], step_rewards[i]):
+                    recorder.add_step(step.observation, step.action, reward)
+                recorder.end_episode()
+                step_rewards[i] = []
+            batch.append(Episode(reward=float(episode_rewards[i]), steps=episode_steps[i]))
+            episode_rewards[i] = 0.0
+            episode_steps[i] = []
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+
+def filter_batch(batch, percentile, gamma=GAMMA):
+    disc_rewards = list(map(lambda s: s.reward * (gamma ** len(s.steps)), batch))
+    reward_bound = np.percentile(disc_rewards, percentile)
+
+    train_obs = []
+    train_act = []
+    elite_batch = []
+    for example, discounted_reward in zip(batch, disc_rewards):
+        if discounted_reward > reward_bound:
+            train_obs.extend(map(lambda step: step.observation, example.steps))
+            train_act.extend(map(lambda step: step.action, example.steps))
+            elite_batch.append(example)
+
+    return elite_batch, train_obs, train_act, reward_bound
+
+
+def filter_weighted(batch, weights, percentile, gamma=GAMMA):
+    """
+    filter_batch where episode i counts weights[i] times in the percentile,
+    returns (elite indices, reward_bound)
+    """
+    disc_rewards = np.array([e.reward * (gamma ** len(e.steps)) for e in batch])
+    reward_bound = weighted_percentile(disc_rewards, weights, percentile)
+    return np.flatnonzero(disc_rewards > reward_bound), reward_bound
+
+
+def policy_table(net, n_states):
+    """
+    Action probabilities of net for every one-hot state, shape (n_states, n_actions)
+    """
+    with torch.no_grad():
+        probs_v = torch.softmax(net(torch.eye(n_states)), dim=1)
+    return probs_v.numpy().astype(np.float64)
+
+
+def train(env, net, optimizer, batch_size=BATCH_SIZE, percentile=PERCENTILE, gamma=GAMMA,
+          keep_elites=KEEP_ELITES, recorder=None, learner=None, policy=None, vec_env=None,
+          memory=None, sizer=None):
+    """
+    The tweaked cross-entropy loop, yielding one TrainStep per rollout batch.
+    Iterations without elites are yielded with loss=None. learner defaults
+    to one full-batch gradient step per rollout batch; a rollout policy is
+    refreshed after every learner step. With vec_env, rollouts are stepped
+    vec_env.n_envs at a time by iterate_batches_vec. memory, a
+    lib.memory.MemoryMonitor, is updated with the elites after every learner step.
+    sizer, a lib.batch_sizer.BatchSizer, replaces batch_size and resizes
+    every batch from the rewards of the previous one.
+    """
+    if learner is None:
+        learner = Learner(net, optimizer)
+    if sizer is not None:
+        batch_size = 1
+    if vec_env is None:
+        batches = iterate_batches(env, net, batch_size, recorder=recorder, policy=policy)
+    else:
+        batches = iterate_batches_vec(vec_env, net, batch_size, recorder=recorder, policy=policy)
+    if sizer is not None:
+        batches = sizer.batches(batches)
+    full_batch = []
+    for iter_no, batch in enumerate(batches):
+        reward_mean = float(np.mean(list(map(lambda s: s.reward, batch))))
+        full_batch, obs, acts, reward_bound = filter_batch(full_batch + batch, percentile, gamma)
+        if sizer is not None:
+            sizer.update(iter_no, [e.reward * (gamma ** len(e.steps)) for e in batch], reward_bound,
+                         len(full_batch))
+        if not full_batch:
+            yield TrainStep(iter_no, None, reward_mean, reward_bound, 0)
+            continue
+        full_batch = full_batch[-keep_elites:]
+
+        loss = learner.step(obs, acts)
+        if policy is not None:
+            policy.refresh()
+        if memory is not None:
+            memory.update(full_batch, learner)
+        yield TrainStep(iter_no, loss, reward_mean, reward_bound, len(full_batch))
+
+
+def make_trainer(slippery=True, hidden_size=HIDDEN_SIZE, lr=LEARNING_RATE, seed=None, map_name="4x4"):
+    env = make_env(slippery=slippery, map_name=map_name)
+    if seed is not None:
+        set_seed(env, seed)
+    net = Net(env.observation_space.shape[0], hidden_size, env.action_space.n)
+    optimizer = optim.Adam(params=net.parameters(), lr=lr)
+    return env, net, optimizer
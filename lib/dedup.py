@@ -0,0 +1,114 @@
+import struct
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+
+from lib import cross_entropy
+from lib.learner import Learner
+
+
+CountedEpisode = namedtuple("CountedEpisode", field_names=["reward", "steps", "copies", "key"])
+DedupStep = namedtuple("DedupStep", field_names=cross_entropy.TrainStep._fields + ("distinct", ))
+
+
+def episode_key(episode):
+    """
+    128-bit digest of an episode's reward, observations and actions
+    """
+    h = hashlib.blake2b(struct.pack("!d", episode.reward), digest_size=16)
+    for step in episode.steps:
+        h.update(step.observation.tobytes())
+        h.update(struct.pack("!q", int(step.action)))
+    return h.digest()
+
+
+def merge_counted(runs, batch):
+    """
+    Appends the episodes of batch to a run-length CountedEpisode list kept
+    in arrival order: consecutive copies of one episode share a run and
+    every run of an episode shares its first step list, so the list holds
+    each copy at the position it has in the plain loop.
+    """
+    runs = list(runs)
+    known = {e.key: e.steps for e in runs}
+    for episode in batch:
+        if isinstance(episode, CountedEpisode):
+            key, copies = episode.key, episode.copies
+        else:
+            key, copies = episode_key(episode), 1
+        if runs and runs[-1].key == key:
+            runs[-1] = runs[-1]._replace(copies=runs[-1].copies + copies)
+            continue
+        steps = known.setdefault(key, episode.steps)
+        runs.append(CountedEpisode(episode.reward, steps, copies, key))
+    return runs
+
+
+def collapse_runs(runs):
+    """
+    One CountedEpisode per distinct episode with the copies of all its runs
+    """
+    counted = {}
+    for run in runs:
+        prev = counted.get(run.key)
+        counted[run.key] = run if prev is None else prev._replace(copies=prev.copies + run.copies)
+    return list(counted.values())
+
+
+def trim_copies(episodes, keep):
+    """
+    The newest keep copies of a CountedEpisode list, cutting the copies of the boundary episode
+    """
+    kept, total = [], 0
+    for episode in reversed(episodes):
+        if total >= keep:
+            break
+        take = min(episode.copies, keep - total)
+        kept.append(episode if take == episode.copies else episode._replace(copies=take))
+        total += take
+    return kept[::-1]
+
+
+def train(env, net, optimizer, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+          gamma=cross_entropy.GAMMA, keep_elites=cross_entropy.KEEP_ELITES, recorder=None, learner=None,
+          policy=None, vec_env=None, memory=None):
+    """
+    cross_entropy.train with every episode stored once with a count. Batches
+    are hashed as they arrive, identical episodes collapse into one
+    CountedEpisode, the percentile is weighted by the counts and the loss
+    by the count of each step's episode, so the multiset the original loop
+    works on is unchanged. keep_elites still counts copies, trimmed from
+    the oldest copies as in the original loop.
+    """
+    if learner is None:
+        learner = Learner(net, optimizer)
+    if vec_env is None:
+        batches = cross_entropy.iterate_batches(env, net, batch_size, recorder=recorder, policy=policy)
+    else:
+        batches = cross_entropy.iterate_batches_vec(vec_env, net, batch_size, recorder=recorder, policy=policy)
+    full_batch = []
+    for iter_no, batch in enumerate(batches):
+        reward_mean = float(np.mean(list(map(lambda s: s.reward, batch))))
+        candidates = merge_counted(full_batch, batch)
+        elite_idx, reward_bound = cross_entropy.filter_weighted(
+            candidates, [e.copies for e in candidates], percentile, gamma)
+        elites = [candidates[i] for i in elite_idx]
+        if not elites:
+            full_batch = []
+            yield DedupStep(iter_no, None, reward_mean, reward_bound, 0, 0)
+            continue
+
+        # the learner sees every elite, only the buffer kept for the next batch is trimmed
+        distinct = collapse_runs(elites)
+        obs = [s.observation for e in distinct for s in e.steps]
+        acts = [s.action for e in distinct for s in e.steps]
+        weights = np.repeat([e.copies for e in distinct], [len(e.steps) for e in distinct])
+        loss = learner.step(obs, acts, weights)
+        full_batch = trim_copies(elites, keep_elites)
+        kept = collapse_runs(full_batch)
+        if policy is not None:
+            policy.refresh()
+        if memory is not None:
+            memory.update(kept, learner)
+        yield DedupStep(iter_no, loss, reward_mean, reward_bound, sum(e.copies for e in kept), len(kept))
@@ -0,0 +1,45 @@
+import numpy as np
+
+import torch
+import torch.nn.functional as F
+import torch.optim as optim
+
+from lib import q_learning, solver
+
+
+DISTILL_STEPS = 100
+DISTILL_LR = 0.01
+TEMPERATURE = 0.02
+AGENT_STEPS = 20000
+
+
+def q_from_solver(env, gamma=q_learning.GAMMA):
+    return solver.value_iteration(solver.build_mdp(env), gamma).q
+
+
+def q_from_agent(env, steps=AGENT_STEPS, gamma=q_learning.GAMMA, alpha=q_learning.ALPHA):
+    """
+    Q-table learned by the sampling Agent on env (raw discrete observations)
+    """
+    agent = q_learning.make_table_agent(env, gamma=gamma, alpha=alpha)
+    for _ in range(steps):
+        agent.value_update(*agent.sample_env())
+    return q_learning.q_table(agent)
+
+
+def distill(net, q, temperature=TEMPERATURE, steps=DISTILL_STEPS, lr=DISTILL_LR):
+    """
+    Fits net on one-hot states to softmax(q / temperature) with full-batch
+    soft cross-entropy. Uses its own optimizer, so the trainer's optimizer
+    state is untouched. Returns the final loss.
+    """
+    n_states = q.shape[0]
+    obs_v = torch.eye(n_states)
+    target_v = torch.softmax(torch.tensor(np.asarray(q) / temperature, dtype=torch.float32), dim=1)
+    optimizer = optim.Adam(net.parameters(), lr=lr)
+    for _ in range(steps):
+        optimizer.zero_grad()
+        loss_v = -(target_v * F.log_softmax(net(obs_v), dim=1)).sum(dim=1).mean()
+        loss_v.backward()
+        optimizer.step()
+    return loss_v.item()
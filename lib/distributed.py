@@ -0,0 +1,278 @@
+import json
+import zlib
+import socket
+import struct
+import collections
+
+import numpy as np
+import torch
+
+from lib import cross_entropy
+from lib.learner import Learner
+from lib.sketch import QuantileSketch
+from lib.policy_server import recv_exact
+
+PORT = 7740
+FRAME = struct.Struct("!BI")
+MSG_CONFIG, MSG_WEIGHTS, MSG_SKETCH, MSG_BOUND, MSG_EPISODES, MSG_STOP = range(6)
+WEIGHTS_FULL, WEIGHTS_DELTA = 0, 1
+EPISODE_HEADER = struct.Struct("!Hf")
+
+DistStep = collections.namedtuple("DistStep", field_names=[
+    "iter_no", "loss", "reward_mean", "reward_bound", "elites", "bytes_sent", "bytes_received", "full_batch_bytes"])
+
+
+def send_frame(sock, kind, payload=b""):
+    sock.sendall(FRAME.pack(kind, len(payload)) + payload)
+    return FRAME.size + len(payload)
+
+
+def recv_frame(sock):
+    """
+    Returns (kind, payload, frame bytes)
+    """
+    header = recv_exact(sock, FRAME.size)
+    if header is None:
+        raise ConnectionError("peer closed the connection")
+    kind, size = FRAME.unpack(header)
+    payload = recv_exact(sock, size) if size else b""
+    return kind, payload, FRAME.size + size
+
+
+def encode_episodes(episodes):
+    """
+    Compact form of one-hot FrozenLake episodes: a (length, reward) header
+    per episode, then uint16 state indices and uint8 actions, all zlib'ed
+    """
+    headers = b"".join(EPISODE_HEADER.pack(len(e.steps), e.reward) for e in episodes)
+    states = np.array([np.argmax(s.observation) for e in episodes for s in e.steps], dtype=">u2")
+    actions = np.array([s.action for e in episodes for s in e.steps], dtype=np.uint8)
+    return zlib.compress(struct.pack("!I", len(episodes)) + headers + states.tobytes() + actions.tobytes())
+
+
+def decode_episodes(data, n_states):
+    data = zlib.decompress(data)
+    count = struct.unpack_from("!I", data)[0]
+    offset = 4
+    lengths, rewards = [], []
+    for _ in range(count):
+        length, reward = EPISODE_HEADER.unpack_from(data, offset)
+        offset += EPISODE_HEADER.size
+        lengths.append(length)
+        rewards.append(reward)
+    total = sum(lengths)
+    states = np.frombuffer(data, dtype=">u2", count=total, offset=offset)
+    actions = np.frombuffer(data, dtype=np.uint8, count=total, offset=offset + 2 * total)
+    eye = np.eye(n_states, dtype=np.float32)
+    episodes, pos = [], 0
+    for length, reward in zip(lengths, rewards):
+        steps = [cross_entropy.EpisodeStep(observation=eye[states[i]], action=int(actions[i]))
+                 for i in range(pos, pos + length)]
+        episodes.append(cross_entropy.Episode(reward=float(reward), steps=steps))
+        pos += length
+    return episodes
+
+
+def raw_nbytes(steps, n_states):
+    """
+    Size of steps shipped as they are held in memory: float32 one-hot
+    observation plus int64 action, the baseline for the traffic reports
+    """
+    return steps * (n_states * 4 + 8)
+
+
+class WeightCodec:
+    """
+    Weight broadcast as int8 deltas. The sender keeps the weights the
+    receivers hold (shadow); every update sends round((net - shadow) / scale)
+    with a per-tensor scale, zlib'ed, and applies the same quantized step to
+    shadow, so quantization error is carried into the next delta instead of
+    accumulating. The first message carries the full float32 weights.
+    """
+    def __init__(self, net):
+        self.params = list(net.parameters())
+        self.shadow = None
+
+    def encode(self):
+        current = [p.detach().numpy().astype(np.float32) for p in self.params]
+        if self.shadow is None:
+            self.shadow = [c.copy() for c in current]
+            return bytes([WEIGHTS_FULL]) + zlib.compress(b"".join(c.tobytes() for c in current))
+        scales, chunks = [], []
+        for cur, shadow in zip(current, self.shadow):
+            delta = cur - shadow
+            scale = np.float32(max(np.abs(delta).max(), 1e-12) / 127.0)
+            q = np.clip(np.round(delta / scale), -127, 127).astype(np.int8)
+            shadow += q.astype(np.float32) * scale
+            scales.append(scale)
+            chunks.append(q.tobytes())
+        return bytes([WEIGHTS_DELTA]) + zlib.compress(np.array(scales, dtype=np.float32).tobytes() + b"".join(chunks))
+
+
+def apply_weights(net, data):
+    """
+    Receiver side of WeightCodec, updates net in place
+    """
+    kind, data = data[0], zlib.decompress(data[1:])
+    params = list(net.parameters())
+    with torch.no_grad():
+        if kind == WEIGHTS_FULL:
+            offset = 0
+            for p in params:
+                n = p.nelement()
+                p.copy_(torch.from_numpy(np.frombuffer(data, dtype=np.float32, count=n, offset=offset).copy())
+                        .view_as(p))
+                offset += 4 * n
+            return
+        scales = np.frombuffer(data, dtype=np.float32, count=len(params))
+        offset = 4 * len(params)
+        for p, scale in zip(params, scales):
+            n = p.nelement()
+            q = np.frombuffer(data, dtype=np.int8, count=n, offset=offset)
+            shadow = p.detach().numpy().reshape(-1)
+            shadow += q.astype(np.float32) * scale
+            offset += n
+
+
+def elite_step(learner, full_batch, full_disc, batch, disc, reward_bound, keep_elites):
+    """
+    The coordinator's half of filter_batch and train: the kept elites still
+    above reward_bound followed by the batch (already above it, workers
+    filter), one learner step on all of them, then the last keep_elites are
+    kept. Returns (loss or None, full_batch, full_disc).
+    """
+    keep = full_disc > reward_bound
+    full_batch = [e for e, k in zip(full_batch, keep) if k] + batch
+    full_disc = np.concatenate((full_disc[keep], disc))
+    loss = None
+    if full_batch:
+        obs = [s.observation for e in full_batch for s in e.steps]
+        acts = [s.action for e in full_batch for s in e.steps]
+        loss = learner.step(obs, acts)
+    return loss, full_batch[-keep_elites:], full_disc[-keep_elites:]
+
+
+class Coordinator:
+    """
+    Cross-entropy coordinator for n_workers TCP workers. Per iteration:
+    broadcast the weights with the episode quota, merge the workers'
+    discounted-reward sketches with the kept elites into the global
+    percentile, send the bound back and train on the episodes above it,
+    which are the only ones the workers ship.
+    """
+    def __init__(self, n_workers, host="", port=PORT, slippery=True, hidden_size=cross_entropy.HIDDEN_SIZE,
+                 lr=cross_entropy.LEARNING_RATE, gamma=cross_entropy.GAMMA, seed=None):
+        self.env, self.net, self.optimizer = cross_entropy.make_trainer(slippery=slippery, hidden_size=hidden_size,
+                                                                        lr=lr, seed=seed)
+        self.n_states = self.env.observation_space.shape[0]
+        self.codec = WeightCodec(self.net)
+        self.listener = socket.create_server((host, port))
+        self.port = self.listener.getsockname()[1]
+        self.gamma = gamma
+        self.config = {"slippery": slippery, "hidden_size": hidden_size, "gamma": gamma, "seed": seed}
+        self.n_workers = n_workers
+        self.socks = []
+
+    def accept(self):
+        while len(self.socks) < self.n_workers:
+            sock, _ = self.listener.accept()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            config = dict(self.config, worker=len(self.socks))
+            send_frame(sock, MSG_CONFIG, json.dumps(config).encode())
+            self.socks.append(sock)
+
+    def gather(self, expected):
+        frames = []
+        received = 0
+        for sock in self.socks:
+            kind, payload, size = recv_frame(sock)
+            assert kind == expected, "unexpected message %d" % kind
+            frames.append(payload)
+            received += size
+        return frames, received
+
+    def train(self, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+              keep_elites=cross_entropy.KEEP_ELITES, learner=None):
+        if learner is None:
+            learner = Learner(self.net, self.optimizer)
+        self.accept()
+        quotas = [batch_size // self.n_workers + (i < batch_size % self.n_workers) for i in range(self.n_workers)]
+        full_batch, full_disc = [], np.zeros(0)
+        iter_no = 0
+        while True:
+            weights = self.codec.encode()
+            sent = sum(send_frame(sock, MSG_WEIGHTS, struct.pack("!I", quota) + weights)
+                       for sock, quota in zip(self.socks, quotas))
+
+            frames, received = self.gather(MSG_SKETCH)
+            sketch = QuantileSketch.from_values(full_disc)
+            reward_sum, steps = 0.0, 0
+            for payload in frames:
+                worker_reward, worker_steps = struct.unpack_from("!dI", payload)
+                reward_sum += worker_reward
+                steps += worker_steps
+                sketch.merge(QuantileSketch.from_bytes(payload[12:]))
+            reward_bound = sketch.percentile(percentile)
+            sent += sum(send_frame(sock, MSG_BOUND, struct.pack("!d", reward_bound)) for sock in self.socks)
+
+            frames, size = self.gather(MSG_EPISODES)
+            received += size
+            batch = [e for payload in frames for e in decode_episodes(payload, self.n_states)]
+            disc = np.array([e.reward * (self.gamma ** len(e.steps)) for e in batch])
+            loss, full_batch, full_disc = elite_step(learner, full_batch, full_disc, batch, disc, reward_bound,
+                                                     keep_elites)
+            yield DistStep(iter_no, loss, reward_sum / batch_size, reward_bound, len(full_batch), sent, received,
+                           raw_nbytes(steps, self.n_states))
+            iter_no += 1
+
+    def close(self):
+        for sock in self.socks:
+            try:
+                send_frame(sock, MSG_STOP)
+            except OSError:
+                pass
+            sock.close()
+        self.listener.close()
+
+
+def run_worker(host, port=PORT):
+    """
+    Worker loop: rolls out its episode quota with the broadcast weights,
+    answers with a sketch of the discounted rewards, then ships the episodes
+    above the global bound. Returns when the coordinator stops.
+    """
+    sock = socket.create_connection((host, port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    kind, payload, _ = recv_frame(sock)
+    assert kind == MSG_CONFIG
+    config = json.loads(payload)
+    env = cross_entropy.make_env(slippery=config["slippery"])
+    if config["seed"] is not None:
+        cross_entropy.set_seed(env, config["seed"] + 1 + config["worker"])
+    net = cross_entropy.Net(env.observation_space.shape[0], config["hidden_size"], env.action_space.n)
+    gamma = config["gamma"]
+    batches, quota = None, None
+    try:
+        while True:
+            kind, payload, _ = recv_frame(sock)
+            if kind == MSG_STOP:
+                return
+            new_quota = struct.unpack_from("!I", payload)[0]
+            apply_weights(net, payload[4:])
+            if new_quota != quota:
+                quota = new_quota
+                batches = cross_entropy.iterate_batches(env, net, quota)
+            batch = next(batches)
+            disc = np.array([e.reward * (gamma ** len(e.steps)) for e in batch])
+            summary = struct.pack("!dI", sum(e.reward for e in batch), sum(len(e.steps) for e in batch))
+            send_frame(sock, MSG_SKETCH, summary + QuantileSketch.from_values(disc).to_bytes())
+
+            kind, payload, _ = recv_frame(sock)
+            if kind == MSG_STOP:
+                return
+            reward_bound = struct.unpack("!d", payload)[0]
+            send_frame(sock, MSG_EPISODES, encode_episodes([e for e, d in zip(batch, disc) if d > reward_bound]))
+    except ConnectionError:
+        return
+    finally:
+        sock.close()
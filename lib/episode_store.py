@@ -0,0 +1,188 @@
+import os
+import json
+import numpy as np
+
+
+CHUNK_STEPS = 65536
+META_FILE = "meta.json"
+OBS_FILE = "observations.bin"
+ACTIONS_FILE = "actions.bin"
+REWARDS_FILE = "rewards.bin"
+ENDS_FILE = "episode_ends.bin"
+
+
+class EpisodeWriter:
+    """
+    Appends episodes to a directory of flat columnar files: observations,
+    actions (int32), rewards (float32) and the cumulative step count at the
+    end of every episode (int64). Steps are buffered and written in chunks;
+    meta.json only ever counts complete, flushed episodes, so readers see a
+    consistent prefix while the writer runs.
+
+    With discrete=True one-hot observations are stored as int32 state indices.
+    """
+    def __init__(self, path, obs_shape, obs_dtype=np.float32, discrete=False, chunk_steps=CHUNK_STEPS):
+        self.path = path
+        self.discrete = discrete
+        self.obs_shape = () if discrete else tuple(obs_shape)
+        self.obs_dtype = np.dtype(np.int32 if discrete else obs_dtype)
+        self.n_states = int(np.prod(obs_shape)) if discrete else None
+        os.makedirs(path, exist_ok=True)
+
+        self.steps, self.episodes = 0, 0
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            assert meta["discrete"] == discrete and tuple(meta["obs_shape"]) == self.obs_shape
+            self.steps, self.episodes = meta["steps"], meta["episodes"]
+        # drop anything past the last complete episode
+        for name, itemsize, count in ((OBS_FILE, self.obs_dtype.itemsize * int(np.prod(self.obs_shape)), self.steps),
+                                      (ACTIONS_FILE, 4, self.steps), (REWARDS_FILE, 4, self.steps),
+                                      (ENDS_FILE, 8, self.episodes)):
+            with open(os.path.join(path, name), "ab") as f:
+                f.truncate(itemsize * count)
+        self.files = [open(os.path.join(path, name), "ab")
+                      for name in (OBS_FILE, ACTIONS_FILE, REWARDS_FILE, ENDS_FILE)]
+
+        self.chunk_steps = chunk_steps
+        self.obs_buf = np.zeros((chunk_steps, ) + self.obs_shape, dtype=self.obs_dtype)
+        self.actions_buf = np.zeros(chunk_steps, dtype=np.int32)
+        self.rewards_buf = np.zeros(chunk_steps, dtype=np.float32)
+        self.ends = []
+        self.buffered = 0
+        self.written = self.steps
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the chunk buffers
+        """
+        return self.obs_buf.nbytes + self.actions_buf.nbytes + self.rewards_buf.nbytes + 8 * len(self.ends)
+
+    @property
+    def bytes_per_step(self):
+        """
+        Stored bytes per step, episode ends included
+        """
+        if not self.steps:
+            return self.obs_buf[0].nbytes + 8
+        return self.obs_buf[0].nbytes + 8 + 8.0 * self.episodes / self.steps
+
+    def add_step(self, obs, action, reward):
+        if self.buffered == self.chunk_steps:
+            self.flush()
+        idx = self.buffered
+        self.obs_buf[idx] = np.argmax(obs) if self.discrete else obs
+        self.actions_buf[idx] = action
+        self.rewards_buf[idx] = reward
+        self.buffered += 1
+
+    def end_episode(self):
+        self.ends.append(self.written + self.buffered)
+
+    def _write_chunk(self):
+        n = self.buffered
+        self.obs_buf[:n].tofile(self.files[0])
+        self.actions_buf[:n].tofile(self.files[1])
+        self.rewards_buf[:n].tofile(self.files[2])
+        self.written += n
+        self.buffered = 0
+
+    def flush(self):
+        self._write_chunk()
+        if self.ends:
+            np.array(self.ends, dtype=np.int64).tofile(self.files[3])
+            self.steps = self.ends[-1]
+            self.episodes += len(self.ends)
+            self.ends = []
+        for f in self.files:
+            f.flush()
+        meta = {"steps": self.steps, "episodes": self.episodes, "discrete": self.discrete,
+                "n_states": self.n_states, "obs_shape": list(self.obs_shape), "obs_dtype": self.obs_dtype.str}
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        self.flush()
+        for f in self.files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class EpisodeReader:
+    """
+    Memory-mapped view of an EpisodeWriter directory. Nothing is loaded up
+    front; slices are paged in by the OS as they are touched.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.n_steps = self.meta["steps"]
+        self.n_episodes = self.meta["episodes"]
+        self.discrete = self.meta["discrete"]
+        self.n_states = self.meta["n_states"]
+        obs_shape = tuple(self.meta["obs_shape"])
+        self.observations = self._map(path, OBS_FILE, self.meta["obs_dtype"], (self.n_steps, ) + obs_shape)
+        self.actions = self._map(path, ACTIONS_FILE, np.int32, (self.n_steps, ))
+        self.rewards = self._map(path, REWARDS_FILE, np.float32, (self.n_steps, ))
+        self.ends = self._map(path, ENDS_FILE, np.int64, (self.n_episodes, ))
+
+    @staticmethod
+    def _map(path, name, dtype, shape):
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self):
+        return self.n_episodes
+
+    def bounds(self, start, stop):
+        """
+        Step offsets of episodes [start, stop) as (starts, ends) arrays
+        """
+        ends = np.asarray(self.ends[start:stop])
+        first = self.ends[start - 1] if start > 0 else 0
+        starts = np.concatenate(([first], ends[:-1]))
+        return starts, ends
+
+    def one_hot(self, states):
+        res = np.zeros((len(states), self.n_states), dtype=np.float32)
+        res[np.arange(len(states)), states] = 1.0
+        return res
+
+    def episode(self, idx):
+        start = self.ends[idx - 1] if idx > 0 else 0
+        end = self.ends[idx]
+        return self.observations[start:end], self.actions[start:end], self.rewards[start:end]
+
+    def iter_episodes(self, chunk_episodes=1024):
+        for chunk_start in range(0, self.n_episodes, chunk_episodes):
+            starts, ends = self.bounds(chunk_start, min(chunk_start + chunk_episodes, self.n_episodes))
+            for start, end in zip(starts, ends):
+                yield self.observations[start:end], self.actions[start:end], self.rewards[start:end]
+
+    def iter_batches(self, batch_steps):
+        """
+        Consecutive fixed-size step batches (the last one may be shorter)
+        """
+        for start in range(0, self.n_steps, batch_steps):
+            end = min(start + batch_steps, self.n_steps)
+            yield self.observations[start:end], self.actions[start:end], self.rewards[start:end]
+
+    def iter_episode_stats(self, chunk_episodes=65536):
+        """
+        Yields (first_episode, lengths, returns) per chunk of episodes
+        """
+        for chunk_start in range(0, self.n_episodes, chunk_episodes):
+            starts, ends = self.bounds(chunk_start, min(chunk_start + chunk_episodes, self.n_episodes))
+            rewards = np.asarray(self.rewards[starts[0]:ends[-1]], dtype=np.float64)
+            returns = np.add.reduceat(rewards, starts - starts[0]) if len(rewards) else np.zeros(len(starts))
+            yield chunk_start, ends - starts, returns
@@ -0,0 +1,128 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from lib import solver
+
+
+CONFIDENCE = 0.95
+EVAL_BATCH = 5
+MAX_EVAL_EPISODES = 1000
+SPRT_MARGIN = 0.05
+
+EvalResult = namedtuple('EvalResult', field_names=['mean', 'episodes', 'solved', 'episodes_saved'])
+ExactReturn = namedtuple('ExactReturn', field_names=['mean', 'discounted', 'solved'])
+
+
+class SequentialEvaluator:
+    """
+    Plays evaluation episodes in batches until a sequential test decides
+    whether the mean return is above threshold, i.e. tests H0: p <= threshold.
+
+    method="sprt" is Wald's test for 0/1 returns of p0=threshold against
+    p1=threshold+margin. method="hoeffding" works for any returns in [0, 1]
+    using an anytime confidence sequence (its level split as a/(j*(j+1))
+    over the looks j of one evaluation).
+
+    The trainers call evaluate() once per iteration, so the false-solve
+    rate 1-confidence is spent over the checks: the k-th evaluation accepts
+    at level (1-confidence)/(k*(k+1)), which sums to 1-confidence over any
+    number of checks. Rejecting uses the full 1-confidence, a false
+    non-solve only costs another iteration. If max_episodes is hit
+    undecided, the evaluation counts as not solved.
+    Savings are counted against a fixed evaluation of baseline_episodes.
+    """
+    def __init__(self, threshold, confidence=CONFIDENCE, batch_size=EVAL_BATCH,
+                 max_episodes=MAX_EVAL_EPISODES, method="sprt", margin=SPRT_MARGIN,
+                 baseline_episodes=None):
+        assert method in ("sprt", "hoeffding")
+        self.threshold = threshold
+        self.delta = 1.0 - confidence
+        self.batch_size = batch_size
+        self.max_episodes = max_episodes
+        self.method = method
+        self.baseline_episodes = max_episodes if baseline_episodes is None else baseline_episodes
+
+        p0 = min(max(threshold, 1e-6), 1 - 1e-6)
+        p1 = min(max(threshold + margin, 1e-6), 1 - 1e-6)
+        self.llr_success = math.log(p1 / p0)
+        self.llr_failure = math.log((1 - p1) / (1 - p0))
+
+        self.evaluations = 0
+        self.total_episodes = 0
+        self.total_saved = 0
+        self.last = None
+
+    def accept_level(self):
+        """
+        False-solve level of the next evaluation
+        """
+        k = self.evaluations + 1
+        return self.delta / (k * (k + 1))
+
+    def decide(self, total, count, look, alpha):
+        if self.method == "sprt":
+            llr = total * self.llr_success + (count - total) * self.llr_failure
+            if llr >= math.log((1 - self.delta) / alpha):
+                return True
+            if llr <= math.log(self.delta / (1 - alpha)):
+                return False
+            return None
+        mean = total / count
+        accept_radius = math.sqrt(math.log(2.0 * look * (look + 1) / alpha) / (2.0 * count))
+        reject_radius = math.sqrt(math.log(2.0 * look * (look + 1) / self.delta) / (2.0 * count))
+        if mean - accept_radius > self.threshold:
+            return True
+        if mean + reject_radius <= self.threshold:
+            return False
+        return None
+
+    def evaluate(self, play_batch):
+        """
+        play_batch(n) must return an array of n episode returns
+        """
+        alpha = self.accept_level()
+        total, count, look, solved = 0.0, 0, 0, None
+        while solved is None and count < self.max_episodes:
+            look += 1
+            n = min(self.batch_size, self.max_episodes - count)
+            returns = np.asarray(play_batch(n), dtype=np.float64)
+            total += float(returns.sum())
+            count += n
+            solved = self.decide(total, count, look, alpha)
+        mean = total / count
+        if solved is None:
+            solved = False
+        saved = self.baseline_episodes - count
+        self.evaluations += 1
+        self.total_episodes += count
+        self.total_saved += saved
+        self.last = EvalResult(mean=mean, episodes=count, solved=solved, episodes_saved=saved)
+        return self.last
+
+
+class ExactReturnMonitor:
+    """
+    Expected return of a stochastic tabular policy from the env's model
+    instead of sampled episodes: the (n_states, n_actions) action
+    probabilities induce a Markov chain on env.P, which is solved over the
+    episode horizon from the initial state distribution. mean is the
+    expected undiscounted return (the success rate on FrozenLake) and is
+    compared to threshold; discounted is the expectation of filter_batch's
+    reward * gamma ** len(steps).
+    """
+    def __init__(self, env, threshold, gamma, horizon=None):
+        self.mdp = solver.build_mdp(env.unwrapped)
+        self.isd = np.asarray(env.unwrapped.isd, dtype=np.float64)
+        self.threshold = threshold
+        self.gamma = gamma
+        self.horizon = horizon
+        self.last = None
+
+    def evaluate(self, probs):
+        mean = float(self.isd.dot(solver.evaluate_stochastic(self.mdp, probs, 1.0, self.horizon)))
+        discounted = self.gamma * float(
+            self.isd.dot(solver.evaluate_stochastic(self.mdp, probs, self.gamma, self.horizon)))
+        self.last = ExactReturn(mean=mean, discounted=discounted, solved=mean > self.threshold)
+        return self.last
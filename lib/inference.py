@@ -0,0 +1,105 @@
+import io
+import copy
+
+import torch
+import torch.nn as nn
+
+
+MODES = ("eager", "script", "compile")
+POLICY_MODES = MODES + ("int8", )
+
+
+class PolicyHead(nn.Module):
+    """
+    Frozen copy of a policy net with the softmax fused into forward
+    """
+    def __init__(self, net):
+        super(PolicyHead, self).__init__()
+        self.net = copy.deepcopy(net).eval()
+        for param in self.net.parameters():
+            param.requires_grad_(False)
+
+    def forward(self, x):
+        return torch.softmax(self.net(x), dim=1)
+
+
+class RolloutPolicy:
+    """
+    Gradient-free action probabilities for rollouts from a compiled copy of
+    net (TorchScript, torch.compile or plain eager). refresh() copies the
+    current weights of net into the copy in place, so it never recompiles.
+    """
+    def __init__(self, net, mode="script"):
+        assert mode in MODES
+        self.source = net
+        self.mode = mode
+        head = PolicyHead(net)
+        if mode == "script":
+            self.module = torch.jit.script(head)
+        elif mode == "compile":
+            self.module = torch.compile(head, dynamic=True)
+        else:
+            self.module = head
+        self.params = list(head.parameters())
+
+    def refresh(self):
+        with torch.no_grad():
+            for dst, src in zip(self.params, self.source.parameters()):
+                dst.copy_(src)
+
+    def __call__(self, obs_v):
+        with torch.inference_mode():
+            return self.module(obs_v)
+
+
+class QuantizedPolicy:
+    """
+    Int8 dynamically quantized snapshot of net for rollout workers.
+    refresh() re-quantizes from the current weights of net; payload() is
+    the serialized snapshot to broadcast and load_payload() applies one.
+    """
+    def __init__(self, net):
+        self.source = net
+        self.refresh()
+
+    def refresh(self):
+        self.module = torch.ao.quantization.quantize_dynamic(PolicyHead(self.source), {nn.Linear},
+                                                             dtype=torch.qint8)
+
+    def payload(self):
+        buf = io.BytesIO()
+        torch.save(self.module.state_dict(), buf)
+        return buf.getvalue()
+
+    def load_payload(self, data):
+        self.module.load_state_dict(torch.load(io.BytesIO(data)))
+
+    def __call__(self, obs_v):
+        with torch.inference_mode():
+            return self.module(obs_v)
+
+
+def make_policy(net, mode):
+    if mode == "int8":
+        return QuantizedPolicy(net)
+    return RolloutPolicy(net, mode)
+
+
+def state_payload(net):
+    buf = io.BytesIO()
+    torch.save(net.state_dict(), buf)
+    return buf.getvalue()
+
+
+def policy_agreement(reference, candidate, obs_v):
+    """
+    Compares action probabilities of two policies on obs_v: max absolute
+    difference, mean total variation distance and greedy action agreement
+    """
+    with torch.no_grad():
+        p, q = reference(obs_v), candidate(obs_v)
+    return {
+        "max_abs": (p - q).abs().max().item(),
+        "mean_tv": 0.5 * (p - q).abs().sum(dim=1).mean().item(),
+        "argmax": (p.argmax(dim=1) == q.argmax(dim=1)).float().mean().item(),
+    }
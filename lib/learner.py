@@ -0,0 +1,101 @@
+import numpy as np
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.autograd.profiler import record_function
+
+
+class Learner:
+    """
+    Cross-entropy learner stage. Elite steps are copied into preallocated
+    observation/action tensors (grown on demand), then trained for epochs
+    passes in minibatches drawn by index permutation. minibatch=None is one
+    full-batch step per call, the original training step.
+
+    With max_bytes set, the training tensors never exceed that size: if the
+    elite set has more steps, a uniform random subset is used.
+
+    Steps can carry weights (multiplicities, importance weights); the loss
+    is then the weighted mean of the per-step cross-entropy.
+    """
+    def __init__(self, net, optimizer, minibatch=None, epochs=1, max_bytes=None):
+        self.net = net
+        self.optimizer = optimizer
+        self.minibatch = minibatch
+        self.epochs = epochs
+        self.max_bytes = max_bytes
+        self.objective = nn.CrossEntropyLoss()
+        self.obs_v = None
+        self.acts_v = None
+        self.weights_v = None
+        self.gradient_steps = 0
+
+    @property
+    def nbytes(self):
+        if self.obs_v is None:
+            return 0
+        return sum(t.element_size() * t.nelement() for t in (self.obs_v, self.acts_v, self.weights_v) if t is not None)
+
+    def capacity_limit(self, obs_size, weighted=False):
+        if self.max_bytes is None:
+            return None
+        return max(self.max_bytes // (obs_size * 4 + (12 if weighted else 8)), 1)
+
+    def load(self, obs, acts, weights=None):
+        n, obs_size = len(obs), len(obs[0])
+        limit = self.capacity_limit(obs_size, weighted=weights is not None)
+        if limit is not None and n > limit:
+            keep = np.sort(np.random.choice(n, limit, replace=False))
+            obs, acts = [obs[i] for i in keep], [acts[i] for i in keep]
+            if weights is not None:
+                weights = np.asarray(weights)[keep]
+            n = limit
+        if self.obs_v is None or len(self.obs_v) < n or self.obs_v.shape[1] != obs_size:
+            capacity = n if self.obs_v is None else max(n, 2 * len(self.obs_v))
+            if limit is not None:
+                capacity = min(capacity, limit)
+            self.obs_v = torch.empty((capacity, obs_size), dtype=torch.float32)
+            self.acts_v = torch.empty(capacity, dtype=torch.int64)
+        if weights is not None and (self.weights_v is None or len(self.weights_v) < len(self.obs_v)):
+            self.weights_v = torch.empty(len(self.obs_v), dtype=torch.float32)
+        np.stack(obs, out=self.obs_v.numpy()[:n])
+        self.acts_v.numpy()[:n] = acts
+        if weights is not None:
+            self.weights_v.numpy()[:n] = weights
+        return n
+
+    def loss(self, obs_v, acts_v, weights_v=None):
+        if weights_v is None:
+            return self.objective(self.net(obs_v), acts_v)
+        losses_v = F.cross_entropy(self.net(obs_v), acts_v, reduction="none")
+        return (losses_v * weights_v).sum() / weights_v.sum()
+
+    def step(self, obs, acts, weights=None):
+        """
+        Trains on lists of observations/actions and optional per-step weights, returns the mean loss
+        """
+        n = self.load(obs, acts, weights)
+        obs_v, acts_v = self.obs_v[:n], self.acts_v[:n]
+        weights_v = None if weights is None else self.weights_v[:n]
+        minibatch = self.minibatch or n
+        losses = []
+        for _ in range(self.epochs):
+            perm = torch.randperm(n) if minibatch < n else None
+            for start in range(0, n, minibatch):
+                if perm is None:
+                    batch_obs_v, batch_acts_v, batch_weights_v = obs_v, acts_v, weights_v
+                else:
+                    idx = perm[start:start + minibatch]
+                    batch_obs_v, batch_acts_v = obs_v[idx], acts_v[idx]
+                    batch_weights_v = None if weights_v is None else weights_v[idx]
+                self.optimizer.zero_grad()
+                with record_function("Net.forward"):
+                    loss_v = self.loss(batch_obs_v, batch_acts_v, batch_weights_v)
+                with record_function("Net.backward"):
+                    loss_v.backward()
+                with record_function("optimizer.step"):
+                    self.optimizer.step()
+                losses.append(loss_v.item())
+                self.gradient_steps += 1
+        return float(np.mean(losses))
@@ -0,0 +1,65 @@
+import os
+import json
+import socket
+
+import torch
+
+
+PROFILE_PATH = os.environ.get("FROZENLAKE_PROFILE",
+                              os.path.join(os.path.expanduser("~"), ".cache", "frozenlake-rl", "machine_profile.json"))
+WORKER_COUNTS = (1, 2, 4)
+
+
+def host_key():
+    """
+    Profiles are keyed by host name and CPU count, so a shared home directory
+    or a resized VM never picks up settings measured elsewhere
+    """
+    return "%s/%dcpu" % (socket.gethostname(), os.cpu_count() or 1)
+
+
+def read_all(path=PROFILE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def load(trainer, path=PROFILE_PATH):
+    """
+    Tuned settings of trainer on this host, an empty dict if never tuned
+    """
+    return read_all(path).get(host_key(), {}).get(trainer, {})
+
+
+def save(trainer, settings, path=PROFILE_PATH):
+    profiles = read_all(path)
+    profiles.setdefault(host_key(), {})[trainer] = settings
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fd:
+        json.dump(profiles, fd, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def apply(trainer, path=PROFILE_PATH):
+    """
+    Loads the profile of trainer and sets the torch thread pool from it.
+    Returns the settings, so callers can use env_width/workers as defaults.
+    """
+    settings = load(trainer, path)
+    if settings.get("threads"):
+        torch.set_num_threads(settings["threads"])
+    return settings
+
+
+def worker_counts(text, settings, default=WORKER_COUNTS):
+    """
+    Worker counts for a scaling benchmark: the comma-separated text if
+    given, else 1 and the tuned workers of settings, else default
+    """
+    if text:
+        return [int(count) for count in text.split(",")]
+    if settings.get("workers"):
+        return sorted({1, settings["workers"]})
+    return list(default)
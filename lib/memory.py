@@ -0,0 +1,109 @@
+import os
+import sys
+import resource
+import tracemalloc
+
+TRACE_TOP = 10
+TRACE_FRAMES = 1
+
+
+def episodes_nbytes(episodes):
+    """
+    Memory held by a list of Episode objects: the list, the namedtuples and
+    the observation arrays. Arrays sharing a base (views into one batch
+    array, as iterate_batches_vec produces) are counted once.
+    Returns (total bytes, steps).
+    """
+    seen = set()
+    total = sys.getsizeof(episodes)
+    steps = 0
+    for episode in episodes:
+        total += sys.getsizeof(episode) + sys.getsizeof(episode.steps)
+        steps += len(episode.steps)
+        for step in episode.steps:
+            total += sys.getsizeof(step) + sys.getsizeof(step.action)
+            obs = step.observation
+            total += sys.getsizeof(obs) - (obs.nbytes if obs.base is None else 0)
+            base = obs if obs.base is None else obs.base
+            if id(base) not in seen:
+                seen.add(id(base))
+                total += base.nbytes
+    return total, steps
+
+
+def rss_bytes():
+    """
+    Current resident set size, the peak one where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as fd:
+            return int(fd.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """
+    Per-iteration memory accounting of the cross-entropy trainer, passed to
+    cross_entropy.train as memory=. update() measures the elite buffer, the
+    learner's training tensors, an optional episode recorder and the RSS;
+    the numbers are kept in last as a flat dict ready for a MetricsSink.
+
+    With trace=True, tracemalloc snapshots are diffed between iterations and
+    the top allocation sites of the last diff are kept in last_trace.
+    """
+    def __init__(self, recorder=None, trace=False, top=TRACE_TOP):
+        self.recorder = recorder
+        self.trace = trace
+        self.top = top
+        self.peak_train_bytes = 0
+        self.snapshot = None
+        self.last = {}
+        self.last_trace = []
+        if trace:
+            tracemalloc.start(TRACE_FRAMES)
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def update(self, elites, learner=None):
+        elite_bytes, steps = episodes_nbytes(elites)
+        train_bytes = 0 if learner is None else learner.nbytes
+        self.peak_train_bytes = max(self.peak_train_bytes, train_bytes)
+        self.last = {
+            "mem_elite_bytes": elite_bytes,
+            "mem_elite_bytes_per_step": elite_bytes / max(steps, 1),
+            "mem_train_tensor_bytes": train_bytes,
+            "mem_train_tensor_peak": self.peak_train_bytes,
+            "mem_rss": rss_bytes(),
+        }
+        if self.recorder is not None:
+            self.last["mem_store_bytes_per_step"] = self.recorder.bytes_per_step
+            self.last["mem_store_buffer_bytes"] = self.recorder.nbytes
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot()
+            diff = snapshot.compare_to(self.snapshot, "lineno")
+            self.snapshot = snapshot
+            self.last["mem_traced_bytes"] = tracemalloc.get_traced_memory()[0]
+            self.last["mem_traced_diff"] = sum(d.size_diff for d in diff)
+            self.last_trace = diff[:self.top]
+        return self.last
+
+    def close(self):
+        if self.trace:
+            tracemalloc.stop()
+
+
+def format_trace(diff):
+    return "\n".join(map(str, diff))
+
+
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return "%.1f%s" % (n, unit)
+        n /= 1024.0
+    return "%.1fGiB" % n
@@ -0,0 +1,51 @@
+import json
+import time
+
+
+class MetricsSink:
+    """
+    Single place the trainers report scalars to. Every scalar goes to the
+    TensorBoard writer (if any), to a lib.run_store.RunWriter (if any) and,
+    with path set, is appended as one JSON line {"name", "value", "step",
+    "time"} for scripted regression checks.
+    """
+    def __init__(self, writer=None, path=None, run=None):
+        self.writer = writer
+        self.run = run
+        self.file = None if path is None else open(path, "a")
+
+    def add_scalar(self, name, value, step):
+        if self.writer is not None:
+            self.writer.add_scalar(name, value, step)
+        if self.run is not None:
+            self.run.add_scalar(name, value, step)
+        if self.file is not None:
+            self.file.write(json.dumps({"name": name, "value": float(value), "step": int(step),
+                                        "time": time.time()}) + "\n")
+
+    def add_scalars(self, values, step):
+        """
+        Flat name -> value dict, every entry logged with add_scalar
+        """
+        for name, value in values.items():
+            self.add_scalar(name, value, step)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.run is not None:
+            self.run.close()
+        if self.file is not None:
+            self.file.close()
+
+
+def read_jsonl(path):
+    """
+    Scalars of a MetricsSink file as name -> list of (step, value)
+    """
+    series = {}
+    with open(path) as fd:
+        for line in fd:
+            rec = json.loads(line)
+            series.setdefault(rec["name"], []).append((rec["step"], rec["value"]))
+    return series
@@ -0,0 +1,109 @@
+import queue
+import threading
+import numpy as np
+
+import torch
+import torch.nn as nn
+
+from lib import cross_entropy
+
+
+MINIBATCH = 256
+EPOCHS = 1
+PREFETCH = 4
+STATS_CHUNK = 100 * 1024
+
+
+def iter_elites(reader, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+                gamma=cross_entropy.GAMMA, keep_elites=cross_entropy.KEEP_ELITES):
+    """
+    Replays filter_batch over the recorded episodes in recording order:
+    consecutive groups of batch_size episodes plus the elites kept from the
+    previous group, discounted-reward percentile, strict '>' bound. Yields
+    (elite episode indices, reward_bound) for every group that has elites.
+    Only per-episode lengths and returns are read here.
+    """
+    carry_idx = np.zeros(0, dtype=np.int64)
+    carry_disc = np.zeros(0)
+    chunk = max(STATS_CHUNK // batch_size, 1) * batch_size
+    for first, lengths, returns in reader.iter_episode_stats(chunk):
+        disc = returns * (gamma ** lengths)
+        for off in range(0, len(disc), batch_size):
+            idx = np.concatenate((carry_idx, first + np.arange(off, min(off + batch_size, len(disc)))))
+            batch_disc = np.concatenate((carry_disc, disc[off:off + batch_size]))
+            reward_bound = np.percentile(batch_disc, percentile)
+            mask = batch_disc > reward_bound
+            carry_idx, carry_disc = idx[mask][-keep_elites:], batch_disc[mask][-keep_elites:]
+            if mask.any():
+                yield idx[mask], reward_bound
+
+
+def gather_steps(reader, episodes):
+    """
+    Observations (one-hot expanded for discrete stores) and actions of all steps of the given episodes
+    """
+    ends = np.asarray(reader.ends[episodes])
+    starts = np.where(episodes > 0, np.asarray(reader.ends[np.maximum(episodes - 1, 0)]), 0)
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    step_idx = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+    obs = reader.observations[step_idx]
+    if reader.discrete:
+        obs = reader.one_hot(obs)
+    return obs, np.asarray(reader.actions[step_idx], dtype=np.int64)
+
+
+def prefetch(iterable, size=PREFETCH):
+    """
+    Runs iterable in a background thread, keeping at most size items ahead
+    """
+    q = queue.Queue(maxsize=size)
+    done = object()
+
+    def producer():
+        try:
+            for item in iterable:
+                q.put(item)
+        except Exception as e:
+            q.put(e)
+        q.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        item = q.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def train(net, optimizer, reader, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+          gamma=cross_entropy.GAMMA, keep_elites=cross_entropy.KEEP_ELITES, minibatch=MINIBATCH,
+          epochs=EPOCHS, prefetch_size=PREFETCH):
+    """
+    Offline cross-entropy: every elite selection from iter_elites is trained
+    on for the given epochs in shuffled minibatches. Selection and step
+    loading run one thread ahead of training. Yields (selection_no, mean
+    loss, elite steps, reward_bound).
+    """
+    objective = nn.CrossEntropyLoss()
+
+    def load():
+        for episodes, reward_bound in iter_elites(reader, batch_size, percentile, gamma, keep_elites):
+            obs, acts = gather_steps(reader, episodes)
+            yield torch.from_numpy(obs), torch.from_numpy(acts), reward_bound
+
+    for sel_no, (obs_v, acts_v, reward_bound) in enumerate(prefetch(load(), prefetch_size)):
+        n = len(acts_v)
+        losses = []
+        for _ in range(epochs):
+            perm = torch.randperm(n)
+            for start in range(0, n, minibatch):
+                idx = perm[start:start + minibatch]
+                optimizer.zero_grad()
+                loss_v = objective(net(obs_v[idx]), acts_v[idx])
+                loss_v.backward()
+                optimizer.step()
+                losses.append(loss_v.item())
+        yield sel_no, float(np.mean(losses)), n, reward_bound
@@ -0,0 +1,223 @@
+import zlib
+import struct
+import socket
+import threading
+import socketserver
+
+import numpy as np
+
+from lib import q_learning
+from lib.distributed import send_frame, recv_frame
+
+PORT = 7750
+N_SHARDS = 2
+STALENESS = 32
+MSG_PUSH, MSG_PULL, MSG_GREEDY = range(3)
+VERSION = struct.Struct("!Q")
+
+
+class QShard:
+    """
+    Rows [start, end) of the Q-table, the unit of sharding. Requests are
+    encoded bytes, so a shard answers the same way in process and behind a
+    socket:
+    - PUSH: zlib'ed (flat index, delta) pairs, added to the table;
+    - PULL: the rows changed since a version, with the current version;
+    - GREEDY: the argmax action of every row.
+    Every push bumps the shard version and stamps the rows it touched.
+    """
+    def __init__(self, start, end, n_actions):
+        self.start, self.end = start, end
+        self.values = np.zeros((end - start, n_actions), dtype=np.float64)
+        self.row_versions = np.zeros(end - start, dtype=np.int64)
+        self.version = 0
+        self.pushes = 0
+        self.lock = threading.Lock()
+
+    def handle(self, kind, payload):
+        with self.lock:
+            if kind == MSG_PUSH:
+                idx, deltas = decode_deltas(payload)
+                np.add.at(self.values.reshape(-1), idx, deltas)
+                self.version += 1
+                self.pushes += 1
+                self.row_versions[np.unique(idx // self.values.shape[1])] = self.version
+                return b""
+            if kind == MSG_PULL:
+                since = VERSION.unpack(payload)[0]
+                rows = np.flatnonzero(self.row_versions > since).astype(np.uint32)
+                return VERSION.pack(self.version) + zlib.compress(
+                    struct.pack("!I", len(rows)) + rows.tobytes() + self.values[rows].astype(np.float32).tobytes())
+            if kind == MSG_GREEDY:
+                return np.argmax(self.values, axis=1).astype(np.uint8).tobytes()
+        raise ValueError("unknown message %d" % kind)
+
+
+def encode_deltas(idx, deltas):
+    return zlib.compress(struct.pack("!I", len(idx)) + idx.astype(np.uint32).tobytes() +
+                         deltas.astype(np.float32).tobytes())
+
+
+def decode_deltas(payload):
+    data = zlib.decompress(payload)
+    n = struct.unpack_from("!I", data)[0]
+    return (np.frombuffer(data, dtype=np.uint32, count=n, offset=4).astype(np.int64),
+            np.frombuffer(data, dtype=np.float32, count=n, offset=4 + 4 * n).astype(np.float64))
+
+
+def decode_rows(reply, n_actions):
+    version = VERSION.unpack_from(reply)[0]
+    data = zlib.decompress(reply[VERSION.size:])
+    n = struct.unpack_from("!I", data)[0]
+    rows = np.frombuffer(data, dtype=np.uint32, count=n, offset=4).astype(np.int64)
+    values = np.frombuffer(data, dtype=np.float32, count=n * n_actions, offset=4 + 4 * n).reshape(n, n_actions)
+    return version, rows, values
+
+
+def shard_bounds(n_states, n_shards):
+    bounds = np.linspace(0, n_states, n_shards + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class LocalTransport:
+    """
+    In-process stand-in for TcpTransport, calls the shards directly
+    """
+    def __init__(self, shards):
+        self.shards = shards
+        self.bytes_sent = self.bytes_received = 0
+
+    def call(self, shard, kind, payload=b""):
+        reply = self.shards[shard].handle(kind, payload)
+        self.bytes_sent += len(payload)
+        self.bytes_received += len(reply)
+        return reply
+
+    def close(self):
+        pass
+
+
+class TcpTransport:
+    """
+    One connection per shard server, addresses are (host, port) pairs in shard order
+    """
+    def __init__(self, addresses):
+        self.socks = []
+        for address in addresses:
+            sock = socket.create_connection(address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socks.append(sock)
+        self.bytes_sent = self.bytes_received = 0
+
+    def call(self, shard, kind, payload=b""):
+        sock = self.socks[shard]
+        self.bytes_sent += send_frame(sock, kind, payload)
+        _, reply, size = recv_frame(sock)
+        self.bytes_received += size
+        return reply
+
+    def close(self):
+        for sock in self.socks:
+            sock.close()
+
+
+class ShardServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, shard):
+        self.shard = shard
+        socketserver.TCPServer.__init__(self, address, ShardHandler)
+
+
+class ShardHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                kind, payload, _ = recv_frame(self.request)
+            except ConnectionError:
+                return
+            send_frame(self.request, kind, self.server.shard.handle(kind, payload))
+
+
+def serve_shard(start, end, n_actions, host="127.0.0.1", port=0, ready=None):
+    """
+    Runs one shard server forever; the bound port is put on the ready queue
+    """
+    server = ShardServer((host, port), QShard(start, end, n_actions))
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class RemoteTable:
+    """
+    Actor-side view of a sharded Q-table: a local QTable copy refreshed by
+    pull(), and coalesced TD deltas sent by push(). Deltas for the same
+    (state, action) are summed locally and only touched entries travel.
+    """
+    def __init__(self, transport, n_states, n_actions, n_shards):
+        self.transport = transport
+        self.n_actions = n_actions
+        self.bounds = shard_bounds(n_states, n_shards)
+        self.table = q_learning.QTable(n_states, n_actions)
+        self.pending = np.zeros((n_states, n_actions), dtype=np.float64)
+        self.touched = np.zeros((n_states, n_actions), dtype=bool)
+        self.versions = [0] * n_shards
+
+    def add_delta(self, s, a, delta):
+        self.pending[s, a] += delta
+        self.touched[s, a] = True
+
+    def push(self):
+        for shard, (start, end) in enumerate(self.bounds):
+            flat = np.flatnonzero(self.touched[start:end])
+            if not len(flat):
+                continue
+            deltas = self.pending[start:end].reshape(-1)[flat]
+            self.transport.call(shard, MSG_PUSH, encode_deltas(flat, deltas))
+        self.pending[:] = 0.0
+        self.touched[:] = False
+
+    def pull(self):
+        for shard, (start, _) in enumerate(self.bounds):
+            reply = self.transport.call(shard, MSG_PULL, VERSION.pack(self.versions[shard]))
+            self.versions[shard], rows, values = decode_rows(reply, self.n_actions)
+            self.table.array[start + rows] = values
+
+    def greedy_actions(self):
+        return np.concatenate([np.frombuffer(self.transport.call(shard, MSG_GREEDY), dtype=np.uint8)
+                               for shard in range(len(self.bounds))]).astype(np.int64)
+
+
+class ParamServerAgent(q_learning.Agent):
+    """
+    Q-learning actor against a parameter server. value_update computes the
+    TD delta on the local copy, applies it there and queues it for the
+    server; sync() pushes the queued deltas and pulls the changed rows. The
+    local copy is never more than staleness updates behind: sync() runs
+    automatically when that many updates are queued.
+    """
+    def __init__(self, remote, env=None, gamma=q_learning.GAMMA, alpha=q_learning.ALPHA, staleness=STALENESS):
+        super(ParamServerAgent, self).__init__(env=env, gamma=gamma, alpha=alpha, values=remote.table)
+        self.remote = remote
+        self.staleness = staleness
+        self.queued = 0
+        self.syncs = 0
+        remote.pull()
+
+    def value_update(self, s, a, r, next_s):
+        best_v, _ = self.best_value_and_action(next_s)
+        delta = self.alpha * (r + self.gamma * best_v - self.values[(s, a)])
+        self.values[(s, a)] = self.values[(s, a)] + delta
+        self.remote.add_delta(s, a, delta)
+        self.queued += 1
+        if self.queued >= self.staleness:
+            self.sync()
+
+    def sync(self):
+        self.remote.push()
+        self.remote.pull()
+        self.queued = 0
+        self.syncs += 1
@@ -0,0 +1,192 @@
+import heapq
+import numpy as np
+
+from lib import q_learning
+
+
+PLANNING_STEPS = 16
+SWEEP_THETA = 1e-4
+SWEEP_BATCH = 8
+SUCCESSOR_SLOTS = 4
+
+
+def widen(rows):
+    """
+    rows with twice the columns, the new ones zeroed
+    """
+    return np.concatenate((rows, np.zeros_like(rows)), axis=1)
+
+
+class TransitionModel:
+    """
+    Learned model of a discrete env built from sampled transitions: reward
+    sums/visits (n_states, n_actions), and for every pair s * n_actions + a
+    a fixed-width row of successor states with their counts. A reverse row
+    per state holds the pairs seen leading into it. Memory follows the
+    branching of the env instead of n_states ** 2, and a backup only reads
+    the rows of its own pairs. A row that overflows doubles the width of its
+    array, which never happens once the widths cover the env's branching.
+    """
+    def __init__(self, n_states, n_actions, slots=SUCCESSOR_SLOTS, pred_slots=None):
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.reward_sums = np.zeros((n_states, n_actions), dtype=np.float64)
+        self.visits = np.zeros((n_states, n_actions), dtype=np.int64)
+        self.visited = np.zeros(n_states * n_actions, dtype=np.int64)
+        self.n_visited = 0
+        self.succ_next = np.zeros((n_states * n_actions, slots), dtype=np.int64)
+        self.succ_counts = np.zeros((n_states * n_actions, slots), dtype=np.float64)
+        self.n_succ = np.zeros(n_states * n_actions, dtype=np.int64)
+        pred_slots = slots * n_actions if pred_slots is None else pred_slots
+        self.pred_pairs = np.zeros((n_states, pred_slots), dtype=np.int64)
+        self.n_pred = np.zeros(n_states, dtype=np.int64)
+
+    def update(self, s, a, r, next_s):
+        flat = s * self.n_actions + a
+        if not self.visits[s, a]:
+            self.visited[self.n_visited] = flat
+            self.n_visited += 1
+        n = self.n_succ[flat]
+        hit = np.flatnonzero(self.succ_next[flat, :n] == next_s)
+        if len(hit):
+            slot = hit[0]
+        else:
+            if n == self.succ_next.shape[1]:
+                self.succ_next, self.succ_counts = widen(self.succ_next), widen(self.succ_counts)
+            slot = n
+            self.succ_next[flat, slot] = next_s
+            self.n_succ[flat] += 1
+            if self.n_pred[next_s] == self.pred_pairs.shape[1]:
+                self.pred_pairs = widen(self.pred_pairs)
+            self.pred_pairs[next_s, self.n_pred[next_s]] = flat
+            self.n_pred[next_s] += 1
+        self.succ_counts[flat, slot] += 1
+        self.reward_sums[s, a] += r
+        self.visits[s, a] += 1
+
+    def targets(self, table, s, a, gamma):
+        """
+        Expected one-step targets r(s, a) + gamma * E[max_a' Q(s', a')] for arrays of visited pairs
+        """
+        flat = s * self.n_actions + a
+        # unused slots have zero counts, whatever state they point at
+        best_next = table[self.succ_next[flat]].max(axis=2)
+        expected = (self.succ_counts[flat] * best_next).sum(axis=1)
+        return (self.reward_sums[s, a] + gamma * expected) / self.visits[s, a]
+
+    def predecessors(self, states):
+        """
+        Flat (s * n_actions + a) indices of pairs observed to lead into any of states
+        """
+        rows = self.pred_pairs[states]
+        used = np.arange(rows.shape[1]) < self.n_pred[states][:, None]
+        return np.unique(rows[used])
+
+
+def backup(table, model, flat, gamma, alpha):
+    """
+    Vectorized expected backups for flat pair indices; duplicates are applied once.
+    Returns the TD errors before the update.
+    """
+    flat = np.unique(flat)
+    s, a = np.divmod(flat, model.n_actions)
+    td_errors = model.targets(table, s, a, gamma) - table[s, a]
+    table[s, a] += alpha * td_errors
+    return td_errors
+
+
+class DynaPlanner:
+    """
+    Dyna-Q style planning: each call backs up planning_steps pairs drawn
+    uniformly from the visited ones. Backups use the model's expectation
+    rather than a sampled transition, so alpha=1 is a full backup.
+    """
+    def __init__(self, model, planning_steps=PLANNING_STEPS, alpha=1.0, seed=None):
+        self.model = model
+        self.planning_steps = planning_steps
+        self.alpha = alpha
+        self.rng = np.random.default_rng(seed)
+        self.backups = 0
+
+    def observe(self, table, s, a, gamma):
+        pass
+
+    def plan(self, table, gamma):
+        if not self.model.n_visited:
+            return
+        idx = self.rng.integers(0, self.model.n_visited, size=self.planning_steps)
+        backup(table, self.model, self.model.visited[idx], gamma, self.alpha)
+        self.backups += self.planning_steps
+
+
+class SweepingPlanner:
+    """
+    Prioritized sweeping: pairs whose expected target moved by more than theta
+    are kept in a max-priority queue. Each call pops up to planning_steps of
+    them in batches, backs them up and re-prioritizes their predecessors.
+    """
+    def __init__(self, model, planning_steps=PLANNING_STEPS, alpha=1.0, theta=SWEEP_THETA,
+                 batch_size=SWEEP_BATCH):
+        self.model = model
+        self.planning_steps = planning_steps
+        self.alpha = alpha
+        self.theta = theta
+        self.batch_size = batch_size
+        self.queue = []
+        self.priority = np.zeros(model.n_states * model.n_actions, dtype=np.float64)
+        self.backups = 0
+
+    def push(self, table, flat, gamma):
+        s, a = np.divmod(flat, self.model.n_actions)
+        prios = np.abs(self.model.targets(table, s, a, gamma) - table[s, a])
+        for idx, prio in zip(flat[prios > self.theta], prios[prios > self.theta]):
+            if prio > self.priority[idx]:
+                self.priority[idx] = prio
+                heapq.heappush(self.queue, (-prio, int(idx)))
+
+    def observe(self, table, s, a, gamma):
+        self.push(table, np.array([s * self.model.n_actions + a]), gamma)
+
+    def pop_batch(self, count):
+        batch = []
+        while self.queue and len(batch) < count:
+            prio, idx = heapq.heappop(self.queue)
+            if -prio != self.priority[idx]:
+                continue
+            self.priority[idx] = 0.0
+            batch.append(idx)
+        return np.array(batch, dtype=np.int64)
+
+    def plan(self, table, gamma):
+        done = 0
+        while done < self.planning_steps:
+            flat = self.pop_batch(min(self.batch_size, self.planning_steps - done))
+            if not len(flat):
+                break
+            backup(table, self.model, flat, gamma, self.alpha)
+            done += len(flat)
+            states = np.unique(flat // self.model.n_actions)
+            self.push(table, self.model.predecessors(states), gamma)
+        self.backups += done
+
+
+def train(agent, model, planner, test_env, test_episodes=q_learning.TEST_EPISODES, evaluate=None):
+    """
+    Q-learning loop where every real step also updates the model and runs the
+    planner. agent.values must be a QTable. Yields (iter_no, reward).
+    """
+    table = agent.values.array
+    iter_no = 0
+    while True:
+        iter_no += 1
+        s, a, r, next_s = agent.sample_env()
+        agent.value_update(s, a, r, next_s)
+        model.update(s, a, r, next_s)
+        planner.observe(table, s, a, agent.gamma)
+        planner.plan(table, agent.gamma)
+
+        if evaluate is None:
+            reward = q_learning.evaluate_fixed(agent, test_env, test_episodes)
+        else:
+            reward = evaluate(agent)
+        yield iter_no, reward
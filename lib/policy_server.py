@@ -0,0 +1,169 @@
+import time
+import queue
+import socket
+import threading
+import socketserver
+
+import numpy as np
+import torch
+
+from lib import cross_entropy
+
+MAX_BATCH = 64
+# requests arriving during a forward pass already batch up, waiting on top only pays off with many cores
+MAX_WAIT = 0.0
+ACTION_BYTES = 4
+
+
+class Request:
+    __slots__ = ("obs", "action", "error", "done")
+
+    def __init__(self, obs):
+        self.obs = obs
+        self.action = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class PolicyServer:
+    """
+    Micro-batching action server for many rollout actors. act() queues one
+    observation and blocks until its action is ready; a server thread
+    coalesces queued requests into one forward and sample pass, serving a
+    batch once max_batch requests are queued or max_wait seconds after the
+    first one arrived.
+
+    policy maps an observation batch to action probabilities and is usually
+    a lib.inference.RolloutPolicy. refresh() hot-swaps its weights between
+    two batches; call it after every optimizer step. If serving a batch
+    raises, act() re-raises the error in every actor of that batch and the
+    server goes on with the next one.
+    """
+    def __init__(self, policy, max_batch=MAX_BATCH, max_wait=MAX_WAIT, seed=None):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.rng = np.random.default_rng(seed)
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.served = 0
+        self.refreshes = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def act(self, obs):
+        req = Request(obs)
+        self.requests.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.action
+
+    def refresh(self):
+        with self.lock:
+            self.policy.refresh()
+            self.refreshes += 1
+
+    @property
+    def mean_batch(self):
+        return self.served / max(self.batches, 1)
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                req = self.requests.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if req is None:
+                self.requests.put(None)
+                break
+            batch.append(req)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                obs_v = torch.from_numpy(np.stack([req.obs for req in batch]).astype(np.float32, copy=False))
+                with self.lock:
+                    act_probs = self.policy(obs_v).numpy()
+                actions = cross_entropy.sample_actions(act_probs, self.rng)
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+                    req.done.set()
+                continue
+            self.batches += 1
+            self.served += len(batch)
+            for req, action in zip(batch, actions):
+                req.action = int(action)
+                req.done.set()
+
+
+class UnixPolicyServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves a PolicyServer on a Unix socket: each message is one float32
+    observation of obs_size values, answered with an int32 action. Every
+    connection gets its own thread, all feed the same PolicyServer.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, server, obs_size):
+        self.policy_server = server
+        self.obs_bytes = obs_size * 4
+        socketserver.UnixStreamServer.__init__(self, path, UnixHandler)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class UnixHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        obs_bytes = self.server.obs_bytes
+        while True:
+            data = recv_exact(self.request, obs_bytes)
+            if data is None:
+                return
+            action = self.server.policy_server.act(np.frombuffer(data, dtype=np.float32))
+            self.request.sendall(np.int32(action).tobytes())
+
+
+class UnixPolicyClient:
+    """
+    Actor side of UnixPolicyServer with the same act(obs) call as PolicyServer
+    """
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+
+    def act(self, obs):
+        self.sock.sendall(np.asarray(obs, dtype=np.float32).tobytes())
+        data = recv_exact(self.sock, ACTION_BYTES)
+        if data is None:
+            raise ConnectionError("policy server closed the connection")
+        return int(np.frombuffer(data, dtype=np.int32)[0])
+
+    def close(self):
+        self.sock.close()
+
+
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
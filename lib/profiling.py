@@ -0,0 +1,111 @@
+import io
+import os
+import time
+import pstats
+import signal
+import cProfile
+
+CAPTURE_DIR = "profiles"
+CAPTURE_ITERS = 10
+TOP_FUNCTIONS = 25
+# trainer hot paths reported separately in the cProfile summary
+HOT_PATHS = r"iterate_batches|filter_batch|value_update|best_value_and_action|sample_env|sample_transition|" \
+            r"play_episode|learner.py.*step|replay_update|backup"
+
+
+class CaptureWindow:
+    """
+    On-demand profiling of a trainer loop. step() is called once per
+    iteration; after request() (or the installed signal) the next
+    iterations run under cProfile and, with torch_profile, torch.profiler.
+    When the window closes, both are written to timestamped files in
+    out_dir with a text summary of the top functions.
+
+    Idle cost is one attribute check per step(): nothing is hooked until a
+    capture is requested. step() and close() return the path prefix of a
+    capture they wrote, None otherwise.
+    """
+    def __init__(self, name, out_dir=CAPTURE_DIR, iterations=CAPTURE_ITERS, torch_profile=True,
+                 top=TOP_FUNCTIONS):
+        self.name = name
+        self.out_dir = out_dir
+        self.iterations = iterations
+        self.torch_profile = torch_profile
+        self.top = top
+        self.pending = None
+        self.remaining = None
+        self.profile = None
+        self.torch_prof = None
+        self.started = None
+        self.captures = []
+
+    def request(self, iterations=None):
+        """
+        Arms a capture of iterations steps starting at the next step(), safe to call from a signal handler
+        """
+        self.pending = iterations or self.iterations
+
+    def install_signal(self, signum=signal.SIGUSR1):
+        signal.signal(signum, lambda *_: self.request())
+
+    def step(self):
+        if self.pending is None and self.remaining is None:
+            return None
+        if self.remaining is None:
+            self.start(self.pending)
+            self.pending = None
+            return None
+        self.remaining -= 1
+        if self.remaining <= 0:
+            return self.stop()
+        return None
+
+    def start(self, iterations):
+        self.remaining = iterations
+        self.started = time.strftime("%Y%m%d-%H%M%S")
+        if self.torch_profile:
+            import torch.profiler
+            self.torch_prof = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU],
+                                                     record_shapes=True)
+            self.torch_prof.__enter__()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = os.path.join(self.out_dir, "%s-%s" % (self.started, self.name))
+        self.profile.dump_stats(prefix + ".prof")
+        summary = [self.python_summary()]
+        if self.torch_prof is not None:
+            self.torch_prof.__exit__(None, None, None)
+            self.torch_prof.export_chrome_trace(prefix + "-torch.json")
+            summary.append(self.torch_summary())
+        with open(prefix + ".txt", "w") as fd:
+            fd.write("\n".join(summary))
+        self.captures.append(prefix)
+        self.profile, self.torch_prof, self.remaining = None, None, None
+        return prefix
+
+    def close(self):
+        """
+        Writes a capture cut short by the end of training
+        """
+        if self.remaining is not None:
+            return self.stop()
+        return None
+
+    def python_summary(self):
+        buf = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=buf).strip_dirs()
+        buf.write("=== cProfile, top %d by cumulative time ===\n" % self.top)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        buf.write("=== cProfile, top %d by own time ===\n" % self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        buf.write("=== cProfile, trainer hot paths ===\n")
+        stats.sort_stats("cumulative").print_stats(HOT_PATHS)
+        return buf.getvalue()
+
+    def torch_summary(self):
+        table = self.torch_prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=self.top)
+        return "=== torch.profiler, top %d ops by self CPU time ===\n%s\n" % (self.top, table)
@@ -0,0 +1,129 @@
+import gym
+import collections
+import numpy as np
+
+ENV_NAME = "FrozenLake-v0"
+GAMMA = 0.9
+ALPHA = 0.2
+TEST_EPISODES = 20
+SOLVE_REWARD = 0.80
+
+
+class QTable:
+    """
+    Drop-in for Agent.values backed by a dense (n_states, n_actions) float64
+    array, optionally living in an existing buffer such as shared memory
+    """
+    def __init__(self, n_states, n_actions, buffer=None):
+        if buffer is None:
+            self.array = np.zeros((n_states, n_actions), dtype=np.float64)
+        else:
+            self.array = np.frombuffer(buffer, dtype=np.float64).reshape(n_states, n_actions)
+
+    def __getitem__(self, key):
+        return float(self.array[key])
+
+    def __setitem__(self, key, value):
+        self.array[key] = value
+
+    def items(self):
+        n_states, n_actions = self.array.shape
+        for s in range(n_states):
+            for a in range(n_actions):
+                yield (s, a), float(self.array[s, a])
+
+
+class Agent:
+    def __init__(self, env=None, gamma=GAMMA, alpha=ALPHA, values=None):
+        self.env = gym.make(ENV_NAME) if env is None else env
+        self.gamma = gamma
+        self.alpha = alpha
+        self.state = self.env.reset()
+        self.values = collections.defaultdict(float) if values is None else values
+
+    def sample_env(self):
+        old_state, action, reward, new_state, _ = self.sample_transition()
+        return (old_state, action, reward, new_state)
+
+    def sample_transition(self):
+        action = self.env.action_space.sample()
+        old_state = self.state
+        new_state, reward, is_done, _ = self.env.step(action)
+        self.state = self.env.reset() if is_done else new_state
+        return (old_state, action, reward, new_state, is_done)
+
+    def best_value_and_action(self, state):
+        best_value, best_action = None, None
+        for action in range(self.env.action_space.n):
+            action_value = self.values[(state, action)]
+            if best_value is None or best_value < action_value:
+                best_value = action_value
+                best_action = action
+        return best_value, best_action
+
+    def value_update(self, s, a, r, next_s):
+        best_v, _ = self.best_value_and_action(next_s)
+        new_val = r + self.gamma * best_v
+        old_val = self.values[(s, a)]
+        self.values[(s, a)] = old_val * (1-self.alpha) + new_val * self.alpha
+
+    def play_episode(self, env):
+        total_reward = 0.0
+        state = env.reset()
+        while True:
+            _, action = self.best_value_and_action(state)
+            new_state, reward, is_done, _ = env.step(action)
+            total_reward += reward
+            if is_done:
+                break
+            state = new_state
+        return total_reward
+
+
+def q_table(agent):
+    if isinstance(agent.values, QTable):
+        return agent.values.array.copy()
+    n_states, n_actions = agent.env.observation_space.n, agent.env.action_space.n
+    table = np.zeros((n_states, n_actions), dtype=np.float64)
+    for (s, a), value in agent.values.items():
+        table[s, a] = value
+    return table
+
+
+def make_table_agent(env=None, gamma=GAMMA, alpha=ALPHA):
+    env = gym.make(ENV_NAME) if env is None else env
+    values = QTable(env.observation_space.n, env.action_space.n)
+    return Agent(env=env, gamma=gamma, alpha=alpha, values=values)
+
+
+def set_seed(agent, test_env, seed):
+    agent.env.seed(seed)
+    agent.env.action_space.seed(seed)
+    agent.state = agent.env.reset()
+    test_env.seed(seed + 1)
+
+
+def evaluate_fixed(agent, test_env, test_episodes=TEST_EPISODES):
+    reward = 0.0
+    for _ in range(test_episodes):
+        reward += agent.play_episode(test_env)
+    return reward / test_episodes
+
+
+def train(agent, test_env, test_episodes=TEST_EPISODES, evaluate=None):
+    """
+    The Q-learning loop: one sampled transition and value update per iteration,
+    followed by the greedy policy evaluation. Yields (iter_no, reward).
+    evaluate(agent) replaces the fixed TEST_EPISODES average when given.
+    """
+    iter_no = 0
+    while True:
+        iter_no += 1
+        s, a, r, next_s = agent.sample_env()
+        agent.value_update(s, a, r, next_s)
+
+        if evaluate is None:
+            reward = evaluate_fixed(agent, test_env, test_episodes)
+        else:
+            reward = evaluate(agent)
+        yield iter_no, reward
@@ -0,0 +1,116 @@
+import numpy as np
+
+from lib import q_learning
+
+
+REPLAY_SIZE = 10000
+REPLAY_BATCH = 32
+REPLAY_RATIO = 32
+PRIO_ALPHA = 0.6
+PRIO_BETA = 0.4
+PRIO_EPS = 1e-3
+
+
+class ReplayBuffer:
+    """
+    Preallocated ring buffer of (s, a, r, s', done) transitions for discrete
+    envs. With prioritized=True, batches are drawn proportionally to
+    (|td_error| + eps) ** prio_alpha and come with importance weights.
+    """
+    def __init__(self, capacity=REPLAY_SIZE, prioritized=False, prio_alpha=PRIO_ALPHA,
+                 prio_beta=PRIO_BETA, seed=None):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.prio_alpha = prio_alpha
+        self.prio_beta = prio_beta
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+        self.max_priority = 1.0
+        self.pos = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, s, a, r, next_s, done):
+        idx = self.pos
+        self.states[idx] = s
+        self.actions[idx] = a
+        self.rewards[idx] = r
+        self.next_states[idx] = next_s
+        self.dones[idx] = done
+        self.priorities[idx] = self.max_priority
+        self.pos = (self.pos + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Returns (indices, weights); weights are all ones for uniform sampling
+        """
+        if not self.prioritized:
+            idx = self.rng.integers(0, self.size, size=batch_size)
+            return idx, np.ones(batch_size)
+        prios = self.priorities[:self.size] ** self.prio_alpha
+        probs = prios / prios.sum()
+        idx = self.rng.choice(self.size, size=batch_size, p=probs)
+        weights = (self.size * probs[idx]) ** (-self.prio_beta)
+        return idx, weights / weights.max()
+
+    def update_priorities(self, idx, td_errors):
+        self.priorities[idx] = np.abs(td_errors) + PRIO_EPS
+        self.max_priority = max(self.max_priority, float(self.priorities[idx].max()))
+
+
+def replay_update(table, buffer, idx, weights, gamma, alpha):
+    """
+    One batched Q-learning backup on a (n_states, n_actions) array. Repeated
+    (s, a) pairs in the batch share their mean weighted TD error, so the
+    result does not depend on the order inside the batch. Returns TD errors.
+    """
+    s, a = buffer.states[idx], buffer.actions[idx]
+    best_next = table[buffer.next_states[idx]].max(axis=1)
+    targets = buffer.rewards[idx] + gamma * best_next * ~buffer.dones[idx]
+    td_errors = targets - table[s, a]
+    flat = s * table.shape[1] + a
+    sums = np.bincount(flat, weights=td_errors * weights, minlength=table.size)
+    counts = np.bincount(flat, minlength=table.size)
+    hit = counts > 0
+    table.reshape(-1)[hit] += alpha * sums[hit] / counts[hit]
+    return td_errors
+
+
+def train(agent, buffer, test_env, replay_ratio=REPLAY_RATIO, batch_size=REPLAY_BATCH,
+          test_episodes=q_learning.TEST_EPISODES, evaluate=None):
+    """
+    Q-learning loop where every real step also feeds the replay buffer and
+    drives replay_ratio replayed updates in batches of batch_size.
+    agent.values must be a QTable. Yields (iter_no, reward) like q_learning.train.
+    """
+    table = agent.values.array
+    credit = 0.0
+    iter_no = 0
+    while True:
+        iter_no += 1
+        s, a, r, next_s, is_done = agent.sample_transition()
+        agent.value_update(s, a, r, next_s)
+        buffer.append(s, a, r, next_s, is_done)
+
+        if len(buffer) >= batch_size:
+            credit += replay_ratio
+        while credit >= batch_size:
+            idx, weights = buffer.sample(batch_size)
+            td_errors = replay_update(table, buffer, idx, weights, agent.gamma, agent.alpha)
+            if buffer.prioritized:
+                buffer.update_priorities(idx, td_errors)
+            credit -= batch_size
+
+        if evaluate is None:
+            reward = q_learning.evaluate_fixed(agent, test_env, test_episodes)
+        else:
+            reward = evaluate(agent)
+        yield iter_no, reward
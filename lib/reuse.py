@@ -0,0 +1,92 @@
+from collections import deque, namedtuple
+
+import numpy as np
+import torch
+
+from lib import cross_entropy
+from lib.learner import Learner
+
+
+HISTORY_EPISODES = 400
+# the cap bench_reuse.py was measured with
+TRUNCATE_IS = 3.0
+# floor for behaviour probabilities of a quantized rollout policy, which can round to zero
+MIN_PROB = 1e-8
+
+LoggedEpisode = namedtuple("LoggedEpisode", field_names=["reward", "steps", "log_probs"])
+ReuseStep = namedtuple("ReuseStep", field_names=cross_entropy.TrainStep._fields + ("ess", ))
+
+
+def action_log_probs(net, episodes, policy=None):
+    """
+    Per-step log-probabilities of the taken actions under net, or under a
+    lib.inference rollout policy (which returns probabilities), one array per episode
+    """
+    obs_v = torch.from_numpy(np.stack([s.observation for e in episodes for s in e.steps]))
+    acts_v = torch.tensor([s.action for e in episodes for s in e.steps], dtype=torch.int64)
+    with torch.no_grad():
+        if policy is None:
+            logp_v = torch.log_softmax(net(obs_v), dim=1)
+        else:
+            logp_v = torch.log(policy(obs_v).float().clamp_min(MIN_PROB))
+        logp_v = logp_v.gather(1, acts_v.unsqueeze(1)).squeeze(1)
+    return np.split(logp_v.numpy(), np.cumsum([len(e.steps) for e in episodes])[:-1])
+
+
+def importance_weights(net, episodes, truncate=TRUNCATE_IS):
+    """
+    Truncated trajectory importance weights min(pi(tau) / mu(tau), truncate)
+    of logged episodes under the current net; the dynamics cancel, so only
+    the action log-probabilities enter
+    """
+    current = action_log_probs(net, episodes)
+    log_ratio = np.array([cur.sum() - e.log_probs.sum() for cur, e in zip(current, episodes)])
+    return np.exp(np.minimum(log_ratio, np.log(truncate)))
+
+
+def train(env, net, optimizer, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+          gamma=cross_entropy.GAMMA, history=HISTORY_EPISODES, truncate=TRUNCATE_IS, recorder=None,
+          learner=None, policy=None, vec_env=None, memory=None):
+    """
+    Cross-entropy with off-policy reuse: every rollout episode is stamped
+    with its behaviour log-probabilities and kept for the last history
+    episodes, elite or not. Each iteration the whole history is reweighted
+    by truncated importance weights under the current net; the weights
+    enter the reward-bound percentile and the loss of every elite step.
+    Fresh episodes have weight 1, so this is the plain loop when history
+    is batch_size.
+
+    Stamping happens when a batch arrives, with what produced it: the
+    rollout policy if one is given, else net. The ratios are still taken
+    against net, the policy being trained. That is exact for
+    iterate_batches; with vec_env, steps of episodes that
+    straddle a learner step are stamped with the newer weights.
+    """
+    if learner is None:
+        learner = Learner(net, optimizer)
+    if vec_env is None:
+        batches = cross_entropy.iterate_batches(env, net, batch_size, recorder=recorder, policy=policy)
+    else:
+        batches = cross_entropy.iterate_batches_vec(vec_env, net, batch_size, recorder=recorder, policy=policy)
+    logged = deque(maxlen=history)
+    for iter_no, batch in enumerate(batches):
+        reward_mean = float(np.mean(list(map(lambda s: s.reward, batch))))
+        log_probs = action_log_probs(net, batch, policy)
+        logged.extend(LoggedEpisode(e.reward, e.steps, lp) for e, lp in zip(batch, log_probs))
+        episodes = list(logged)
+        weights = importance_weights(net, episodes, truncate)
+        ess = float(weights.sum() ** 2 / max((weights ** 2).sum(), 1e-12))
+        elite_idx, reward_bound = cross_entropy.filter_weighted(episodes, weights, percentile, gamma)
+        if not len(elite_idx):
+            yield ReuseStep(iter_no, None, reward_mean, reward_bound, 0, ess)
+            continue
+
+        elites = [episodes[i] for i in elite_idx]
+        obs = [s.observation for e in elites for s in e.steps]
+        acts = [s.action for e in elites for s in e.steps]
+        loss = learner.step(obs, acts, np.repeat(weights[elite_idx], [len(e.steps) for e in elites]))
+        if policy is not None:
+            policy.refresh()
+        if memory is not None:
+            memory.update(elites, learner)
+        yield ReuseStep(iter_no, loss, reward_mean, reward_bound, len(elites), ess)
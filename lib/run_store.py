@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import time
+import sqlite3
+
+import numpy as np
+
+
+STORE_DIR = "metrics_store"
+FLUSH_EVERY = 256
+STEP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f8")
+SUMMARY_STATS = ("count", "first_step", "last_step", "last_value", "min_value", "max_value", "mean_value",
+                 "iterations")
+# iterations counts steps up to the last point, not logged points, so gaps
+# in a series (e.g. iterations without a learner step) do not shorten it
+STAT_COLUMNS = dict({stat: "series." + stat for stat in SUMMARY_STATS}, iterations="series.last_step + 1")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    config TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS series (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    file TEXT NOT NULL,
+    count INTEGER, first_step INTEGER, last_step INTEGER,
+    last_value REAL, min_value REAL, max_value REAL, mean_value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS series_name ON series(name);
+"""
+
+
+def series_file(name):
+    return re.sub(r"[^\w.\-]", "_", name)
+
+
+def config_key(key):
+    if not re.match(r"^\w+$", key):
+        raise ValueError("bad config key %r" % key)
+    return "json_extract(runs.config, '$.%s')" % key
+
+
+class RunWriter:
+    """
+    Scalar series of one run, one pair of append-only column files per
+    series under runs/<id>/: <name>.step (int64) and <name>.value
+    (float64), both memory-mappable as flat arrays. Points are buffered and
+    flushed every flush_every points; close() flushes, stores per-series
+    summaries in the index and records the run status.
+    """
+    def __init__(self, store, run_id, flush_every=FLUSH_EVERY):
+        self.store = store
+        self.run_id = run_id
+        self.path = store.run_path(run_id)
+        os.makedirs(self.path, exist_ok=True)
+        self.flush_every = flush_every
+        self.buffers = {}
+        self.files = {}
+        self.closed = False
+
+    def add_scalar(self, name, value, step):
+        buf = self.buffers.setdefault(name, ([], []))
+        buf[0].append(int(step))
+        buf[1].append(float(value))
+        if len(buf[0]) >= self.flush_every:
+            self.flush(name)
+
+    def flush(self, name=None):
+        for key in [name] if name is not None else list(self.buffers):
+            steps, values = self.buffers[key]
+            if not steps:
+                continue
+            if key not in self.files:
+                base = os.path.join(self.path, series_file(key))
+                self.files[key] = (open(base + ".step", "ab"), open(base + ".value", "ab"))
+            step_fd, value_fd = self.files[key]
+            step_fd.write(np.asarray(steps, dtype=STEP_DTYPE).tobytes())
+            value_fd.write(np.asarray(values, dtype=VALUE_DTYPE).tobytes())
+            step_fd.flush()
+            value_fd.flush()
+            self.buffers[key] = ([], [])
+
+    def close(self, status="finished"):
+        if self.closed:
+            return
+        self.flush()
+        for step_fd, value_fd in self.files.values():
+            step_fd.close()
+            value_fd.close()
+        rows = []
+        for name in self.files:
+            steps, values = self.store.series(self.run_id, name)
+            rows.append((self.run_id, name, series_file(name), len(steps), int(steps[0]), int(steps[-1]),
+                         float(values[-1]), float(values.min()), float(values.max()), float(values.mean())))
+        with self.store.db:
+            self.store.db.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.store.db.execute("UPDATE runs SET status = ?, finished = ? WHERE id = ?",
+                                  (status, time.time(), self.run_id))
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close("failed" if exc_type is not None else "finished")
+
+
+class MetricsStore:
+    """
+    Local store of many runs: series in per-run column files and an SQLite
+    index (index.sqlite) of run configs, statuses and per-series summaries.
+    Cross-run questions such as "iterations to solve by percentile" are one
+    SQL query over the summaries; full curves are read by memory-mapping the
+    column files.
+    """
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def run_path(self, run_id):
+        return os.path.join(self.root, "runs", "%06d" % run_id)
+
+    def create_run(self, config, name=None, flush_every=FLUSH_EVERY):
+        with self.db:
+            cur = self.db.execute("INSERT INTO runs (name, config, status, started) VALUES (?, ?, ?, ?)",
+                                  (name, json.dumps(config, sort_keys=True), "running", time.time()))
+        return RunWriter(self, cur.lastrowid, flush_every=flush_every)
+
+    def set_status(self, run_id, status):
+        with self.db:
+            self.db.execute("UPDATE runs SET status = ? WHERE id = ?", (status, run_id))
+
+    def select(self, where=None, status=None):
+        """
+        Run ids whose config matches every key -> value of where (a list
+        value matches any of its items) and, if given, with that status
+        """
+        clauses, params = self._filters(where, status)
+        sql = "SELECT id FROM runs" + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY id"
+        return [row[0] for row in self.db.execute(sql, params)]
+
+    def config(self, run_id):
+        row = self.db.execute("SELECT config FROM runs WHERE id = ?", (run_id, )).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def series(self, run_id, name):
+        """
+        (steps, values) of one series as read-only memory maps, empty
+        arrays if the run has no data for it
+        """
+        base = os.path.join(self.run_path(run_id), series_file(name))
+        if not os.path.exists(base + ".step") or not os.path.getsize(base + ".step"):
+            return np.zeros(0, dtype=STEP_DTYPE), np.zeros(0, dtype=VALUE_DTYPE)
+        return (np.memmap(base + ".step", dtype=STEP_DTYPE, mode="r"),
+                np.memmap(base + ".value", dtype=VALUE_DTYPE, mode="r"))
+
+    def summary(self, name, stat="iterations", by=None, where=None, status=None):
+        """
+        Per-run summary stat of series name over the matching runs, as
+        group -> array when grouped by the config key by, else one array
+        """
+        if stat not in SUMMARY_STATS:
+            raise ValueError("stat must be one of %s" % ", ".join(SUMMARY_STATS))
+        clauses, params = self._filters(where, status)
+        group = config_key(by) if by is not None else "NULL"
+        sql = ("SELECT %s, %s FROM series JOIN runs ON runs.id = series.run_id WHERE series.name = ?%s"
+               % (group, STAT_COLUMNS[stat], "".join(" AND " + c for c in clauses)))
+        rows = self.db.execute(sql, [name] + params).fetchall()
+        if by is None:
+            return np.array([value for _, value in rows], dtype=np.float64)
+        groups = {}
+        for key, value in rows:
+            groups.setdefault(key, []).append(value)
+        return {key: np.array(values, dtype=np.float64) for key, values in sorted(groups.items())}
+
+    def curves(self, name, run_ids, max_step=None):
+        """
+        Series name of several runs aligned by step, as (steps, values) with
+        values of shape (len(run_ids), len(steps)) and NaN where a run has no point
+        """
+        series = [self.series(run_id, name) for run_id in run_ids]
+        if max_step is None:
+            max_step = max([int(steps[-1]) for steps, _ in series if len(steps)] or [-1])
+        values = np.full((len(run_ids), max_step + 1), np.nan)
+        for row, (steps, vals) in zip(values, series):
+            keep = steps <= max_step
+            row[steps[keep]] = vals[keep]
+        return np.arange(max_step + 1), values
+
+    def names(self, run_id):
+        return [row[0] for row in self.db.execute("SELECT name FROM series WHERE run_id = ? ORDER BY name",
+                                                  (run_id, ))]
+
+    def export_tensorboard(self, run_id, writer):
+        """
+        Replays every stored series of a run into a SummaryWriter
+        """
+        for name in self.names(run_id):
+            for step, value in zip(*self.series(run_id, name)):
+                writer.add_scalar(name, float(value), int(step))
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _filters(where, status):
+        clauses, params = [], []
+        for key, value in sorted((where or {}).items()):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            clauses.append("%s IN (%s)" % (config_key(key), ", ".join("?" * len(values))))
+            params.extend(values)
+        if status is not None:
+            clauses.append("runs.status = ?")
+            params.append(status)
+        return clauses, params
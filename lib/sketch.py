@@ -0,0 +1,79 @@
+import struct
+
+import numpy as np
+
+SKETCH_CAPACITY = 256
+
+
+def weighted_percentile(values, weights, percentile):
+    """
+    np.percentile (linear interpolation) of values where every value is
+    repeated weight times; integer weights give exactly np.percentile of the
+    expanded data, fractional weights interpolate the same ranks
+    """
+    order = np.argsort(values, kind="stable")
+    values, cum = np.asarray(values, dtype=np.float64)[order], np.cumsum(np.asarray(weights, dtype=np.float64)[order])
+    rank = percentile / 100.0 * (cum[-1] - 1)
+    lo = np.floor(rank)
+    idx = np.searchsorted(cum, [lo, lo + 1], side="right")
+    v_lo, v_hi = values[min(idx[0], len(values) - 1)], values[min(idx[1], len(values) - 1)]
+    return float(v_lo + (rank - lo) * (v_hi - v_lo))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile summary as (value, weight) centroids. It is exact
+    while the distinct values fit into capacity, which is always the case
+    for FrozenLake's discounted rewards (0 or gamma ** length); beyond that,
+    neighbouring centroids are merged into capacity equal-weight groups.
+    """
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.values = np.zeros(0, dtype=np.float64)
+        self.weights = np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def from_values(cls, values, weights=None, capacity=SKETCH_CAPACITY):
+        sketch = cls(capacity)
+        values = np.asarray(values, dtype=np.float64)
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+        sketch.add(values, weights)
+        return sketch
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def add(self, values, weights):
+        values, inverse = np.unique(np.concatenate((self.values, values)), return_inverse=True)
+        self.weights = np.bincount(inverse, weights=np.concatenate((self.weights, weights)), minlength=len(values))
+        self.values = values
+        if len(self.values) > self.capacity:
+            self.compress()
+
+    def merge(self, other):
+        self.add(other.values, other.weights)
+        return self
+
+    def compress(self):
+        cum = np.cumsum(self.weights)
+        group = np.minimum((cum - self.weights / 2) / cum[-1] * self.capacity, self.capacity - 1).astype(np.int64)
+        weights = np.bincount(group, weights=self.weights)
+        keep = weights > 0
+        self.values = (np.bincount(group, weights=self.values * self.weights) / np.maximum(weights, 1e-300))[keep]
+        self.weights = weights[keep]
+
+    def percentile(self, percentile):
+        return weighted_percentile(self.values, self.weights, percentile)
+
+    def to_bytes(self):
+        return struct.pack("!I", len(self.values)) + self.values.astype(">f8").tobytes() + \
+            self.weights.astype(">f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, capacity=SKETCH_CAPACITY):
+        n = struct.unpack_from("!I", data)[0]
+        sketch = cls(capacity)
+        sketch.values = np.frombuffer(data, dtype=">f8", count=n, offset=4).astype(np.float64)
+        sketch.weights = np.frombuffer(data, dtype=">f8", count=n, offset=4 + 8 * n).astype(np.float64)
+        return sketch
@@ -0,0 +1,150 @@
+from collections import namedtuple
+import numpy as np
+
+from lib import q_learning
+
+
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 100000
+EVAL_SWEEPS = 20
+EXACT_EVAL_LIMIT = 4096
+
+# successors are stored padded to the widest outcome list, so a (n_states,
+# n_actions, width) layout doubles as a sparse format (width is 3 for
+# FrozenLake regardless of map size). probs only hold the continuing mass:
+# outcomes that end the episode contribute their reward but no bootstrap.
+TabularMDP = namedtuple('TabularMDP', field_names=['next_states', 'probs', 'rewards'])
+Solution = namedtuple('Solution', field_names=['q', 'v', 'policy', 'iterations'])
+
+
+def build_mdp(env):
+    """
+    Converts env.P of a discrete toy-text env (FrozenLakeEnv and friends)
+    """
+    P = env.unwrapped.P
+    n_states, n_actions = env.observation_space.n, env.action_space.n
+    rows = [P[s][a] for s in range(n_states) for a in range(n_actions)]
+    width = max(map(len, rows))
+    pad = [(0.0, 0, 0.0, True)]
+    table = np.array([row + pad * (width - len(row)) for row in rows], dtype=np.float64)
+    table = table.reshape(n_states, n_actions, width, 4)
+    probs, next_states, rewards, dones = np.moveaxis(table, -1, 0)
+    return TabularMDP(next_states=next_states.astype(np.int64),
+                      probs=probs * (1.0 - dones),
+                      rewards=(probs * rewards).sum(axis=2))
+
+
+def dense_transitions(mdp):
+    """
+    Continuing transition probabilities as a dense (n_states, n_actions, n_states) array
+    """
+    n_states, n_actions, _ = mdp.next_states.shape
+    P = np.zeros((n_states, n_actions, n_states))
+    s_idx, a_idx, _ = np.indices(mdp.next_states.shape)
+    np.add.at(P, (s_idx, a_idx, mdp.next_states), mdp.probs)
+    return P
+
+
+def q_from_v(mdp, v, gamma):
+    return mdp.rewards + gamma * (mdp.probs * v[mdp.next_states]).sum(axis=2)
+
+
+def value_iteration(mdp, gamma=q_learning.GAMMA, tol=TOLERANCE, max_iters=MAX_ITERATIONS):
+    v = np.zeros(mdp.rewards.shape[0])
+    for iteration in range(1, max_iters + 1):
+        new_v = q_from_v(mdp, v, gamma).max(axis=1)
+        delta = np.abs(new_v - v).max()
+        v = new_v
+        if delta < tol:
+            break
+    q = q_from_v(mdp, v, gamma)
+    return Solution(q=q, v=v, policy=q.argmax(axis=1), iterations=iteration)
+
+
+def evaluate_policy(mdp, policy, gamma=q_learning.GAMMA, v=None, sweeps=None, tol=TOLERANCE,
+                    max_iters=MAX_ITERATIONS):
+    """
+    Values of a deterministic policy. Without sweeps, small models are solved
+    exactly as a linear system and large ones iterated to tol; with sweeps,
+    exactly that many backups are applied starting from v.
+    """
+    n_states = mdp.rewards.shape[0]
+    idx = np.arange(n_states)
+    next_states, probs, rewards = mdp.next_states[idx, policy], mdp.probs[idx, policy], mdp.rewards[idx, policy]
+    if sweeps is None and n_states <= EXACT_EVAL_LIMIT:
+        P = np.zeros((n_states, n_states))
+        np.add.at(P, (np.repeat(idx, next_states.shape[1]), next_states.ravel()), probs.ravel())
+        return np.linalg.solve(np.eye(n_states) - gamma * P, rewards)
+    v = np.zeros(n_states) if v is None else v
+    for iteration in range(sweeps or max_iters):
+        new_v = rewards + gamma * (probs * v[next_states]).sum(axis=1)
+        delta = np.abs(new_v - v).max()
+        v = new_v
+        if sweeps is None and delta < tol:
+            break
+    return v
+
+
+def evaluate_stochastic(mdp, probs, gamma=q_learning.GAMMA, horizon=None):
+    """
+    Values of a stochastic policy, probs is (n_states, n_actions). Without
+    horizon, the infinite-horizon values as a linear system; with it, the
+    exact expected return of episodes cut after horizon steps, as gym's
+    TimeLimit does, by horizon backups of the induced Markov chain.
+    """
+    n_states = mdp.rewards.shape[0]
+    rewards = (probs * mdp.rewards).sum(axis=1)
+    P = np.einsum("sa,sat->st", probs, dense_transitions(mdp))
+    if horizon is None:
+        return np.linalg.solve(np.eye(n_states) - gamma * P, rewards)
+    v = np.zeros(n_states)
+    for _ in range(horizon):
+        v = rewards + gamma * P.dot(v)
+    return v
+
+
+def policy_iteration(mdp, gamma=q_learning.GAMMA, tol=TOLERANCE, max_iters=MAX_ITERATIONS, sweeps=None):
+    """
+    Howard's policy iteration; with sweeps set it becomes modified policy
+    iteration (partial evaluation, stopped on the Bellman residual).
+    """
+    n_states = mdp.rewards.shape[0]
+    idx = np.arange(n_states)
+    policy = np.zeros(n_states, dtype=np.int64)
+    v = np.zeros(n_states)
+    for iteration in range(1, max_iters + 1):
+        v = evaluate_policy(mdp, policy, gamma, v=v, sweeps=sweeps, tol=tol)
+        q = q_from_v(mdp, v, gamma)
+        best = q.max(axis=1)
+        # keep the current action on ties so the loop terminates
+        new_policy = np.where(q[idx, policy] >= best - 1e-12, policy, q.argmax(axis=1))
+        if sweeps is None:
+            stable = (new_policy == policy).all()
+        else:
+            stable = np.abs(best - v).max() < tol
+        policy = new_policy
+        if stable:
+            break
+    q = q_from_v(mdp, v, gamma)
+    return Solution(q=q, v=q.max(axis=1), policy=q.argmax(axis=1), iterations=iteration)
+
+
+def modified_policy_iteration(mdp, gamma=q_learning.GAMMA, tol=TOLERANCE, max_iters=MAX_ITERATIONS,
+                              sweeps=EVAL_SWEEPS):
+    return policy_iteration(mdp, gamma, tol=tol, max_iters=max_iters, sweeps=sweeps)
+
+
+SOLVERS = {
+    "vi": value_iteration,
+    "pi": policy_iteration,
+    "mpi": modified_policy_iteration,
+}
+
+
+def as_values(q):
+    """
+    Q-table ready to be used as Agent.values
+    """
+    values = q_learning.QTable(*q.shape)
+    values.array[:] = q
+    return values
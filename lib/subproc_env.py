@@ -0,0 +1,129 @@
+import ctypes
+import multiprocessing
+
+import numpy as np
+
+
+class SubprocVectorEnv:
+    """
+    Vector env for arbitrary gym env stacks (e.g. TimeLimit + DiscreteOneHotWrapper),
+    each env_fns entry is a picklable factory. The envs are split over
+    n_workers child processes. Observations, rewards and done flags live in
+    shared memory written by the children in place; the pipes only carry
+    short commands, actions are shared the same way.
+
+    The interface follows FrozenLakeVectorEnv: step(actions) returns
+    (next observations, rewards, dones) with the next observations from
+    before any reset, done envs are reset automatically and states holds
+    the observations after the resets. Everything returned is a view of the
+    shared buffers, valid until the next step(). With seed, child env i is
+    seeded with seed + i, as seed() does.
+    """
+    def __init__(self, env_fns, n_workers=None, seed=None, context=None):
+        self.n_envs = len(env_fns)
+        n_workers = min(n_workers or multiprocessing.cpu_count(), self.n_envs)
+        ctx = multiprocessing.get_context(context)
+        self.rng = np.random.default_rng(seed)
+
+        probe = env_fns[0]()
+        self.observation_space, self.action_space = probe.observation_space, probe.action_space
+        probe.close()
+        obs_shape = self.observation_space.shape
+        obs_dtype = np.dtype(self.observation_space.dtype)
+        self.buffers = {
+            "obs": (ctx.RawArray(ctypes.c_char, self.n_envs * int(np.prod(obs_shape)) * obs_dtype.itemsize),
+                    obs_dtype, (self.n_envs, ) + obs_shape),
+            "next_obs": (ctx.RawArray(ctypes.c_char, self.n_envs * int(np.prod(obs_shape)) * obs_dtype.itemsize),
+                         obs_dtype, (self.n_envs, ) + obs_shape),
+            "rewards": (ctx.RawArray(ctypes.c_char, self.n_envs * 8), np.float64, (self.n_envs, )),
+            "dones": (ctx.RawArray(ctypes.c_char, self.n_envs), np.bool_, (self.n_envs, )),
+            "actions": (ctx.RawArray(ctypes.c_char, self.n_envs * 8), np.int64, (self.n_envs, )),
+        }
+        self.states, self.next_states, self.rewards, self.dones, self.actions = (
+            as_array(*self.buffers[name]) for name in ("obs", "next_obs", "rewards", "dones", "actions"))
+
+        bounds = np.linspace(0, self.n_envs, n_workers + 1).astype(int)
+        self.pipes, self.procs = [], []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=worker, args=(child, env_fns[start:end], start, self.buffers, seed), daemon=True)
+            proc.start()
+            child.close()
+            self.pipes.append(parent)
+            self.procs.append(proc)
+        self.closed = False
+
+    def _call(self, cmd, arg=None):
+        for pipe in self.pipes:
+            pipe.send((cmd, arg))
+        results = [pipe.recv() for pipe in self.pipes]
+        for res in results:
+            if isinstance(res, Exception):
+                raise res
+        return results
+
+    def seed(self, seed):
+        self._call("seed", seed)
+
+    def reset(self):
+        self._call("reset")
+        return self.states
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._call("step")
+        return self.next_states, self.rewards, self.dones
+
+    def close(self):
+        if self.closed:
+            return
+        self._call("close")
+        for proc in self.procs:
+            proc.join()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def as_array(buffer, dtype, shape):
+    return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+
+def seed_envs(envs, seed, offset):
+    for i, env in enumerate(envs):
+        env_seed = None if seed is None else int(seed + offset + i)
+        env.seed(env_seed)
+        env.action_space.seed(env_seed)
+
+
+def worker(pipe, env_fns, offset, buffers, seed=None):
+    envs = [fn() for fn in env_fns]
+    if seed is not None:
+        seed_envs(envs, seed, offset)
+    sl = slice(offset, offset + len(envs))
+    obs, next_obs, rewards, dones, actions = (as_array(*buffers[name])[sl] for name in (
+        "obs", "next_obs", "rewards", "dones", "actions"))
+    while True:
+        cmd, arg = pipe.recv()
+        try:
+            if cmd == "step":
+                for i, env in enumerate(envs):
+                    next_obs[i], rewards[i], dones[i], _ = env.step(int(actions[i]))
+                    obs[i] = env.reset() if dones[i] else next_obs[i]
+            elif cmd == "reset":
+                for i, env in enumerate(envs):
+                    obs[i] = env.reset()
+            elif cmd == "seed":
+                seed_envs(envs, arg, offset)
+            elif cmd == "close":
+                for env in envs:
+                    env.close()
+                pipe.send(None)
+                return
+            pipe.send(None)
+        except Exception as e:
+            pipe.send(e)
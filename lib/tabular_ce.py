@@ -0,0 +1,120 @@
+from collections import namedtuple
+
+import numpy as np
+
+from lib import cross_entropy, vector_env
+
+
+ALPHA = 0.5
+SMOOTHING = 0.1
+
+EpisodeBatch = namedtuple("EpisodeBatch", field_names=["states", "actions", "lengths", "rewards"])
+
+
+class TabularPolicy:
+    """
+    Cross-entropy policy as a (states, actions) probability table. update()
+    refits the rows of the visited states to the smoothed elite action
+    frequencies (counts + smoothing, normalized) and blends them in with
+    step size alpha; unvisited rows keep their probabilities.
+    """
+    def __init__(self, n_states, n_actions, alpha=ALPHA, smoothing=SMOOTHING):
+        self.probs = np.full((n_states, n_actions), 1.0 / n_actions)
+        self.alpha = alpha
+        self.smoothing = smoothing
+
+    def update(self, states, actions):
+        counts = np.zeros_like(self.probs)
+        np.add.at(counts, (states, actions), 1.0)
+        visited = counts.sum(axis=1) > 0
+        target = counts[visited] + self.smoothing
+        target /= target.sum(axis=1, keepdims=True)
+        self.probs[visited] = (1.0 - self.alpha) * self.probs[visited] + self.alpha * target
+
+    def loss(self, states, actions):
+        """
+        Cross-entropy of the elite actions under the table, comparable to the Net loss
+        """
+        return float(-np.log(self.probs[states, actions]).mean())
+
+
+def play_batch(vec_env, probs, count):
+    """
+    count fresh episodes of the table policy stepped side by side, as
+    padded (count, max_episode_steps) state and action arrays
+    """
+    steps = vec_env.max_episode_steps
+    all_states = np.zeros((count, steps), dtype=np.int64)
+    all_actions = np.zeros((count, steps), dtype=np.int64)
+    lengths = np.zeros(count, dtype=np.int64)
+    rewards = np.zeros(count, dtype=np.float64)
+    policy = vector_env.stochastic_policy(probs, vec_env.rng)
+    states = vec_env.sample_initial(count)
+    active = np.arange(count)
+    for t in range(steps):
+        actions = policy(states)
+        all_states[active, t] = states
+        all_actions[active, t] = actions
+        states, step_rewards, dones = vec_env.transition(states, actions)
+        rewards[active] += step_rewards
+        lengths[active] += 1
+        keep = ~dones
+        active, states = active[keep], states[keep]
+        if not len(active):
+            break
+    return EpisodeBatch(all_states, all_actions, lengths, rewards)
+
+
+def concat(a, b):
+    return EpisodeBatch(*(np.concatenate([x, y]) for x, y in zip(a, b)))
+
+
+def filter_elites(batch, percentile, gamma=cross_entropy.GAMMA):
+    """
+    filter_batch on an EpisodeBatch: episodes whose discounted reward is
+    strictly above the percentile, returns (elites, reward_bound)
+    """
+    disc_rewards = batch.rewards * gamma ** batch.lengths
+    reward_bound = np.percentile(disc_rewards, percentile)
+    mask = disc_rewards > reward_bound
+    return EpisodeBatch(*(x[mask] for x in batch)), reward_bound
+
+
+def elite_steps(elites):
+    valid = np.arange(elites.states.shape[1])[None, :] < elites.lengths[:, None]
+    return elites.states[valid], elites.actions[valid]
+
+
+def make_vec_env(slippery=True, map_name="4x4", seed=None):
+    """
+    Model of cross_entropy.make_env for play_batch, with the same time limit
+    """
+    env = cross_entropy.make_env(slippery=slippery, one_hot=False, map_name=map_name)
+    return vector_env.FrozenLakeVectorEnv(env, 1, max_episode_steps=env._max_episode_steps, seed=seed)
+
+
+def train(vec_env, table, batch_size=cross_entropy.BATCH_SIZE, percentile=cross_entropy.PERCENTILE,
+          gamma=cross_entropy.GAMMA, keep_elites=cross_entropy.KEEP_ELITES):
+    """
+    cross_entropy.train with a TabularPolicy instead of Net: batches come
+    from play_batch on a lib.vector_env.FrozenLakeVectorEnv, the percentile
+    runs over kept elites plus the new batch and the last keep_elites
+    elites are kept, as in the tweaked loop. Yields TrainSteps.
+    """
+    full_batch = None
+    iter_no = 0
+    while True:
+        batch = play_batch(vec_env, table.probs, batch_size)
+        reward_mean = float(batch.rewards.mean())
+        full_batch, reward_bound = filter_elites(batch if full_batch is None else concat(full_batch, batch),
+                                                 percentile, gamma)
+        if not len(full_batch.lengths):
+            full_batch = None
+            yield cross_entropy.TrainStep(iter_no, None, reward_mean, reward_bound, 0)
+        else:
+            full_batch = EpisodeBatch(*(x[-keep_elites:] for x in full_batch))
+            states, actions = elite_steps(full_batch)
+            loss = table.loss(states, actions)
+            table.update(states, actions)
+            yield cross_entropy.TrainStep(iter_no, loss, reward_mean, reward_bound, len(full_batch.lengths))
+        iter_no += 1
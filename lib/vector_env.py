@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class FrozenLakeVectorEnv:
+    """
+    N copies of a discrete toy-text env stepped together with numpy, built from
+    the transition table env.P. Observations are state indices; done copies are
+    reset automatically, like gym's vector envs.
+    """
+    def __init__(self, env, n_envs, max_episode_steps=100, seed=None):
+        env = env.unwrapped
+        self.n_states = env.observation_space.n
+        self.n_actions = env.action_space.n
+        self.n_envs = n_envs
+        self.max_episode_steps = max_episode_steps
+        self.rng = np.random.default_rng(seed)
+
+        width = max(len(env.P[s][a]) for s in range(self.n_states) for a in range(self.n_actions))
+        shape = (self.n_states, self.n_actions, width)
+        self.cum_probs = np.ones(shape, dtype=np.float64)
+        self.next_states = np.zeros(shape, dtype=np.int64)
+        self.rewards = np.zeros(shape, dtype=np.float32)
+        self.dones = np.zeros(shape, dtype=bool)
+        for s in range(self.n_states):
+            for a in range(self.n_actions):
+                outcomes = env.P[s][a]
+                probs = np.zeros(width)
+                for k, (prob, next_s, reward, done) in enumerate(outcomes):
+                    probs[k] = prob
+                    self.next_states[s, a, k] = next_s
+                    self.rewards[s, a, k] = reward
+                    self.dones[s, a, k] = done
+                self.cum_probs[s, a] = np.cumsum(probs)
+                self.cum_probs[s, a, len(outcomes) - 1:] = np.inf
+        self.initial_states = np.flatnonzero(np.asarray(env.isd) > 0)
+        self.initial_probs = np.asarray(env.isd)[self.initial_states]
+
+        self.states = None
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+
+    def sample_initial(self, count):
+        idx = self.rng.choice(len(self.initial_states), size=count, p=self.initial_probs)
+        return self.initial_states[idx]
+
+    def transition(self, states, actions):
+        """
+        Stateless step: sample next states for arbitrary (state, action) arrays
+        """
+        u = self.rng.random(len(states))
+        k = (u[:, None] >= self.cum_probs[states, actions]).sum(axis=1)
+        return (self.next_states[states, actions, k], self.rewards[states, actions, k],
+                self.dones[states, actions, k])
+
+    def reset(self):
+        self.states = self.sample_initial(self.n_envs)
+        self.steps[:] = 0
+        return self.states.copy()
+
+    def step(self, actions):
+        next_states, rewards, dones = self.transition(self.states, actions)
+        self.steps += 1
+        dones = dones | (self.steps >= self.max_episode_steps)
+        self.states = next_states
+        if dones.any():
+            self.states = next_states.copy()
+            self.states[dones] = self.sample_initial(int(dones.sum()))
+            self.steps[dones] = 0
+        return next_states, rewards, dones
+
+    def play_episodes(self, policy, count):
+        """
+        Runs exactly count fresh episodes side by side, policy maps a state
+        array to an action array. Returns total rewards and episode lengths.
+        """
+        states = self.sample_initial(count)
+        totals = np.zeros(count, dtype=np.float64)
+        lengths = np.zeros(count, dtype=np.int64)
+        active = np.arange(count)
+        for _ in range(self.max_episode_steps):
+            actions = policy(states)
+            states, rewards, dones = self.transition(states, actions)
+            totals[active] += rewards
+            lengths[active] += 1
+            keep = ~dones
+            active, states = active[keep], states[keep]
+            if not len(active):
+                break
+        return totals, lengths
+
+
+def greedy_policy(q_table):
+    actions = np.argmax(q_table, axis=1)
+    return lambda states: actions[states]
+
+
+def stochastic_policy(probs, rng):
+    cum_probs = np.cumsum(probs, axis=1)
+    cum_probs[:, -1] = np.inf
+
+    def policy(states):
+        u = rng.random(len(states))
+        return (u[:, None] >= cum_probs[states]).sum(axis=1)
+    return policy
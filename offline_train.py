@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import numpy as np
+import torch.optim as optim
+
+from lib import cross_entropy, episode_store, offline, vector_env
+
+
+EVAL_EPISODES = 1000
+REPORT_EVERY = 100
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--data", required=True, help="Episode store written by record_episodes.py or --record")
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Env used for evaluation")
+    parser.add_argument("--batch-size", type=int, default=cross_entropy.BATCH_SIZE,
+                        help="Episodes per elite selection group")
+    parser.add_argument("--percentile", type=float, default=cross_entropy.PERCENTILE)
+    parser.add_argument("--gamma", type=float, default=cross_entropy.GAMMA)
+    parser.add_argument("--keep-elites", type=int, default=cross_entropy.KEEP_ELITES)
+    parser.add_argument("--hidden-size", type=int, default=cross_entropy.HIDDEN_SIZE)
+    parser.add_argument("--lr", type=float, default=cross_entropy.LEARNING_RATE)
+    parser.add_argument("--minibatch", type=int, default=offline.MINIBATCH)
+    parser.add_argument("--epochs", type=int, default=offline.EPOCHS, help="Passes over every elite selection")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reader = episode_store.EpisodeReader(args.data)
+    env, net, _ = cross_entropy.make_trainer(slippery=not args.nonslippery, hidden_size=args.hidden_size,
+                                             seed=args.seed)
+    optimizer = optim.Adam(params=net.parameters(), lr=args.lr)
+    vec_env = vector_env.FrozenLakeVectorEnv(env, 1, seed=args.seed)
+    n_states = env.observation_space.shape[0]
+    print("Dataset: %d episodes, %d steps" % (len(reader), reader.n_steps))
+
+    ts = time.time()
+    elite_steps = 0
+    steps = offline.train(net, optimizer, reader, batch_size=args.batch_size, percentile=args.percentile,
+                          gamma=args.gamma, keep_elites=args.keep_elites, minibatch=args.minibatch,
+                          epochs=args.epochs)
+    for sel_no, loss, n_steps, reward_bound in steps:
+        elite_steps += n_steps
+        if sel_no % REPORT_EVERY == 0:
+            print("%d: loss=%.3f, reward_bound=%.3f, elite_steps=%d" % (sel_no, loss, reward_bound, n_steps))
+    elapsed = time.time() - ts
+
+    policy = vector_env.stochastic_policy(cross_entropy.policy_table(net, n_states), vec_env.rng)
+    returns, _ = vec_env.play_episodes(policy, EVAL_EPISODES)
+    print("Trained on %d elite steps in %.1fs (%.0f steps/s), policy reward_mean=%.3f over %d episodes" % (
+        elite_steps, elapsed, elite_steps / max(elapsed, 1e-9), np.mean(returns), EVAL_EPISODES))
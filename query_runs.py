@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+import numpy as np
+
+from lib import run_store
+
+
+def parse_where(texts):
+    """
+    key=v1,v2 entries, numbers parsed as such
+    """
+    where = {}
+    for text in texts:
+        key, spec = text.split("=", 1)
+        values = []
+        for item in spec.split(","):
+            try:
+                values.append(int(item))
+            except ValueError:
+                try:
+                    values.append(float(item))
+                except ValueError:
+                    values.append(item)
+        where[key] = values
+    return where
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("store", nargs="?", default=run_store.STORE_DIR, help="Metrics store directory")
+    parser.add_argument("-n", "--name", default="reward_mean", help="Series to query")
+    parser.add_argument("--stat", default="iterations", choices=run_store.SUMMARY_STATS,
+                        help="Per-run summary; iterations is last_step + 1 of the series, count the logged points")
+    parser.add_argument("--by", help="Config key to group runs by, e.g. percentile")
+    parser.add_argument("-w", "--where", action="append", default=[], help="Config filter key=v1,v2")
+    parser.add_argument("--status", help="Only runs with this status, e.g. solved")
+    parser.add_argument("--curve", default=False, action="store_true",
+                        help="Print the mean curve of the series per group instead of the summary")
+    parser.add_argument("--export", type=int, metavar="RUN_ID", help="Write one run to TensorBoard and exit")
+    args = parser.parse_args()
+    store = run_store.MetricsStore(args.store)
+
+    if args.export is not None:
+        from tensorboardX import SummaryWriter
+        writer = SummaryWriter(comment="-run-%d" % args.export)
+        store.export_tensorboard(args.export, writer)
+        writer.close()
+        raise SystemExit
+
+    where = parse_where(args.where)
+    ts = time.time()
+    if args.curve:
+        groups = {}
+        keys = ["all"] if args.by is None else sorted(set(
+            store.config(run_id)[args.by] for run_id in store.select(where, args.status)))
+        for key in keys:
+            group_where = dict(where) if args.by is None else dict(where, **{args.by: key})
+            steps, values = store.curves(args.name, store.select(group_where, args.status))
+            groups[key] = np.nanmean(values, axis=0) if len(values) else np.zeros(0)
+        elapsed = time.time() - ts
+        for key, curve in groups.items():
+            marks = np.unique(np.linspace(0, len(curve) - 1, 10).astype(int)) if len(curve) else []
+            print("%s: %s" % (key, " ".join("%d:%.3f" % (i, curve[i]) for i in marks)))
+    else:
+        groups = store.summary(args.name, args.stat, by=args.by, where=where, status=args.status)
+        elapsed = time.time() - ts
+        if args.by is None:
+            groups = {"all": groups}
+        print("%-12s %6s %10s %10s %10s %10s" % (args.by or "", "runs", "mean", "median", "min", "max"))
+        for key, values in groups.items():
+            if not len(values):
+                continue
+            print("%-12s %6d %10.3f %10.3f %10.3f %10.3f" % (key, len(values), values.mean(), np.median(values),
+                                                              values.min(), values.max()))
+    print("query took %.1f ms" % (elapsed * 1000.0))
+    store.close()
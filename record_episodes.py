@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import os
+import time
+import argparse
+import itertools
+import numpy as np
+
+from lib import cross_entropy, episode_store
+
+
+BATCHES = 50
+
+
+def rollout(env, net, batches, recorder=None):
+    ts = time.time()
+    episodes = 0
+    for batch in itertools.islice(cross_entropy.iterate_batches(env, net, cross_entropy.BATCH_SIZE, recorder), batches):
+        episodes += len(batch)
+    return time.time() - ts, episodes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output", required=True, help="Episode store directory")
+    parser.add_argument("--nonslippery", default=False, action="store_true")
+    parser.add_argument("-b", "--batches", type=int, default=BATCHES,
+                        help="Rollout batches of %d episodes" % cross_entropy.BATCH_SIZE)
+    args = parser.parse_args()
+
+    env, net, _ = cross_entropy.make_trainer(slippery=not args.nonslippery, seed=0)
+    plain_time, _ = rollout(env, net, args.batches)
+    with episode_store.EpisodeWriter(args.output, env.observation_space.shape, discrete=True) as recorder:
+        rec_time, episodes = rollout(env, net, args.batches, recorder)
+    print("Rollout %d episodes: %.2fs plain, %.2fs recording (%+.1f%%)" % (
+        episodes, plain_time, rec_time, 100.0 * (rec_time / plain_time - 1)))
+
+    ts = time.time()
+    reader = episode_store.EpisodeReader(args.output)
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    returns = np.concatenate([r for _, _, r in reader.iter_episode_stats()])
+    steps = sum(len(a) for _, a, _ in reader.iter_batches(4096))
+    print("Store: %d episodes, %d steps, %.1f bytes/step, mean return %.3f, streamed in %.3fs" % (
+        len(reader), steps, size / max(reader.n_steps, 1), returns.mean(), time.time() - ts))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import numpy as np
+import gym.envs.toy_text.frozen_lake as frozen_lake
+
+from lib import q_learning, solver
+
+
+LEARNER_STEPS = 20000
+
+
+def make_lake(size, slippery=True, seed=0):
+    if size in (4, 8):
+        return frozen_lake.FrozenLakeEnv(map_name="%dx%d" % (size, size), is_slippery=slippery)
+    np.random.seed(seed)
+    return frozen_lake.FrozenLakeEnv(desc=frozen_lake.generate_random_map(size), is_slippery=slippery)
+
+
+def run_learner(env, mdp, optimal, gamma, steps):
+    """
+    Sampled Q-learning on the same env, reporting distance to the exact solution as it goes
+    """
+    env.seed(0)
+    env.action_space.seed(0)
+    agent = q_learning.Agent(env=env, gamma=gamma, values=q_learning.QTable(*optimal.q.shape))
+    start_v = optimal.v[0]
+    ts = time.time()
+    for step in range(1, steps + 1):
+        agent.value_update(*agent.sample_env())
+        if step % (steps // 5) == 0:
+            q = agent.values.array
+            policy_v = solver.evaluate_policy(mdp, q.argmax(axis=1), gamma)
+            print("  learner %7d steps %6.2fs: max|Q-Q*|=%.4f, V_greedy(start)=%.4f of %.4f, policy agrees on %.0f%%" % (
+                step, time.time() - ts, np.abs(q - optimal.q).max(), policy_v[0], start_v,
+                100.0 * (q.argmax(axis=1) == optimal.policy).mean()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--size", type=int, default=4, help="Lake side; 4 and 8 use the built-in maps")
+    parser.add_argument("--nonslippery", default=False, action="store_true")
+    parser.add_argument("--gamma", type=float, default=q_learning.GAMMA)
+    parser.add_argument("--tol", type=float, default=solver.TOLERANCE)
+    parser.add_argument("-m", "--method", action="append", choices=sorted(solver.SOLVERS),
+                        help="Solvers to run, default all")
+    parser.add_argument("--learner-steps", type=int, default=LEARNER_STEPS,
+                        help="Sampled Q-learning steps to compare against, 0 to skip")
+    args = parser.parse_args()
+
+    ts = time.time()
+    env = make_lake(args.size, slippery=not args.nonslippery)
+    print("Env %dx%d built in %.2fs" % (args.size, args.size, time.time() - ts))
+    ts = time.time()
+    mdp = solver.build_mdp(env)
+    print("Model with %d states built in %.2fs" % (mdp.rewards.shape[0], time.time() - ts))
+
+    solutions = {}
+    for name in args.method or sorted(solver.SOLVERS):
+        ts = time.time()
+        solutions[name] = solution = solver.SOLVERS[name](mdp, args.gamma, tol=args.tol)
+        print("%4s: %5d iterations, %.3fs, V(start)=%.6f" % (
+            name, solution.iterations, time.time() - ts, solution.v[0]))
+    reference = solutions.get("vi", next(iter(solutions.values())))
+    for name, solution in solutions.items():
+        print("%4s: max|Q - Q_ref| = %.2e" % (name, np.abs(solution.q - reference.q).max()))
+
+    if args.learner_steps:
+        run_learner(env, mdp, reference, args.gamma, args.learner_steps)
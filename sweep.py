@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+import os
+import glob
+import json
+import time
+import random
+import hashlib
+import argparse
+import itertools
+import functools
+import multiprocessing
+
+import gym
+import numpy as np
+import torch
+
+from lib import cross_entropy, q_learning, machine_profile, run_store
+
+
+CACHE_DIR = ".sweep_cache"
+PRUNE_GRACE = 20
+PRUNE_INTERVAL = 10
+PRUNE_MIN_TRIALS = 3
+
+CROSS_ENTROPY_SPACE = {
+    "hidden_size": cross_entropy.HIDDEN_SIZE,
+    "batch_size": cross_entropy.BATCH_SIZE,
+    "percentile": cross_entropy.PERCENTILE,
+    "gamma": cross_entropy.GAMMA,
+    "lr": cross_entropy.LEARNING_RATE,
+}
+Q_LEARNING_SPACE = {
+    "gamma": q_learning.GAMMA,
+    "alpha": q_learning.ALPHA,
+}
+
+
+def run_cross_entropy(config, seed, max_iters, report, slippery=True):
+    env, net, optimizer = cross_entropy.make_trainer(
+        slippery=slippery, hidden_size=int(config["hidden_size"]), lr=config["lr"], seed=seed)
+    steps = cross_entropy.train(env, net, optimizer, batch_size=int(config["batch_size"]),
+                                percentile=config["percentile"], gamma=config["gamma"])
+    for step in steps:
+        report(step.reward_mean)
+        if step.reward_mean > cross_entropy.SOLVE_REWARD:
+            return "solved"
+        if step.iter_no + 1 >= max_iters:
+            return "exhausted"
+        if report.prune:
+            return "pruned"
+
+
+def run_q_learning(config, seed, max_iters, report):
+    agent = q_learning.Agent(gamma=config["gamma"], alpha=config["alpha"])
+    test_env = gym.make(q_learning.ENV_NAME)
+    q_learning.set_seed(agent, test_env, seed)
+    for iter_no, reward in q_learning.train(agent, test_env):
+        report(reward)
+        if reward > q_learning.SOLVE_REWARD:
+            return "solved"
+        if iter_no >= max_iters:
+            return "exhausted"
+        if report.prune:
+            return "pruned"
+
+
+TRAINERS = {
+    "cross-entropy": (CROSS_ENTROPY_SPACE, run_cross_entropy, 1000),
+    "cross-entropy-nonslippery": (CROSS_ENTROPY_SPACE,
+                                  functools.partial(run_cross_entropy, slippery=False), 1000),
+    "q-learning": (Q_LEARNING_SPACE, run_q_learning, 10000),
+}
+
+
+def grid_search(space):
+    keys = sorted(space)
+    values = [v if isinstance(v, list) else [v] for v in map(space.get, keys)]
+    for combo in itertools.product(*values):
+        yield dict(zip(keys, combo))
+
+
+def random_search(space, count, seed=None):
+    """
+    Lists are sampled uniformly, (low, high) tuples uniformly in the range and
+    ("log", low, high) log-uniformly. Scalars stay fixed.
+    """
+    rnd = random.Random(seed)
+    for _ in range(count):
+        config = {}
+        for key in sorted(space):
+            value = space[key]
+            if isinstance(value, list):
+                value = rnd.choice(value)
+            elif isinstance(value, tuple) and value[0] == "log":
+                value = float(np.exp(rnd.uniform(np.log(value[1]), np.log(value[2]))))
+            elif isinstance(value, tuple):
+                low, high = value
+                if isinstance(low, int) and isinstance(high, int):
+                    value = rnd.randint(low, high)
+                else:
+                    value = rnd.uniform(low, high)
+            config[key] = value
+        yield config
+
+
+def parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_param(text):
+    """
+    name=v1,v2,...  -> list of choices
+    name=low:high   -> uniform range
+    name=log:low:high -> log-uniform range
+    """
+    name, spec = text.split("=", 1)
+    if spec.startswith("log:"):
+        _, low, high = spec.split(":")
+        return name, ("log", float(low), float(high))
+    if ":" in spec:
+        low, high = spec.split(":")
+        return name, (parse_value(low), parse_value(high))
+    values = list(map(parse_value, spec.split(",")))
+    return name, values if len(values) > 1 else values[0]
+
+
+def code_version():
+    """
+    Hash of lib/*.py and this script, whose run_* functions define the trials
+    """
+    h = hashlib.sha256()
+    lib_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+    for path in sorted(glob.glob(os.path.join(lib_dir, "*.py"))) + [os.path.abspath(__file__)]:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def trial_key(trainer, config, seed, max_iters, version):
+    blob = json.dumps({"trainer": trainer, "config": config, "seed": seed,
+                       "max_iters": max_iters, "code": version}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed store of finished trials, one JSON file per key
+    """
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+
+class MedianPruner:
+    """
+    Stops a trial whose best reward_mean so far is below the median of the
+    finished trials' best reward_mean at the same iteration.
+    """
+    def __init__(self, history, grace=PRUNE_GRACE, interval=PRUNE_INTERVAL, min_trials=PRUNE_MIN_TRIALS):
+        self.history = history
+        self.grace = grace
+        self.interval = interval
+        self.min_trials = min_trials
+
+    def should_prune(self, rewards):
+        n = len(rewards)
+        if n < self.grace or n % self.interval:
+            return False
+        finished = list(self.history)
+        if len(finished) < self.min_trials:
+            return False
+        others = [max(traj[:n]) for traj in finished if traj]
+        return max(rewards) < np.median(others)
+
+
+class Reporter:
+    def __init__(self, pruner):
+        self.pruner = pruner
+        self.rewards = []
+        self.prune = False
+
+    def __call__(self, reward):
+        self.rewards.append(float(reward))
+        if self.pruner is not None:
+            self.prune = self.pruner.should_prune(self.rewards)
+
+
+def init_worker(threads=1):
+    torch.set_num_threads(threads)
+
+
+def run_trial(task, history, cache_root):
+    trainer, config, seed, max_iters, key = task
+    _, run, _ = TRAINERS[trainer]
+    report = Reporter(MedianPruner(history) if history is not None else None)
+    ts = time.time()
+    status = run(config, seed, max_iters, report)
+    result = {
+        "trainer": trainer, "config": config, "seed": seed, "status": status,
+        "iterations": len(report.rewards), "best_reward": max(report.rewards),
+        "rewards": report.rewards, "elapsed": time.time() - ts,
+    }
+    if history is not None and status != "pruned":
+        history.append(report.rewards)
+    ResultCache(cache_root).put(key, result)
+    return result
+
+
+def record_trial(store, res):
+    """
+    Adds a finished trial to a lib.run_store.MetricsStore, its rewards as the reward_mean series
+    """
+    run = store.create_run(dict(res["config"], trainer=res["trainer"], seed=res["seed"]), name=res["trainer"])
+    for step, reward in enumerate(res["rewards"]):
+        run.add_scalar("reward_mean", reward, step)
+    run.add_scalar("elapsed", res["elapsed"], len(res["rewards"]) - 1)
+    run.close(res["status"])
+
+
+def summarize(results):
+    by_config = {}
+    for res in results:
+        by_config.setdefault(json.dumps(res["config"], sort_keys=True), []).append(res)
+    rows = []
+    for config, trials in by_config.items():
+        solved = [t["iterations"] for t in trials if t["status"] == "solved"]
+        mean_iters = float(np.mean(solved)) if solved else float("inf")
+        rows.append((mean_iters, len(solved), len(trials), config))
+    rows.sort()
+    for mean_iters, solved, total, config in rows:
+        print("iters_to_solve=%8.1f solved=%d/%d %s" % (mean_iters, solved, total, config))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--trainer", default="cross-entropy", choices=sorted(TRAINERS))
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        help="Search space entry: name=v1,v2 | name=low:high | name=log:low:high")
+    parser.add_argument("--random", type=int, default=0, help="Sample this many random configs instead of the grid")
+    parser.add_argument("--seeds", type=int, default=1, help="Seeds per config")
+    parser.add_argument("--max-iters", type=int, help="Iteration budget per trial")
+    parser.add_argument("--workers", type=int,
+                        help="Process pool size, default from the machine profile or the CPU count")
+    parser.add_argument("--no-prune", default=False, action="store_true", help="Disable median pruning")
+    parser.add_argument("--retry-pruned", default=False, action="store_true", help="Rerun cached pruned trials")
+    parser.add_argument("--cache", default=CACHE_DIR, help="Result cache directory")
+    parser.add_argument("-o", "--output", help="Write all trial results to this JSON file")
+    parser.add_argument("--store", help="Record every trial run now in this metrics store directory")
+    args = parser.parse_args()
+
+    profile = machine_profile.load("q-learning" if args.trainer == "q-learning" else "cross-entropy")
+    workers = args.workers or profile.get("workers") or os.cpu_count()
+    defaults, _, default_iters = TRAINERS[args.trainer]
+    space = dict(defaults)
+    for text in args.param:
+        name, value = parse_param(text)
+        if name not in space:
+            parser.error("unknown parameter %s for %s" % (name, args.trainer))
+        space[name] = value
+    max_iters = args.max_iters or default_iters
+    if args.random:
+        configs = list(random_search(space, args.random, seed=0))
+    else:
+        if any(isinstance(v, tuple) for v in space.values()):
+            parser.error("ranges need --random")
+        configs = list(grid_search(space))
+
+    version = code_version()
+    cache = ResultCache(args.cache)
+    results, tasks = [], []
+    for config in configs:
+        for seed in range(args.seeds):
+            key = trial_key(args.trainer, config, seed, max_iters, version)
+            cached = cache.get(key)
+            # a pruned result is only an answer under the same pruning
+            rerun = cached is not None and cached["status"] == "pruned" and (args.retry_pruned or args.no_prune)
+            if cached is not None and not rerun:
+                results.append(cached)
+            else:
+                tasks.append((args.trainer, config, seed, max_iters, key))
+    print("%d trials, %d cached, %d to run on %d workers, code %s" % (
+        len(results) + len(tasks), len(results), len(tasks), workers, version))
+
+    manager = None if args.no_prune else multiprocessing.Manager()
+    history = None if manager is None else manager.list(
+        [r["rewards"] for r in results if r["trainer"] == args.trainer and r["status"] != "pruned"])
+    store = None if args.store is None else run_store.MetricsStore(args.store)
+    worker = functools.partial(run_trial, history=history, cache_root=args.cache)
+    with multiprocessing.Pool(processes=workers, initializer=init_worker,
+                              initargs=(profile.get("threads", 1), )) as pool:
+        for res in pool.imap_unordered(worker, tasks):
+            print("%s seed=%d: %s after %d iterations, best=%.3f, %.1fs" % (
+                json.dumps(res["config"], sort_keys=True), res["seed"], res["status"],
+                res["iterations"], res["best_reward"], res["elapsed"]))
+            results.append(res)
+            if store is not None:
+                record_trial(store, res)
+
+    summarize(results)
+    if store is not None:
+        store.close()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,57 @@
+import numpy as np
+import torch
+import torch.optim as optim
+
+from lib import cross_entropy, dedup
+from lib.learner import Learner
+
+N_STATES, N_ACTIONS = 16, 4
+KEEP_ELITES = 5
+
+
+def make_batches(rng, n_batches, size, n_distinct=6):
+    eye = np.eye(N_STATES, dtype=np.float32)
+    pool = []
+    for _ in range(n_distinct):
+        length = int(rng.integers(1, 8))
+        steps = [cross_entropy.EpisodeStep(observation=eye[rng.integers(N_STATES)], action=int(rng.integers(N_ACTIONS)))
+                 for _ in range(length)]
+        pool.append(cross_entropy.Episode(reward=float(rng.random() < 0.7), steps=steps))
+    return [[pool[i] for i in rng.integers(n_distinct, size=size)] for _ in range(n_batches)]
+
+
+def run(trainer, state, batches, monkeypatch):
+    net = cross_entropy.Net(N_STATES, 8, N_ACTIONS)
+    net.load_state_dict(state)
+    learner = Learner(net, optim.SGD(net.parameters(), lr=0.1))
+    monkeypatch.setattr(cross_entropy, "iterate_batches", lambda *args, **kwargs: iter(batches))
+    steps = list(trainer(None, net, None, keep_elites=KEEP_ELITES, learner=learner))
+    return net, steps
+
+
+def test_trim_keeps_newest_copies_by_position():
+    a, b = (dedup.CountedEpisode(1.0, [], 1, key) for key in (b"a", b"b"))
+    runs = dedup.merge_counted([], [a, a, b, a])
+    assert [(e.key, e.copies) for e in runs] == [(b"a", 2), (b"b", 1), (b"a", 1)]
+    # the newest three copies are a, b, a: a's older run is cut, not its newest copy
+    assert [(e.key, e.copies) for e in dedup.trim_copies(runs, 3)] == [(b"a", 1), (b"b", 1), (b"a", 1)]
+    assert runs[0].steps is runs[2].steps
+
+
+def test_dedup_matches_plain_loop(monkeypatch):
+    rng = np.random.default_rng(0)
+    batches = make_batches(rng, 6, 10)
+    torch.manual_seed(0)
+    state = cross_entropy.Net(N_STATES, 8, N_ACTIONS).state_dict()
+
+    net, expected = run(cross_entropy.train, state, batches, monkeypatch)
+    dedup_net, steps = run(dedup.train, state, batches, monkeypatch)
+    for step, exp in zip(steps, expected):
+        assert step.reward_bound == exp.reward_bound
+        assert step.elites == exp.elites
+        if exp.loss is None:
+            assert step.loss is None
+        else:
+            assert np.isclose(step.loss, exp.loss, rtol=1e-5)
+    for p, q in zip(net.parameters(), dedup_net.parameters()):
+        assert torch.allclose(p, q, atol=1e-5)
@@ -0,0 +1,56 @@
+import numpy as np
+import torch
+import torch.optim as optim
+
+from lib import cross_entropy, distributed
+from lib.learner import Learner
+from lib.sketch import QuantileSketch
+
+N_STATES, N_ACTIONS = 16, 4
+KEEP_ELITES = 3
+
+
+def make_batch(rng, size):
+    eye = np.eye(N_STATES, dtype=np.float32)
+    batch = []
+    for _ in range(size):
+        length = int(rng.integers(1, 8))
+        steps = [cross_entropy.EpisodeStep(observation=eye[rng.integers(N_STATES)], action=int(rng.integers(N_ACTIONS)))
+                 for _ in range(length)]
+        batch.append(cross_entropy.Episode(reward=float(rng.random() < 0.5), steps=steps))
+    return batch
+
+
+def make_learner(state):
+    net = cross_entropy.Net(N_STATES, 8, N_ACTIONS)
+    net.load_state_dict(state)
+    return net, Learner(net, optim.Adam(net.parameters(), lr=0.01))
+
+
+def test_elite_step_matches_train(monkeypatch):
+    rng = np.random.default_rng(0)
+    batches = [make_batch(rng, 12) for _ in range(3)]
+    torch.manual_seed(0)
+    state = cross_entropy.Net(N_STATES, 8, N_ACTIONS).state_dict()
+
+    net, learner = make_learner(state)
+    monkeypatch.setattr(cross_entropy, "iterate_batches", lambda *args, **kwargs: iter(batches))
+    expected = list(cross_entropy.train(None, net, None, percentile=cross_entropy.PERCENTILE,
+                                        keep_elites=KEEP_ELITES, learner=learner))
+
+    dist_net, dist_learner = make_learner(state)
+    full_batch, full_disc = [], np.zeros(0)
+    for batch, step in zip(batches, expected):
+        disc = np.array([e.reward * (cross_entropy.GAMMA ** len(e.steps)) for e in batch])
+        sketch = QuantileSketch.from_values(full_disc)
+        sketch.merge(QuantileSketch.from_values(disc))
+        reward_bound = sketch.percentile(cross_entropy.PERCENTILE)
+        elites = disc > reward_bound
+        loss, full_batch, full_disc = distributed.elite_step(
+            dist_learner, full_batch, full_disc, [e for e, k in zip(batch, elites) if k], disc[elites],
+            reward_bound, KEEP_ELITES)
+        assert reward_bound == step.reward_bound
+        assert len(full_batch) == step.elites
+        assert loss == step.loss
+    for p, q in zip(net.parameters(), dist_net.parameters()):
+        assert torch.equal(p, q)
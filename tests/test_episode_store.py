@@ -0,0 +1,64 @@
+import numpy as np
+
+from lib import episode_store
+
+N_STATES, N_ACTIONS = 16, 4
+
+
+def make_episodes(rng, count):
+    eye = np.eye(N_STATES, dtype=np.float32)
+    episodes = []
+    for _ in range(count):
+        length = int(rng.integers(1, 12))
+        episodes.append((eye[rng.integers(N_STATES, size=length)], rng.integers(N_ACTIONS, size=length),
+                         (rng.random(length) < 0.1).astype(np.float32)))
+    return episodes
+
+
+def write(writer, episodes):
+    for obs, actions, rewards in episodes:
+        for o, a, r in zip(obs, actions, rewards):
+            writer.add_step(o, a, r)
+        writer.end_episode()
+
+
+def test_discrete_round_trip_across_chunks_and_reopen(tmp_path):
+    rng = np.random.default_rng(0)
+    episodes = make_episodes(rng, 40)
+    path = str(tmp_path / "store")
+    with episode_store.EpisodeWriter(path, (N_STATES, ), discrete=True, chunk_steps=16) as writer:
+        write(writer, episodes[:25])
+        # an episode left open at close is dropped, not half stored
+        writer.add_step(episodes[0][0][0], 1, 0.0)
+    with episode_store.EpisodeWriter(path, (N_STATES, ), discrete=True, chunk_steps=16) as writer:
+        write(writer, episodes[25:])
+
+    reader = episode_store.EpisodeReader(path)
+    assert len(reader) == len(episodes)
+    assert reader.n_steps == sum(len(e[1]) for e in episodes)
+    for idx, (stored, (obs, actions, rewards)) in enumerate(zip(reader.iter_episodes(chunk_episodes=7), episodes)):
+        assert np.array_equal(reader.one_hot(stored[0]), obs)
+        assert np.array_equal(stored[1], actions)
+        assert np.array_equal(stored[2], rewards)
+        assert np.array_equal(reader.episode(idx)[1], actions)
+    lengths, returns = [], []
+    for _, chunk_lengths, chunk_returns in reader.iter_episode_stats(chunk_episodes=9):
+        lengths.extend(chunk_lengths)
+        returns.extend(chunk_returns)
+    assert lengths == [len(e[1]) for e in episodes]
+    assert np.allclose(returns, [e[2].sum() for e in episodes])
+
+
+def test_continuous_observations_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    episodes = [(rng.random((length, 3)).astype(np.float32), rng.integers(N_ACTIONS, size=length),
+                 rng.random(length).astype(np.float32)) for length in (5, 1, 8)]
+    path = str(tmp_path / "store")
+    with episode_store.EpisodeWriter(path, (3, ), chunk_steps=4) as writer:
+        write(writer, episodes)
+    reader = episode_store.EpisodeReader(path)
+    for idx, (obs, actions, rewards) in enumerate(episodes):
+        stored = reader.episode(idx)
+        assert np.array_equal(stored[0], obs)
+        assert np.array_equal(stored[1], actions)
+        assert np.array_equal(stored[2], rewards)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from lib import param_server
+
+N_STATES, N_ACTIONS, N_SHARDS = 16, 4, 2
+
+
+def make_remote(transport):
+    return param_server.RemoteTable(transport, N_STATES, N_ACTIONS, N_SHARDS)
+
+
+def make_transport():
+    return param_server.LocalTransport([param_server.QShard(start, end, N_ACTIONS)
+                                        for start, end in param_server.shard_bounds(N_STATES, N_SHARDS)])
+
+
+def server_values(transport):
+    return np.concatenate([shard.values for shard in transport.shards])
+
+
+def test_pull_sends_only_rows_changed_since_last_version():
+    transport = make_transport()
+    writer, reader = make_remote(transport), make_remote(transport)
+    writer.add_delta(1, 2, 0.5)
+    writer.add_delta(1, 2, 0.25)
+    writer.add_delta(12, 0, -1.0)
+    writer.push()
+    reader.pull()
+    assert reader.table.array[1, 2] == 0.75
+    assert reader.table.array[12, 0] == -1.0
+    assert reader.versions == [1, 1]
+
+    writer.add_delta(3, 1, 2.0)
+    writer.push()
+    replies = [param_server.decode_rows(transport.call(shard, param_server.MSG_PULL,
+                                                       param_server.VERSION.pack(reader.versions[shard])), N_ACTIONS)
+               for shard in range(N_SHARDS)]
+    # only row 3 of shard 0 changed since the reader's versions
+    assert [list(rows) for _, rows, _ in replies] == [[3], []]
+    reader.pull()
+    assert np.array_equal(reader.table.array, server_values(transport))
+
+
+def test_agent_syncs_after_staleness_updates():
+    transport = make_transport()
+    agent = param_server.ParamServerAgent(make_remote(transport), staleness=4)
+    for i in range(3):
+        agent.value_update(i, 0, 1.0, i + 1)
+    # the local copy is ahead, the server has not seen any update yet
+    assert not server_values(transport).any()
+    assert agent.values.array[:3, 0].all()
+    agent.value_update(3, 0, 1.0, 4)
+    assert agent.syncs == 1 and agent.queued == 0
+    assert np.allclose(server_values(transport), agent.values.array)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from lib import planning
+
+N_STATES, N_ACTIONS = 24, 4
+GAMMA = 0.9
+
+
+def fill(model, rng, steps=3000, branching=6):
+    dense = np.zeros((N_STATES, N_ACTIONS, N_STATES))
+    for _ in range(steps):
+        s, a = rng.integers(N_STATES), rng.integers(N_ACTIONS)
+        # more successors per pair than the model starts with room for
+        next_s = (s + rng.integers(branching) * 5) % N_STATES
+        model.update(s, a, float(next_s == N_STATES - 1), next_s)
+        dense[s, a, next_s] += 1
+    return dense
+
+
+def test_targets_and_predecessors_match_dense_model():
+    rng = np.random.default_rng(0)
+    model = planning.TransitionModel(N_STATES, N_ACTIONS, slots=2, pred_slots=2)
+    dense = fill(model, rng)
+    table = rng.random((N_STATES, N_ACTIONS))
+    s, a = np.divmod(model.visited[:model.n_visited], N_ACTIONS)
+    expected = (model.reward_sums[s, a] + GAMMA * (dense[s, a] @ table.max(axis=1))) / model.visits[s, a]
+    assert np.allclose(model.targets(table, s, a, GAMMA), expected)
+    for states in ([0], [3, 7, 11], np.arange(N_STATES)):
+        dense_preds = np.flatnonzero(dense[:, :, states].reshape(N_STATES * N_ACTIONS, -1).any(axis=1))
+        assert np.array_equal(model.predecessors(np.array(states)), dense_preds)
+
+
+def test_planners_back_up_to_dense_targets():
+    rng = np.random.default_rng(1)
+    for make in (planning.DynaPlanner, planning.SweepingPlanner):
+        model = planning.TransitionModel(N_STATES, N_ACTIONS)
+        dense = fill(model, rng, steps=500)
+        table = np.zeros((N_STATES, N_ACTIONS))
+        planner = make(model, planning_steps=64)
+        for s, a in zip(*np.divmod(model.visited[:model.n_visited], N_ACTIONS)):
+            planner.observe(table, s, a, GAMMA)
+        for _ in range(200):
+            planner.plan(table, GAMMA)
+        s, a = np.divmod(model.visited[:model.n_visited], N_ACTIONS)
+        # alpha=1 backups converge to the fixed point of the dense model's expectation
+        expected = (model.reward_sums[s, a] + GAMMA * (dense[s, a] @ table.max(axis=1))) / model.visits[s, a]
+        assert planner.backups > 0
+        assert np.allclose(table[s, a], expected, atol=1e-3)
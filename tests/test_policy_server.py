@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from lib import policy_server
+
+OBS_SIZE, N_ACTIONS = 4, 3
+
+
+def policy(obs_v):
+    if obs_v.shape[1] != OBS_SIZE:
+        raise ValueError("bad observation size %d" % obs_v.shape[1])
+    probs_v = torch.zeros(len(obs_v), N_ACTIONS)
+    probs_v[:, 2] = 1.0
+    return probs_v
+
+
+def test_policy_error_reaches_actor_and_server_survives():
+    server = policy_server.PolicyServer(policy, seed=0)
+    with pytest.raises(ValueError):
+        server.act(np.zeros(OBS_SIZE + 1, dtype=np.float32))
+    assert server.act(np.zeros(OBS_SIZE, dtype=np.float32)) == 2
+    server.close()
+
+
+def test_unix_client_raises_connection_error_when_server_drops(tmp_path):
+    path = str(tmp_path / "policy.sock")
+    # the server expects one more value than the policy accepts, the handler dies and closes the socket
+    unix_server = policy_server.UnixPolicyServer(path, policy_server.PolicyServer(policy), OBS_SIZE + 1)
+    unix_server.handle_error = lambda request, client_address: None
+    unix_server.start()
+    client = policy_server.UnixPolicyClient(path)
+    with pytest.raises(ConnectionError):
+        client.act(np.zeros(OBS_SIZE + 1, dtype=np.float32))
+    client.close()
+    unix_server.shutdown()
+    unix_server.server_close()
+    os.unlink(path)
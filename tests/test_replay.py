@@ -0,0 +1,60 @@
+import numpy as np
+
+from lib import replay
+
+N_STATES, N_ACTIONS = 16, 4
+GAMMA, ALPHA = 0.9, 0.2
+
+
+def fill(buffer, rng, count):
+    for _ in range(count):
+        buffer.append(rng.integers(N_STATES), rng.integers(N_ACTIONS), float(rng.random() < 0.2),
+                      rng.integers(N_STATES), rng.random() < 0.1)
+
+
+def plain_update(table, buffer, idx, weights):
+    """
+    Per-transition Q-learning updates, all targets taken from the table before the batch
+    """
+    new = table.copy()
+    for i, w in zip(idx, weights):
+        s, a, next_s = buffer.states[i], buffer.actions[i], buffer.next_states[i]
+        target = buffer.rewards[i] + (0.0 if buffer.dones[i] else GAMMA * table[next_s].max())
+        new[s, a] += ALPHA * w * (target - table[s, a])
+    return new
+
+
+def first_of_each_pair(buffer, idx):
+    _, first = np.unique(buffer.states[idx] * N_ACTIONS + buffer.actions[idx], return_index=True)
+    return np.sort(first)
+
+
+def test_prioritized_update_matches_weighted_plain_update():
+    rng = np.random.default_rng(0)
+    buffer = replay.ReplayBuffer(256, prioritized=True, seed=0)
+    fill(buffer, rng, 200)
+    table = rng.random((N_STATES, N_ACTIONS))
+
+    # fresh transitions share max_priority: prioritized sampling is uniform with unit weights
+    idx, weights = buffer.sample(32)
+    assert np.array_equal(weights, np.ones(32))
+
+    buffer.update_priorities(np.arange(200), rng.random(200))
+    idx, weights = buffer.sample(64)
+    assert weights.max() == 1.0 and (weights > 0).all()
+    keep = first_of_each_pair(buffer, idx)
+    idx, weights = idx[keep], weights[keep]
+    expected = plain_update(table, buffer, idx, weights)
+    td_errors = replay.replay_update(table, buffer, idx, weights, GAMMA, ALPHA)
+    assert np.allclose(table, expected)
+    assert len(td_errors) == len(idx)
+
+
+def test_repeated_pairs_share_their_mean_td_error():
+    buffer = replay.ReplayBuffer(8)
+    buffer.append(0, 1, 1.0, 2, True)
+    buffer.append(0, 1, 0.0, 3, False)
+    table = np.zeros((N_STATES, N_ACTIONS))
+    table[3] = 1.0
+    replay.replay_update(table, buffer, np.array([0, 1]), np.ones(2), GAMMA, ALPHA)
+    assert np.isclose(table[0, 1], ALPHA * (1.0 + GAMMA) / 2)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from lib import run_store
+
+
+def record(store, config, values, status):
+    with store.create_run(config, flush_every=4) as run:
+        for step, value in enumerate(values):
+            run.add_scalar("reward_mean", value, step)
+        # a sparse series, logged on some iterations only
+        run.add_scalar("loss", 1.0, len(values) - 1)
+    store.set_status(run.run_id, status)
+    return run.run_id
+
+
+def test_write_query_and_read_back(tmp_path):
+    store = run_store.MetricsStore(str(tmp_path / "store"))
+    first = record(store, {"percentile": 70, "lr": 0.01}, [0.1, 0.4, 0.9], "solved")
+    second = record(store, {"percentile": 90, "lr": 0.01}, np.linspace(0.0, 0.5, 10), "stopped")
+    third = record(store, {"percentile": 70, "lr": 0.001}, [0.2] * 6, "stopped")
+    store.close()
+
+    store = run_store.MetricsStore(str(tmp_path / "store"))
+    assert store.select() == [first, second, third]
+    assert store.select({"percentile": 70}) == [first, third]
+    assert store.select({"percentile": [70, 90]}, status="stopped") == [second, third]
+    assert store.config(second) == {"percentile": 90, "lr": 0.01}
+
+    by = store.summary("reward_mean", by="percentile")
+    assert list(by) == [70, 90]
+    assert np.array_equal(by[70], [3, 6]) and np.array_equal(by[90], [10])
+    assert np.array_equal(store.summary("reward_mean", "max_value", status="solved"), [0.9])
+    # iterations counts up to the last point, count only the logged ones
+    assert np.array_equal(store.summary("loss"), [3, 10, 6])
+    assert np.array_equal(store.summary("loss", "count"), [1, 1, 1])
+
+    steps, values = store.series(second, "reward_mean")
+    assert isinstance(values, np.memmap)
+    assert np.array_equal(steps, np.arange(10))
+    assert np.allclose(values, np.linspace(0.0, 0.5, 10))
+    steps, values = store.series(first, "missing")
+    assert not len(steps) and not len(values)
+
+    steps, curves = store.curves("reward_mean", [first, third])
+    assert np.array_equal(steps, np.arange(6))
+    assert np.allclose(curves[0, :3], [0.1, 0.4, 0.9]) and np.isnan(curves[0, 3:]).all()
+    store.close()
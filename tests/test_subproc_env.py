@@ -0,0 +1,39 @@
+import functools
+
+import numpy as np
+
+from lib import cross_entropy, vector_env, subproc_env
+
+N_ENVS = 4
+DOWN = 1
+
+
+def test_step_returns_next_states_before_reset_like_vector_env():
+    env_fn = functools.partial(cross_entropy.make_env, slippery=False)
+    vec_env = vector_env.FrozenLakeVectorEnv(env_fn(), N_ENVS)
+    vec_env.reset()
+    with subproc_env.SubprocVectorEnv([env_fn] * N_ENVS, n_workers=2) as sub_env:
+        sub_env.reset()
+        # 0 -> 4 -> 8 -> 12, a hole: the last step returns 12 while states are back at the start
+        for _ in range(3):
+            actions = np.full(N_ENVS, DOWN)
+            next_states, rewards, dones = vec_env.step(actions)
+            next_obs, sub_rewards, sub_dones = sub_env.step(actions)
+            assert np.array_equal(next_obs.argmax(axis=1), next_states)
+            assert np.array_equal(sub_env.states.argmax(axis=1), vec_env.states)
+            assert np.array_equal(sub_dones, dones)
+            assert np.array_equal(sub_rewards, rewards)
+        assert dones.all()
+
+
+def play(seed, actions):
+    env_fn = functools.partial(cross_entropy.make_env, slippery=True)
+    with subproc_env.SubprocVectorEnv([env_fn] * N_ENVS, n_workers=2, seed=seed) as sub_env:
+        sub_env.reset()
+        return np.array([sub_env.step(a)[0].argmax(axis=1) for a in actions])
+
+
+def test_seed_reaches_child_envs():
+    actions = np.random.default_rng(0).integers(0, 4, size=(50, N_ENVS))
+    assert np.array_equal(play(3, actions), play(3, actions))
+    assert not np.array_equal(play(3, actions), play(4, actions))
@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_script(tmp_path, *args, timeout=300):
+    env = dict(os.environ, PYTHONPATH=ROOT, FROZENLAKE_PROFILE=str(tmp_path / "profile.json"))
+    return subprocess.run([sys.executable, os.path.join(ROOT, "train_cross_entropy.py")] + list(args),
+                          cwd=str(tmp_path), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          universal_newlines=True, timeout=timeout)
+
+
+def test_warm_started_nonslippery_run_stops(tmp_path):
+    # the distilled policy's episodes all tie, so no iteration has elites
+    res = run_script(tmp_path, "--nonslippery", "--warm-start", "solver", "--no-profile", "--no-tensorboard",
+                     "--env-width", "0")
+    assert res.returncode == 0, res.stdout
+    lines = res.stdout.splitlines()
+    assert "Solved!" in lines
+    assert any(line.startswith("0: loss=-") for line in lines)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+import time
+import random
+import argparse
+import functools
+import torch
+from tensorboardX import SummaryWriter
+
+from lib import cross_entropy, evaluation, vector_env, distill, episode_store, learner, inference
+from lib import machine_profile, profiling, metrics, memory, subproc_env, dedup, reuse, batch_sizer
+from lib import run_store
+
+
+# the best policy on the slippery map succeeds about 74% of the time, a
+# sequential test or the exact return could never show p > 0.8
+SLIPPERY_TARGET = 0.7
+MAX_SECONDS = 600
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nonslippery", default=False, action="store_true", help="Use the deterministic map")
+    parser.add_argument("--sequential", default=False, action="store_true",
+                        help="Decide 'Solved' with a sequential test on fresh episodes of the policy")
+    parser.add_argument("--exact", default=False, action="store_true",
+                        help="Log the exact expected return of the policy, solved from the env model")
+    parser.add_argument("--exact-stop", default=False, action="store_true",
+                        help="Decide 'Solved' on the exact expected return (implies --exact)")
+    parser.add_argument("--target", type=float,
+                        help="Mean reward --sequential or --exact-stop must show to call it solved, default "
+                             "%.2f on the slippery map, %.2f on the deterministic one" % (
+                                 SLIPPERY_TARGET, cross_entropy.SOLVE_REWARD))
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS,
+                        help="Stop unsolved after this much training time, 0 for no limit")
+    parser.add_argument("--method", default="sprt", choices=["sprt", "hoeffding"], help="Sequential test")
+    parser.add_argument("--confidence", type=float, default=evaluation.CONFIDENCE)
+    parser.add_argument("--eval-batch", type=int, default=evaluation.EVAL_BATCH,
+                        help="Evaluation episodes played side by side")
+    parser.add_argument("--warm-start", choices=["solver", "agent"],
+                        help="Distill Net from a tabular Q solution before training")
+    parser.add_argument("--record", help="Append every rollout episode to this episode store directory")
+    parser.add_argument("--minibatch", type=int, help="Learner minibatch size, default is the whole elite set")
+    parser.add_argument("--epochs", type=int, default=1, help="Learner passes over the elites per rollout batch")
+    parser.add_argument("--max-train-mb", type=float, help="Cap on the training tensors, in MiB")
+    parser.add_argument("--policy", choices=inference.POLICY_MODES,
+                        help="Run rollouts on a compiled or int8 quantized inference copy of Net")
+    parser.add_argument("--env-width", type=int,
+                        help="Rollout envs stepped side by side, 0 is one gym env, default from the machine profile")
+    parser.add_argument("--subproc-workers", type=int,
+                        help="Step the --env-width gym env stacks in this many child processes "
+                             "instead of the native vector env")
+    parser.add_argument("--threads", type=int, help="torch.set_num_threads, default from the machine profile")
+    parser.add_argument("--no-profile", default=False, action="store_true",
+                        help="Ignore the machine profile written by autotune.py")
+    parser.add_argument("--dedup", default=False, action="store_true",
+                        help="Store identical episodes once with a count, for the deterministic map")
+    parser.add_argument("--reuse", type=int, metavar="EPISODES",
+                        help="Keep this many past episodes and reuse them with importance weights truncated at "
+                             "%.0f; in bench_reuse.py it never beat the plain loop at the same --batch-size"
+                             % reuse.TRUNCATE_IS)
+    parser.add_argument("--batch-size", type=int, default=cross_entropy.BATCH_SIZE,
+                        help="Rollout episodes per iteration")
+    parser.add_argument("--adaptive-batch", default=False, action="store_true",
+                        help="Resize every rollout batch from the elites and rewards of the previous one")
+    parser.add_argument("--min-batch", type=int, default=batch_sizer.MIN_BATCH)
+    parser.add_argument("--max-batch", type=int, default=batch_sizer.MAX_BATCH)
+    parser.add_argument("--metrics", help="Also append every scalar to this JSON lines file")
+    parser.add_argument("--store", help="Also record the run and its scalars in this metrics store directory")
+    parser.add_argument("--no-tensorboard", default=False, action="store_true",
+                        help="Do not write TensorBoard event files")
+    parser.add_argument("--memory", default=False, action="store_true",
+                        help="Log elite buffer, training tensor and episode store memory every iteration")
+    parser.add_argument("--trace-malloc", default=False, action="store_true",
+                        help="With --memory, diff tracemalloc snapshots between iterations and print the top sites")
+    parser.add_argument("--capture-at", type=int, help="Profile a window of iterations starting here, "
+                        "a capture can also be started at any time with SIGUSR1")
+    parser.add_argument("--capture-iters", type=int, default=profiling.CAPTURE_ITERS,
+                        help="Iterations per profile capture")
+    parser.add_argument("--capture-dir", default=profiling.CAPTURE_DIR, help="Directory for profile captures")
+    args = parser.parse_args()
+    if args.exact_stop and args.sequential:
+        parser.error("--exact-stop and --sequential are alternative stopping rules")
+    if args.adaptive_batch and (args.dedup or args.reuse):
+        parser.error("--adaptive-batch works with the plain loop only")
+    target = args.target
+    if target is None:
+        target = cross_entropy.SOLVE_REWARD if args.nonslippery else SLIPPERY_TARGET
+    capture = profiling.CaptureWindow("cross-entropy", out_dir=args.capture_dir, iterations=args.capture_iters)
+    capture.install_signal()
+
+    profile = {} if args.no_profile else machine_profile.apply("cross-entropy")
+    if profile:
+        print("Machine profile: threads=%d, env_width=%d" % (profile.get("threads", 0), profile.get("env_width", 0)))
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    env_width = args.env_width if args.env_width is not None else profile.get("env_width", 0)
+
+    random.seed(12345)
+    env, net, optimizer = cross_entropy.make_trainer(slippery=not args.nonslippery)
+    n_states = env.observation_space.shape[0]
+    horizon = cross_entropy.episode_limit(env)
+    if args.warm_start:
+        raw_env = cross_entropy.make_env(slippery=not args.nonslippery, one_hot=False)
+        if args.warm_start == "solver":
+            q = distill.q_from_solver(raw_env)
+        else:
+            q = distill.q_from_agent(raw_env)
+        print("Warm start from %s, distillation loss=%.3f" % (args.warm_start, distill.distill(net, q)))
+    store, run = None, None
+    if args.store:
+        store = run_store.MetricsStore(args.store)
+        config = dict(vars(args), trainer="cross-entropy", env_width=env_width,
+                      hidden_size=cross_entropy.HIDDEN_SIZE, percentile=cross_entropy.PERCENTILE,
+                      gamma=cross_entropy.GAMMA, lr=cross_entropy.LEARNING_RATE,
+                      keep_elites=cross_entropy.KEEP_ELITES)
+        run = store.create_run(config, name="frozenlake-nonslippery" if args.nonslippery else "frozenlake-tweaked")
+        print("Recording run %d in %s" % (run.run_id, args.store))
+    tb_writer = None
+    if not args.no_tensorboard:
+        tb_writer = SummaryWriter(comment="-frozenlake-nonslippery" if args.nonslippery else "-frozenlake-tweaked")
+    writer = metrics.MetricsSink(tb_writer, path=args.metrics, run=run)
+
+    evaluator = None
+    if args.sequential:
+        vec_env = vector_env.FrozenLakeVectorEnv(env, args.eval_batch, max_episode_steps=horizon)
+        evaluator = evaluation.SequentialEvaluator(
+            target, confidence=args.confidence, batch_size=args.eval_batch,
+            method=args.method, baseline_episodes=cross_entropy.BATCH_SIZE)
+
+    exact = None
+    if args.exact or args.exact_stop:
+        exact = evaluation.ExactReturnMonitor(env, target, gamma=cross_entropy.GAMMA, horizon=horizon)
+
+    recorder = None
+    if args.record:
+        recorder = episode_store.EpisodeWriter(args.record, env.observation_space.shape, discrete=True)
+
+    max_bytes = None if args.max_train_mb is None else int(args.max_train_mb * 1024 * 1024)
+    learn = learner.Learner(net, optimizer, minibatch=args.minibatch, epochs=args.epochs, max_bytes=max_bytes)
+
+    policy = None if args.policy is None else inference.make_policy(net, args.policy)
+    monitor = None
+    if args.memory:
+        monitor = memory.MemoryMonitor(recorder=recorder, trace=args.trace_malloc)
+    rollout_env = None
+    if args.subproc_workers:
+        env_fn = functools.partial(cross_entropy.make_env, slippery=not args.nonslippery)
+        rollout_env = subproc_env.SubprocVectorEnv([env_fn] * (env_width or args.subproc_workers),
+                                                   n_workers=args.subproc_workers)
+    elif env_width:
+        rollout_env = vector_env.FrozenLakeVectorEnv(env, env_width, max_episode_steps=horizon)
+
+    if args.reuse:
+        trainer = functools.partial(reuse.train, history=args.reuse)
+    else:
+        trainer = dedup.train if args.dedup else cross_entropy.train
+    sizer = None
+    if args.adaptive_batch:
+        sizer = batch_sizer.BatchSizer(start=args.min_batch, min_size=args.min_batch, max_size=args.max_batch)
+        trainer = functools.partial(trainer, sizer=sizer)
+    solved = False
+    start_ts = time.time()
+    for step in trainer(env, net, optimizer, batch_size=args.batch_size, recorder=recorder, learner=learn,
+                        policy=policy, vec_env=rollout_env, memory=monitor):
+        if step.iter_no == args.capture_at:
+            capture.request()
+        written = capture.step()
+        if written is not None:
+            print("Profile written to %s.*" % written)
+        if sizer is not None:
+            decision = sizer.decisions[-1]
+            print("%d: batch %d -> %d (%s), fresh elites=%d, reward_std=%.3f, episodes=%d" % (
+                decision.iter_no, decision.size, decision.next_size, decision.reason, decision.fresh_elites,
+                decision.reward_std, sizer.episodes))
+            writer.add_scalar("batch_size", decision.size, step.iter_no)
+            writer.add_scalar("episodes", sizer.episodes, step.iter_no)
+        print("%d: loss=%s, reward_mean=%.3f, reward_bound=%.3f, batch=%d" % (
+            step.iter_no, "-" if step.loss is None else "%.3f" % step.loss, step.reward_mean, step.reward_bound,
+            step.elites))
+        if args.dedup:
+            writer.add_scalar("distinct_elites", step.distinct, step.iter_no)
+        if args.reuse:
+            writer.add_scalar("reuse_ess", step.ess, step.iter_no)
+        writer.add_scalar("reward_mean", step.reward_mean, step.iter_no)
+        writer.add_scalar("reward_bound", step.reward_bound, step.iter_no)
+        # without elites no learner step ran, there is nothing new to report about it
+        if step.loss is not None:
+            writer.add_scalar("loss", step.loss, step.iter_no)
+            if monitor is not None:
+                writer.add_scalars(monitor.last, step.iter_no)
+                print("    memory: elites %s (%.0f B/step), train tensors %s (peak %s), rss %s" % (
+                    memory.format_bytes(monitor.last["mem_elite_bytes"]), monitor.last["mem_elite_bytes_per_step"],
+                    memory.format_bytes(monitor.last["mem_train_tensor_bytes"]),
+                    memory.format_bytes(monitor.last["mem_train_tensor_peak"]),
+                    memory.format_bytes(monitor.last["mem_rss"])))
+                if args.trace_malloc:
+                    print(memory.format_trace(monitor.last_trace))
+            if args.policy == "int8":
+                agreement = inference.policy_agreement(
+                    lambda obs_v: torch.softmax(net(obs_v), dim=1), policy, torch.eye(n_states))
+                writer.add_scalar("int8_mean_tv", agreement["mean_tv"], step.iter_no)
+                writer.add_scalar("int8_argmax_agreement", agreement["argmax"], step.iter_no)
+        if exact is not None:
+            res = exact.evaluate(cross_entropy.policy_table(net, n_states))
+            print("    exact return: mean=%.4f, discounted=%.4f" % (res.mean, res.discounted))
+            writer.add_scalar("exact_mean", res.mean, step.iter_no)
+            writer.add_scalar("exact_discounted", res.discounted, step.iter_no)
+        if args.exact_stop:
+            solved = exact.last.solved
+        elif evaluator is not None:
+            eval_policy = vector_env.stochastic_policy(cross_entropy.policy_table(net, n_states), vec_env.rng)
+            res = evaluator.evaluate(lambda n: vec_env.play_episodes(eval_policy, n)[0])
+            writer.add_scalar("eval_mean", res.mean, step.iter_no)
+            writer.add_scalar("eval_episodes", res.episodes, step.iter_no)
+            solved = res.solved
+        else:
+            solved = step.reward_mean > cross_entropy.SOLVE_REWARD
+        if solved:
+            print("Solved!")
+            break
+        if args.max_seconds and time.time() - start_ts > args.max_seconds:
+            print("Not solved in %d iterations, %.1f s" % (step.iter_no + 1, time.time() - start_ts))
+            break
+    if evaluator is not None:
+        print("Evaluation episodes: %d played over %d checks" % (evaluator.total_episodes, evaluator.evaluations))
+    if recorder is not None:
+        recorder.close()
+    if args.subproc_workers:
+        rollout_env.close()
+    if monitor is not None:
+        monitor.close()
+    written = capture.close()
+    if written is not None:
+        print("Profile written to %s.*" % written)
+    if run is not None:
+        run.close("solved" if solved else "stopped")
+    writer.close()
+    if store is not None:
+        store.close()
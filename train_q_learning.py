@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import gym
+from tensorboardX import SummaryWriter
+
+from lib import q_learning, evaluation, vector_env, replay, planning, profiling, machine_profile
+
+
+# the best policy on the slippery map succeeds about 74% of the time, a
+# sequential test of p > 0.8 could never accept it
+SEQUENTIAL_TARGET = 0.7
+MAX_SECONDS = 600
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sequential", default=False, action="store_true",
+                        help="Evaluate with a sequential test instead of a fixed number of episodes")
+    parser.add_argument("--target", type=float, default=SEQUENTIAL_TARGET,
+                        help="Mean reward the --sequential test must show to call it solved")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS,
+                        help="Stop unsolved after this much training time, 0 for no limit")
+    parser.add_argument("--method", default="sprt", choices=["sprt", "hoeffding"], help="Sequential test")
+    parser.add_argument("--confidence", type=float, default=evaluation.CONFIDENCE)
+    parser.add_argument("--eval-batch", type=int, default=evaluation.EVAL_BATCH,
+                        help="Evaluation episodes played side by side")
+    parser.add_argument("--replay-ratio", type=int, default=0,
+                        help="Replayed transitions per env step, 0 disables experience replay")
+    parser.add_argument("--replay-size", type=int, default=replay.REPLAY_SIZE)
+    parser.add_argument("--prioritized", default=False, action="store_true",
+                        help="Sample replayed transitions by TD error")
+    parser.add_argument("--planning", choices=["dyna", "sweep"],
+                        help="Plan on a learned model between real steps (Dyna-Q or prioritized sweeping)")
+    parser.add_argument("--planning-steps", type=int, default=planning.PLANNING_STEPS,
+                        help="Planning backups per real step")
+    parser.add_argument("--no-profile", default=False, action="store_true",
+                        help="Ignore the machine profile written by autotune.py")
+    parser.add_argument("--capture-at", type=int, help="Profile a window of iterations starting here, "
+                        "a capture can also be started at any time with SIGUSR1")
+    parser.add_argument("--capture-iters", type=int, default=profiling.CAPTURE_ITERS,
+                        help="Iterations per profile capture")
+    parser.add_argument("--capture-dir", default=profiling.CAPTURE_DIR, help="Directory for profile captures")
+    args = parser.parse_args()
+    capture = profiling.CaptureWindow("q-learning", out_dir=args.capture_dir, iterations=args.capture_iters,
+                                      torch_profile=False)
+    capture.install_signal()
+
+    profile = {} if args.no_profile else machine_profile.apply("q-learning")
+    if profile:
+        print("Machine profile: threads=%d" % profile.get("threads", 0))
+
+    test_env = gym.make(q_learning.ENV_NAME)
+    writer = SummaryWriter(comment="-q-learning")
+
+    evaluate, evaluator = None, None
+    if args.sequential:
+        vec_env = vector_env.FrozenLakeVectorEnv(test_env, args.eval_batch,
+                                                 max_episode_steps=test_env.spec.max_episode_steps)
+        evaluator = evaluation.SequentialEvaluator(
+            args.target, confidence=args.confidence, batch_size=args.eval_batch,
+            method=args.method, baseline_episodes=q_learning.TEST_EPISODES)
+
+        def evaluate(agent):
+            policy = vector_env.greedy_policy(q_learning.q_table(agent))
+            return evaluator.evaluate(lambda n: vec_env.play_episodes(policy, n)[0]).mean
+
+    if args.planning:
+        agent = q_learning.make_table_agent()
+        model = planning.TransitionModel(agent.env.observation_space.n, agent.env.action_space.n)
+        if args.planning == "dyna":
+            planner = planning.DynaPlanner(model, args.planning_steps)
+        else:
+            planner = planning.SweepingPlanner(model, args.planning_steps)
+        steps = planning.train(agent, model, planner, test_env, evaluate=evaluate)
+    elif args.replay_ratio:
+        agent = q_learning.make_table_agent()
+        buffer = replay.ReplayBuffer(args.replay_size, prioritized=args.prioritized)
+        steps = replay.train(agent, buffer, test_env, replay_ratio=args.replay_ratio, evaluate=evaluate)
+    else:
+        agent = q_learning.Agent()
+        steps = q_learning.train(agent, test_env, evaluate=evaluate)
+
+    best_reward = 0.0
+    start_ts = time.time()
+    for iter_no, reward in steps:
+        if iter_no == args.capture_at:
+            capture.request()
+        written = capture.step()
+        if written is not None:
+            print("Profile written to %s.*" % written)
+        writer.add_scalar("reward", reward, iter_no)
+        if evaluator is not None:
+            writer.add_scalar("eval_episodes", evaluator.last.episodes, iter_no)
+        if reward > best_reward:
+            print("Best reward updated %.3f -> %.3f" % (best_reward, reward))
+            best_reward = reward
+        solved = evaluator.last.solved if evaluator is not None else reward > q_learning.SOLVE_REWARD
+        if solved:
+            print("Solved in %d iterations, %.1f s!" % (iter_no, time.time() - start_ts))
+            break
+        if args.max_seconds and time.time() - start_ts > args.max_seconds:
+            print("Not solved in %d iterations, %.1f s" % (iter_no, time.time() - start_ts))
+            break
+    if evaluator is not None:
+        print("Evaluation episodes: %d played, %d saved against %d per iteration" % (
+            evaluator.total_episodes, evaluator.total_saved, q_learning.TEST_EPISODES))
+    written = capture.close()
+    if written is not None:
+        print("Profile written to %s.*" % written)
+    writer.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import numpy as np
+
+from lib import cross_entropy, distill
+
+
+MAX_ITERS = 500
+
+
+def iterations_to_solve(slippery, seed, q=None, max_iters=MAX_ITERS):
+    env, net, optimizer = cross_entropy.make_trainer(slippery=slippery, seed=seed)
+    if q is not None:
+        distill.distill(net, q)
+    for step in cross_entropy.train(env, net, optimizer):
+        if step.reward_mean > cross_entropy.SOLVE_REWARD:
+            return step.iter_no + 1
+        if step.iter_no + 1 >= max_iters:
+            return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nonslippery", default=False, action="store_true")
+    parser.add_argument("--source", default="solver", choices=["solver", "agent"],
+                        help="Where the Q-table comes from")
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--max-iters", type=int, default=MAX_ITERS)
+    args = parser.parse_args()
+
+    slippery = not args.nonslippery
+    raw_env = cross_entropy.make_env(slippery=slippery, one_hot=False)
+    ts = time.time()
+    if args.source == "solver":
+        q = distill.q_from_solver(raw_env)
+    else:
+        q = distill.q_from_agent(raw_env)
+    print("Q-table from %s in %.2fs" % (args.source, time.time() - ts))
+
+    results = {"cold": [], "warm": []}
+    for seed in range(args.seeds):
+        for name, table in (("cold", None), ("warm", q)):
+            ts = time.time()
+            iters = iterations_to_solve(slippery, seed, table, args.max_iters)
+            results[name].append(iters)
+            print("seed %d %s: %s iterations, %.1fs" % (
+                seed, name, "unsolved after %d" % args.max_iters if iters is None else iters, time.time() - ts))
+    for name, iters in results.items():
+        solved = [i for i in iters if i is not None]
+        print("%s: solved %d/%d, mean iterations %s" % (
+            name, len(solved), len(iters), "%.1f" % np.mean(solved) if solved else "-"))